@@ -1,42 +1,85 @@
-from dash import Dash, html, dcc, Output, Input, callback, dash_table
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from dash import Dash, html, dcc, Output, Input, State, callback, dash_table, no_update, ClientsideFunction
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objs as go
-from plotly.subplots import make_subplots
+import plotly.io as pio
+from afl import config
+from afl.backend import GAME_COLUMNS, PLAYER_COLUMNS, openBackend
+from afl.dates import dayKey, seasonOf, sliceDateRange
+from afl.export import addExportRoutes
+from afl.downsample import downsampleSeries, lttbIndices, useWebGL, zoomRange
+from afl.figcache import FigureCache
+from afl.metrics import CallbackMetrics
+from afl.patch import figureUpdate
+from afl.search import playerKey, splitPlayerKey
+from afl.startup import READY_POLL_MS, addReadyRoute
+from afl.store import ServerStore, isStoreKey
+from afl.wire import encode, decode
 
 #### Start-Up Code ####
 
 app = Dash(__name__, 
            external_stylesheets=[dbc.themes.BOOTSTRAP])
 
+# Time every callback (served in Prometheus format on /metrics)
+callbackMetrics = CallbackMetrics(app.server)
+callback = callbackMetrics.instrument(callback)
+
 ## Read datafiles and produce data frames
-# Create df of game data
-df_games = pd.read_csv('/Users/nllama/Documents/games.csv')
-df_stats = pd.read_csv('/Users/nllama/Documents/stats.csv')
-df_colours = pd.read_csv('/Users/nllama/Documents/clubcolours.csv')
-
-# Create df of unique teams 
-df_teamList = pd.DataFrame({
-    'teams' : df_games['homeTeam'].unique(),
-})
+# Everything the callbacks read comes from the backend (AFL_BACKEND): pandas
+# keeps it all in memory (and swaps in appended rounds, AFL_RELOAD_S), sqlite
+# runs indexed queries against a SQLite copy of the files. With
+# AFL_LAZY_START=1 it opens on a background thread and the layout below is
+# served as a shell until it's ready (checkDataVersion fills it in)
+backend = openBackend()
+addReadyRoute(app.server, lambda: backend.ready)
+firstDate, lastDate = backend.dateRange() if backend.ready else (None, None) # For the layout
+
+# Finished figures, shared by every user of this process (hits and misses on /metrics)
+figureCache = FigureCache()
+callbackMetrics.publish('afl_figure_cache', figureCache.stats, counters=['hits', 'misses'])
+
+# The graphs stay in the layout and the callbacks only send what changed in
+# their figures (a dash.Patch against the figure shown, see afl/patch.py).
+# With AFL_RENDER_MODE=client the scatter and pie callbacks only send their
+# arrays (store-scatter-arrays, store-pie-counts) instead, which
+# assets/afl_charts.js turns into figures in the browser
+CLIENT_RENDER = config.RENDER_MODE == 'client'
 
-# Create df of unique players for Richmond 
-df_team = df_stats.loc[(df_stats['team']=='Richmond')]
-players = df_team['displayName'].unique()
-df_playerList = pd.DataFrame({
-    'players' : players,
+# Server-side store for the team slices (used when AFL_STORE_MODE=server)
+serverStore = ServerStore({
+    'games': lambda team: backend.teamGames(team, GAME_COLUMNS),
+    'stats': lambda team: backend.teamStats(team, PLAYER_COLUMNS),
 })
 
-# Player class for creating player card
-class Player:
-    def __init__(self):
-        self.name = None
-        self.games = None
-        self.GPG = None
-        self.BPG = None
-        self.PPG = None
-        self.DPG = None
+# Empty the caches of anything built from the old data after a reload
+def dataSwapped(version):
+    serverStore.version = version
+    serverStore.cache.clear()
+    figureCache.invalidate()
+
+backend.onSwap(dataSwapped)
+backend.start()
+
+# Downloads of the team's games and players' stats, streamed from the backend
+addExportRoutes(app.server, backend)
+
+# Unique teams for the drop down
+teamList = backend.teams() if backend.ready else []
+
+# Threads for building each team's traces in the team comparison (AFL_COMPARE_WORKERS)
+comparePool = ThreadPoolExecutor(max_workers=config.COMPARE_WORKERS)
+
+# Get the data frame back out of a dcc.Store (either the data itself or a server-side key)
+def readStore(data):
+    if isStoreKey(data):
+        return serverStore.get(data)
+    return decode(data)
 
 #### Components Code ####
 
@@ -58,10 +101,40 @@ app.layout = html.Div([
                     "Choose a team: ", dcc.Dropdown( 
                     id='dropdown-team', 
                     value='Richmond', 
-                    options=[{'label':i, 'value':i} for i in df_teamList['teams'].unique()])
+                    options=[{'label':i, 'value':i} for i in teamList])
                 ]), 
                 style={'text-align':'center'},  width={'size':4, 'offset':4})
         ),
+        dbc.Row( # Loading message row (only while the data loads in the background)
+            dbc.Col(
+                html.Div(
+                    id='data-status',
+                    children='' if backend.ready else 'Loading data...'),
+                style={'text-align':'center'},  width={'size':4, 'offset':4})
+        ),
+        dbc.Row( # Date range row
+            dbc.Col(
+                html.Div([ # Date range picker
+                    "Choose a date range: ", dcc.DatePickerRange(
+                    id='date-picker-range',
+                    min_date_allowed=firstDate,
+                    max_date_allowed=lastDate,
+                    initial_visible_month=firstDate,
+                    start_date=firstDate,
+                    end_date=lastDate)
+                ], style={'margin':'15px'}),
+                style={'text-align':'center'},  width={'size':6, 'offset':3})
+        ),
+        dbc.Row( # Download row
+            dbc.Col(
+                html.Div([ # Links to the team's games in the date range
+                    "Download games: ",
+                    html.A('CSV', id='link-export-games-csv', href=''),
+                    ' | ',
+                    html.A('Arrow', id='link-export-games-arrow', href='')
+                ]),
+                style={'text-align':'center', 'fontSize':16},  width={'size':6, 'offset':3})
+        ),
     ],style={'margin':'20px'}),
     
     html.Div([
@@ -69,106 +142,286 @@ app.layout = html.Div([
             dbc.Col(
                     html.Div( # Graph
                         id='graph-scatter-score', 
-                        children=[]), 
+                        children=[dcc.Graph(id='figure-scatter-score')]), 
             width={'size':10, 'offset':1}),
             style={'border':'50px'}
         ),
+        dbc.Row( # Rating (form) line row
+            dbc.Col(
+                    html.Div( # Graph
+                        id='graph-rating', 
+                        children=[dcc.Graph(id='figure-rating')]), 
+            width={'size':10, 'offset':1}),
+        ),
     ],style={'margin':'20px'}),
     
     html.Div([
         dbc.Row([ # W, D, L pie chart row
             dbc.Col(
-                    html.Div(
+                    html.Div( # Graph
                         id='graph-pie-WLD', 
-                        children=[]), 
+                        children=[dcc.Graph(id='figure-pie-WLD')]), 
             width={'size':4, 'offset':1}),
            
             dbc.Col([
-                html.Div([ # Drop down menu for player selection
+                html.Div([ # Drop down menu for player selection (the team's players, or type to search the league)
                     "Choose a player: ", dcc.Dropdown( 
                     id='dropdown-player',  
-                    options=[{'label':i, 'value':i} for i in df_playerList['players'].unique()])
+                    placeholder='Type to search all players',
+                    options=[])
                 ]), 
                 html.Div( # Player stat card
                     html.P(
                         id='test-output',
                         children='Player stats will appear here\nChoose one to start ^^^'
                     )
-                )],
+                ),
+                html.Div([ # Link to the player's (or with none chosen the team's) per-game stats
+                    "Download stats: ",
+                    html.A('CSV', id='link-export-stats-csv', href='')
+                ], style={'fontSize':16})],
             width={'size':3, 'offset':2})
         ]),
     ]),
+
+    html.Div([
+        dbc.Row( # Comparison teams choice row
+            dbc.Col(
+                html.Div([ # Drop down menu for the teams to compare (several at once)
+                    "Compare teams: ", dcc.Dropdown(
+                    id='dropdown-compare-teams',
+                    value=[],
+                    multi=True,
+                    placeholder='Choose teams to compare',
+                    options=[{'label':i, 'value':i} for i in teamList])
+                ]),
+                style={'text-align':'center'}, width={'size':6, 'offset':3})
+        ),
+        dbc.Row( # Comparison scatter row
+            dbc.Col(
+                    html.Div( # Graph
+                        id='graph-compare-scatter',
+                        children=[dcc.Graph(id='figure-compare-scatter')]),
+            width={'size':10, 'offset':1})
+        ),
+        dbc.Row( # Comparison W, D, L pies row
+            dbc.Col(
+                    html.Div( # Graph
+                        id='graph-compare-pie',
+                        children=[dcc.Graph(id='figure-compare-pie')]),
+            width={'size':10, 'offset':1})
+        ),
+    ],style={'margin':'20px'}),
+
+    html.Div([
+        dbc.Row( # Head to head choice row
+            dbc.Col(
+                html.Div([ # Radio buttons for what the head to head colours show
+                    "Head to head: ", dcc.RadioItems(
+                    id='radio-h2h-metric',
+                    value='winRate',
+                    options=[{'label':' Win %  ', 'value':'winRate'}, {'label':' Average margin', 'value':'avgMargin'}],
+                    inline=True)
+                ]),
+                style={'text-align':'center'}, width={'size':6, 'offset':3})
+        ),
+        dbc.Row( # Head to head heatmap row
+            dbc.Col(
+                    html.Div( # Heatmap
+                        id='graph-h2h',
+                        children=[dcc.Graph(id='figure-h2h')]),
+            width={'size':10, 'offset':1})
+        ),
+    ],style={'margin':'20px'}),
+
+    html.Div([
+        dbc.Row([ # League leaders choice row
+            dbc.Col(
+                html.Div([ # Drop down menu for the stat to rank by
+                    "League leaders in: ", dcc.Dropdown(
+                    id='dropdown-leader-stat',
+                    value='Goals',
+                    clearable=False,
+                    options=[])
+                ]),
+                width={'size':3, 'offset':1}),
+            dbc.Col(
+                html.Div([ # Radio buttons for totals or per-game averages
+                    "Rank by: ", dcc.RadioItems(
+                    id='radio-leader-mode',
+                    value='perGame',
+                    options=[{'label':' Per game  ', 'value':'perGame'}, {'label':' Total', 'value':'total'}],
+                    inline=True)
+                ]),
+                width={'size':3}),
+            dbc.Col(
+                html.Div([ # Fewest games a player needs in the seasons to be ranked
+                    "Minimum games: ", dcc.Input(
+                    id='input-leader-min-games',
+                    type='number',
+                    min=1,
+                    value=10,
+                    debounce=True)
+                ]),
+                width={'size':3}),
+        ]),
+        dbc.Row( # League leaders table row (seasons from the date range)
+            dbc.Col(
+                    html.Div( # Table
+                        id='table-leaders',
+                        children=[]),
+            width={'size':10, 'offset':1})
+        ),
+    ],style={'margin':'20px'}),
     
     # dcc.Store inside the user's current browser session
     dcc.Store(id='store-team-data', data=[], storage_type='memory'), # 'local' or 'session'
     dcc.Store(id='store-team-colour', data=[], storage_type='memory'), # 'local' or 'session'
     dcc.Store(id='store-stat-data', data=[], storage_type='memory'), # 'local' or 'session'
+
+    # Figure cache key of what each graph is showing (None when it's zoomed or empty)
+    dcc.Store(id='store-scatter-shown', data=None, storage_type='memory'),
+    dcc.Store(id='store-rating-shown', data=None, storage_type='memory'),
+    dcc.Store(id='store-pie-shown', data=None, storage_type='memory'),
+    dcc.Store(id='store-h2h-shown', data=None, storage_type='memory'),
+    dcc.Store(id='store-compare-scatter-shown', data=None, storage_type='memory'),
+    dcc.Store(id='store-compare-pie-shown', data=None, storage_type='memory'),
+
+    # Chart arrays and the plotly template, for drawing in the browser (AFL_RENDER_MODE=client)
+    dcc.Store(id='store-scatter-arrays', data=None, storage_type='memory'),
+    dcc.Store(id='store-pie-counts', data=None, storage_type='memory'),
+    dcc.Store(id='store-figure-template', storage_type='memory',
+              data=pio.templates[pio.templates.default].to_plotly_json() if CLIENT_RENDER else None),
+
+    # Data version the page is showing, checked against the server's for reloads
+    # (None until the data is loaded, the interval polls quicker until then)
+    dcc.Store(id='store-data-version', data=backend.version, storage_type='memory'),
+    dcc.Interval(id='interval-data-version', 
+                 interval=max(config.RELOAD_S, 1)*1000 if backend.ready else READY_POLL_MS, 
+                 disabled=backend.ready and not config.RELOAD_S),
 ], style={'fontSize': 20, 'background-color':'#DBAE86'})
 
 #### Callback Code ####
 
-# Store dataframe of all game data (df_games) for chosen team when dropdown-team is modified 
+# All game data (df_games) for chosen team
+def storeGameData(value):
+    if config.STORE_MODE == 'server':
+        return serverStore.put('games', value) # Only the key goes to the browser
+    dataset = backend.teamGames(value, GAME_COLUMNS) # Chosen team's games, date sorted, only the columns the scatter uses
+    return encode(dataset)
+
+
+# The chosen team's three colours
+def storeTeamColours(value):
+    return backend.teamColours(value) # No colours on file: plotly's defaults
+
+
+# All stat data (df_stats) for chosen team
+def storeStatData(value):
+    if config.STORE_MODE == 'server':
+        return serverStore.put('stats', value) # Only the key goes to the browser
+    dataset = backend.teamStats(value, PLAYER_COLUMNS) # Chosen team's rows, only the columns the player list uses
+    return encode(dataset)
+
+
+# Fill all three stores in one round trip when dropdown-team is modified (or the data is reloaded)
 @callback(
     Output('store-team-data', 'data'), # Data storage
-    Input('dropdown-team', 'value') # Team choice
+    Output('store-stat-data', 'data'), # Data storage
+    Output('store-team-colour', 'data'), # Data storage
+    Input('dropdown-team', 'value'), # Team choice
+    Input('store-data-version', 'data') # Data version
 )
-def storeGameData(value):
-    dataset = df_games.loc[(df_games['homeTeam'] == value) | (df_games['awayTeam'] == value)] # Get all rows with chosen team in theme
-    dataset["date"] = pd.to_datetime(dataset['date']) 
-    dataset = dataset.sort_values(by='date') # Reorder based on date
-    return dataset.to_dict()
+def selectTeam(value, version):
+    if version is None: # Data still loading
+        raise PreventUpdate
+    return storeGameData(value), storeStatData(value), storeTeamColours(value)
 
 
-# Store dataframe of team colours (df_colours)  
+# Pick up loaded or reloaded data: new teams in the drop down and new dates in the date picker
+# (the first time, on a page served before the data was ready, the whole date range is chosen too)
 @callback(
-    Output('store-team-colour', 'data'), # Data storage
-    Input('dropdown-team', 'value') # Team choice
+    Output('dropdown-team', 'options'), # Team choice
+    Output('dropdown-compare-teams', 'options'), # Comparison teams choice
+    Output('date-picker-range', 'min_date_allowed'), # Date range
+    Output('date-picker-range', 'max_date_allowed'), # Date range
+    Output('date-picker-range', 'start_date'), # Start date
+    Output('date-picker-range', 'end_date'), # End date
+    Output('store-data-version', 'data'), # Data version
+    Output('interval-data-version', 'interval'), # Polling timer
+    Output('interval-data-version', 'disabled'), # Polling timer
+    Output('data-status', 'children'), # Loading message
+    Input('interval-data-version', 'n_intervals'), # Polling timer
+    State('store-data-version', 'data') # Data version the page has
 )
-def storeTeamColours(value):
-    return df_colours.to_dict()
+def checkDataVersion(n, version):
+    current = backend.version
+    if version == current: # Same data (or still loading)
+        raise PreventUpdate
+    options = [{'label':i, 'value':i} for i in backend.teams()]
+    first, last = backend.dateRange()
+    if version is not None:
+        return options, options, first, last, no_update, no_update, current, no_update, no_update, no_update
+    # First data for this page: poll at the reload interval from now on (if at all)
+    return (options, options, first, last, first, last, current,
+            max(config.RELOAD_S, 1)*1000, not config.RELOAD_S, '')
 
 
-# Store dataframe of all stat data (df_stats) for chosen team when dropdown-team is modified 
+# Point the download links at the current team, dates and player
 @callback(
-    Output('store-stat-data', 'data'), # Data storage
-    Input('dropdown-team', 'value') # Team choice
+    Output('link-export-games-csv', 'href'), # Download link
+    Output('link-export-games-arrow', 'href'), # Download link
+    Output('link-export-stats-csv', 'href'), # Download link
+    Input('dropdown-team', 'value'), # Team choice
+    Input('date-picker-range', 'start_date'), # Start date
+    Input('date-picker-range', 'end_date'), # End date
+    Input('dropdown-player', 'value') # Player chosen (team and player)
 )
-def storeStatData(value):
-    dataset = df_stats.loc[(df_stats['team'] == value)] # Get all rows with chosen team in theme
-    return dataset.to_dict()
+def updateExportLinks(value, start_date, end_date, player):
+    games = urlencode({'team':value or '', 'start_date':start_date or '', 'end_date':end_date or ''})
+    stats = urlencode({'player':player} if player else {'team':value or ''})
+    link = lambda name: app.get_relative_path(config.EXPORT_PATH + '/' + name)
+    return link('games.csv') + '?' + games, link('games.arrow') + '?' + games, link('stats.csv') + '?' + stats
 
 
-# Update player list drop down (remember: stored dataset is for chosen team)
+# Update player list drop down: the chosen team's players, or league-wide
+# matches for what's typed in the search box (remember: stored dataset is for chosen team)
 @callback(
     Output('dropdown-player', 'options'), # Playes list drop down
     Input('store-stat-data', 'data'), # Data storage
-    Input('dropdown-team', 'value') # Team choice
+    Input('dropdown-team', 'value'), # Team choice
+    Input('dropdown-player', 'search_value'), # Text typed in the player drop down
+    State('dropdown-player', 'value') # Player chosen
 )
-def updatePlayerList(data, value):
-    df = pd.DataFrame(data) # Get the stored dataframe
-    players = df.loc[(df['team']==value)]['displayName'].unique()
-    return [{'label':i, 'value':i} for i in players]
+def updatePlayerList(data, value, search, player):
+    if not backend.ready or not (search or data): # Data still loading
+        raise PreventUpdate
+    if search:
+        matches = backend.searchPlayers(search, config.PLAYER_SEARCH_LIMIT)
+        options = [{'label':'%s (%s)' % (name, team), 'value':playerKey(team, name)} for team, name in matches]
+    else:
+        df = readStore(data) # Get the stored dataframe
+        players = df.loc[(df['team']==value)]['displayName'].unique()
+        options = [{'label':i, 'value':playerKey(value, i)} for i in players]
+
+    # Keep the chosen player in the options so the drop down doesn't clear it
+    if player and player not in [option['value'] for option in options]:
+        team, name = splitPlayerKey(player)
+        options.append({'label':'%s (%s)' % (name, team), 'value':player})
+    return options
 
 
-# Update player stat card (remember: stored dataset is for chosen team)
+# Update player stat card from the backend (career table or one indexed query)
 @callback(
     Output('test-output', 'children'), # Test ouput label
-    Input('dropdown-player', 'value'), # Playes list drop down
-    Input('store-stat-data', 'data'), # Data storage
+    Input('dropdown-player', 'value'), # Playes list drop down (team and player)
+    Input('store-stat-data', 'data') # Data storage (only triggers the update)
 )
 def updatePlayerCard(value, data):
-    df = pd.DataFrame(data) # Get the stored dataframe
-    df_player = df.loc[(df['displayName'] == value)]
-    
-    player = Player()
-    player.name = value
-    player.games = df_player['gameNumber'].max()
-    player.GPG = round(df_player['Goals'].sum()/player.games,2)
-    player.BPG = round(df_player['Behinds'].sum()/player.games,2)
-    player.PPG = round((player.GPG*6) + player.BPG,2)
-    player.DPG = round(df_player['Disposals'].sum()/player.games,2)
+    team, name = splitPlayerKey(value)
+    player = backend.player(team, name) if team is not None else None
     
-    if player.games > 0:
+    if player is not None and player.games > 0:
         msg = [html.Br(),
             'Player name:  ', player.name, html.Br(),
             'Games played: ', player.games, html.Br(),
@@ -182,86 +435,218 @@ def updatePlayerCard(value, data):
     return msg
 
 
-# Create scatter from stored dataset (remember: stored dataset is for chosen team)
-@callback(
-    Output('graph-scatter-score', 'children'), # Scatter
-    Input('store-team-data', 'data'), # Data storage
-    Input('store-team-colour', 'data'), # Data storage
-    Input('dropdown-team', 'value') # Team choice
-)
-def createHAScoreScatter(dataTeam, dataColour, value):
-    df = pd.DataFrame(dataTeam) # Get the stored dataframe (for the home team)
-    df_colour = pd.DataFrame(dataColour)
+# Home and away score scatter for the stored dataset (already cut to the dates shown)
+# Long histories are thinned out to about AFL_MAX_POINTS points and drawn with WebGL
+def scoreScatter(df, colors, value, xRange=None):
+    home, away = scoreSeries(df, value)
+    Scatter = go.Scattergl if useWebGL(len(home.index) + len(away.index)) else go.Scatter
 
-    # Get team colours to display 
-    colors = [
-        df_colour.loc[(df_colour['team'] == value),'colour1'].iloc[0],  
-        df_colour.loc[(df_colour['team'] == value),'colour2'].iloc[0],
-        df_colour.loc[(df_colour['team'] == value),'colour3'].iloc[0],
-    ]
-
-    homeGO = go.Scatter( # Home graph object
-        x=df.loc[(df['homeTeam'] == value)]['date'], 
-        y=df.loc[(df['homeTeam'] == value)]['homeTeamScore'], 
+    homeGO = Scatter( # Home graph object
+        x=home['date'], 
+        y=home['homeTeamScore'], 
         name='home', 
         mode='markers',
         textfont_size = 16,
         marker = dict(color=colors[0]))
 
-    awayGO = go.Scatter(# Away graph object
-        x=df.loc[(df['awayTeam'] == value)]['date'], 
-        y=df.loc[(df['awayTeam'] == value)]['awayTeamScore'], 
+    awayGO = Scatter(# Away graph object
+        x=away['date'], 
+        y=away['awayTeamScore'], 
         name='away', 
         mode='markers',
         textfont_size = 16,
         marker = dict(color=colors[1]))
 
+    from plotly.subplots import make_subplots # Only loaded when the first chart is drawn
     fig = make_subplots() # Useful for editing plot https://plotly.com/python/figure-structure/
     fig.add_trace(homeGO)
     fig.add_trace(awayGO)
     fig.layout.xaxis.title.text = 'date' 
     fig.layout.yaxis.title.text = 'total score'
     fig.layout.title.text = value + ' Home and Away Scores' # How to centre??? 
-    return dcc.Graph(figure=fig)
+    fig.layout.uirevision = value # Keep zoom and legend choices while the figure is swapped
+    if xRange is not None:
+        fig.layout.xaxis.range = list(xRange)
+    return fig
+
 
+# The team's home and away games, each thinned out to half the point budget
+def scoreSeries(df, value):
+    home = df.loc[(df['homeTeam'] == value)]
+    away = df.loc[(df['awayTeam'] == value)]
+    home = downsampleSeries(home, 'date', 'homeTeamScore', config.MAX_POINTS // 2)
+    away = downsampleSeries(away, 'date', 'awayTeamScore', config.MAX_POINTS // 2)
+    return home, away
 
-# Create Pie from stored dataset (remember: stored dataset is for chosen team)
+
+# The same scatter as plain arrays for assets/afl_charts.js to draw (AFL_RENDER_MODE=client):
+# dates as ISO strings (just the day when there's no time), scores as numbers
+def scoreArrays(df, colors, value, xRange=None):
+    home, away = scoreSeries(df, value)
+    series = lambda games, column: {
+        'x': np.datetime_as_string(pd.to_datetime(games['date']).to_numpy(), unit='auto').tolist(),
+        'y': games[column].tolist()}
+    return {
+        'team': value,
+        'colours': colors,
+        'webgl': useWebGL(len(home.index) + len(away.index)),
+        'home': series(home, 'homeTeamScore'),
+        'away': series(away, 'awayTeamScore'),
+        'xRange': list(xRange) if xRange is not None else None,
+    }
+
+
+# Create scatter from stored dataset (remember: stored dataset is for chosen team)
+# A new team or date range only sends the new trace data, colours and titles
 @callback(
-    Output('graph-pie-WLD', 'children'), # Pie
+    Output('store-scatter-arrays', 'data') if CLIENT_RENDER else Output('figure-scatter-score', 'figure'), # Scatter
+    Output('store-scatter-shown', 'data'), # Figure shown
     Input('store-team-data', 'data'), # Data storage
     Input('store-team-colour', 'data'), # Data storage
-    Input('dropdown-team', 'value') # Team choice
+    Input('dropdown-team', 'value'), # Team choice
+    Input('date-picker-range', 'start_date'), # Start date
+    Input('date-picker-range', 'end_date'), # End date
+    State('store-data-version', 'data'), # Data version the stored dataset came from
+    State('store-scatter-shown', 'data') # Figure the graph is showing
 )
-def createWDLPie(dataTeam, dataColour, value):
-    df = pd.DataFrame(dataTeam) # Get the stored dataframe (for the home team)
-    df_colour = pd.DataFrame(dataColour)
-    
-    # Get home data
-    df_home = df.loc[(df['homeTeam']==value)]
-    df_home_W = df_home.loc[(df_home['homeTeamScore']>df_home['awayTeamScore'])]
-    home_games = len(df_home.index)
-    home_wins = len(df_home_W.index)
-    
-    # Get away data
-    df_away = df.loc[(df['awayTeam']==value)]
-    df_away_W = df_away.loc[(df_away['awayTeamScore']>df_away['homeTeamScore'])]
-    away_games = len(df_away.index)
-    away_wins = len(df_away_W.index)
-    
-    # Get draw data
-    df_home_away = df.loc[(df['homeTeam']==value) | (df['awayTeam']==value)]
-    df_D = df_home_away.loc[(df_home_away['homeTeamScore']==df_home_away['awayTeamScore'])]
-    draws = len(df_D.index)
+def createHAScoreScatter(dataTeam, dataColour, value, start_date, end_date, version, shown):
+    key = ('scatter', value, dayKey(start_date), dayKey(end_date), version)
+    fig = figureCache.get(key)
+    if fig is None: # Not seen these inputs before, do the pandas and plotly work
+        if not dataTeam: # Data still loading
+            raise PreventUpdate
+
+        df = readStore(dataTeam) # Get the stored dataframe (for the home team)
+        df = sliceDateRange(df, start_date, end_date) # Filter the date range (inclusive)
+
+        # Get team colours to display 
+        colors = dataColour
+
+        callbackMetrics.enterPhase('figure')
+        fig = scoreArrays(df, colors, value) if CLIENT_RENDER else scoreScatter(df, colors, value)
+        fig = figureCache.put(key, fig)
+    if CLIENT_RENDER: # Just the arrays, the browser draws them
+        return fig, None
+    return figureUpdate(figureCache, shown, fig), list(key)
+
+
+# Redraw the scatter for the range zoomed into, at full resolution once it fits in the budget
+@callback(
+    Output('store-scatter-arrays', 'data', allow_duplicate=True) if CLIENT_RENDER
+    else Output('figure-scatter-score', 'figure', allow_duplicate=True), # Scatter
+    Output('store-scatter-shown', 'data', allow_duplicate=True), # Figure shown (none of the cached ones)
+    Input('figure-scatter-score', 'relayoutData'), # Zoom and pan
+    State('store-team-data', 'data'), # Data storage
+    State('store-team-colour', 'data'), # Data storage
+    State('dropdown-team', 'value'), # Team choice
+    State('date-picker-range', 'start_date'), # Start date
+    State('date-picker-range', 'end_date'), # End date
+    prevent_initial_call=True
+)
+def zoomHAScoreScatter(relayoutData, dataTeam, dataColour, value, start_date, end_date):
+    xRange = zoomRange(relayoutData)
+    if xRange is None and not (relayoutData or {}).get('xaxis.autorange'):
+        raise PreventUpdate # Not a change to the dates shown (eg. the initial autosize)
+
+    df = readStore(dataTeam) # Get the stored dataframe (for the home team)
+    df = sliceDateRange(df, start_date, end_date) # Filter the date range (inclusive)
+    if xRange is not None:
+        df = sliceDateRange(df, *xRange) # Only the dates in view
+
+    callbackMetrics.enterPhase('figure')
+    if CLIENT_RENDER:
+        return scoreArrays(df, dataColour, value, xRange), None
+    return scoreScatter(df, dataColour, value, xRange), None
+
+
+# Create rating line from the chosen team's rating history, against the league's spread
+@callback(
+    Output('figure-rating', 'figure'), # Rating line
+    Output('store-rating-shown', 'data'), # Figure shown
+    Input('store-team-colour', 'data'), # Data storage
+    Input('dropdown-team', 'value'), # Team choice
+    Input('date-picker-range', 'start_date'), # Start date
+    Input('date-picker-range', 'end_date'), # End date
+    State('store-rating-shown', 'data') # Figure the graph is showing
+)
+def createRatingChart(dataColour, value, start_date, end_date, shown):
+    if not dataColour: # Data still loading
+        raise PreventUpdate
+    key = ('rating', value, dayKey(start_date), dayKey(end_date), backend.version)
+    fig = figureCache.get(key)
+    if fig is not None: # Seen these inputs before, skip the plotly work
+        return figureUpdate(figureCache, shown, fig), list(key)
+
+    # Slices of the precomputed history, nothing is recalculated here
+    (dates, ratings), (leagueDates, mean, spread) = backend.ratingHistory(value, start_date, end_date)
+    # Whole days (which plotly serializes much quicker) and one decimal place are plenty for a chart
+    dates, leagueDates = dates.astype('datetime64[D]'), leagueDates.astype('datetime64[D]')
+    ratings, mean, spread = ratings.round(1), mean.round(1), spread.round(1)
+
+    # Get team colours to display 
+    colors = dataColour
+
+    callbackMetrics.enterPhase('figure')
+    fig = go.Figure()
+    fig.add_trace(go.Scatter( # League band, one standard deviation either side of the mean
+        x=np.concatenate([leagueDates, leagueDates[::-1]]),
+        y=np.concatenate([mean + spread, (mean - spread)[::-1]]),
+        name='league (mean ± 1 sd)',
+        fill='toself',
+        fillcolor='rgba(128, 128, 128, 0.25)',
+        line=dict(width=0),
+        hoverinfo='skip'))
+    fig.add_trace(go.Scatter( # League mean
+        x=leagueDates,
+        y=mean,
+        name='league mean',
+        mode='lines',
+        line=dict(color='grey', dash='dash')))
+    fig.add_trace(go.Scatter( # Team rating after each game
+        x=dates,
+        y=ratings,
+        name=value,
+        mode='lines',
+        line=dict(color=colors[0])))
+    fig.layout.xaxis.title.text = 'date'
+    fig.layout.yaxis.title.text = 'rating'
+    fig.layout.title.text = value + ' Rating'
+    fig = figureCache.put(key, fig)
+    return figureUpdate(figureCache, shown, fig), list(key)
+
+
+# Create Pie from the chosen team's W/D/L record over the date range
+@callback(
+    Output('store-pie-counts', 'data') if CLIENT_RENDER else Output('figure-pie-WLD', 'figure'), # Pie
+    Output('store-pie-shown', 'data'), # Figure shown
+    Input('store-team-colour', 'data'), # Data storage
+    Input('dropdown-team', 'value'), # Team choice
+    Input('date-picker-range', 'start_date'), # Start date
+    Input('date-picker-range', 'end_date'), # End date
+    State('store-pie-shown', 'data') # Figure the graph is showing
+)
+def createWDLPie(dataColour, value, start_date, end_date, shown):
+    if not dataColour: # Data still loading
+        raise PreventUpdate
+    key = ('pie', value, dayKey(start_date), dayKey(end_date), backend.version)
+    fig = figureCache.get(key)
+    if fig is not None: # Seen these inputs before, skip the pandas and plotly work
+        return (fig, None) if CLIENT_RENDER else (figureUpdate(figureCache, shown, fig), list(key))
+
+    record = backend.record(value, start_date, end_date)
     
     # Create pie chart lists
     pieVals = [
-        (home_wins + away_wins),
-        (draws),
-        (home_games + away_games - home_wins - away_wins),
+        int(record['wins']),
+        int(record['draws']),
+        int(record['losses']),
     ]
+    if CLIENT_RENDER: # Just the counts and colours, the browser draws them
+        return figureCache.put(key, {'team':value, 'colours':dataColour, 'counts':pieVals}), None
     pieNames = ['W - ' + str(pieVals[0]), 'D - ' + str(pieVals[1]), 'L - ' + str(pieVals[2])]
     
     # Make piechart graph object
+    callbackMetrics.enterPhase('figure')
     fig = go.Figure()
 
     pie = go.Pie(
@@ -271,11 +656,7 @@ def createWDLPie(dataTeam, dataColour, value):
     fig.add_trace(pie)
     
     # Get team colours to display 
-    colors = [
-        df_colour.loc[(df_colour['team'] == value),'colour1'].iloc[0],  
-        df_colour.loc[(df_colour['team'] == value),'colour2'].iloc[0],
-        df_colour.loc[(df_colour['team'] == value),'colour3'].iloc[0],
-    ]
+    colors = dataColour
     
     fig.update_traces(
             hoverinfo = 'label', 
@@ -284,7 +665,207 @@ def createWDLPie(dataTeam, dataColour, value):
             marker = dict(colors=colors, line=dict(color='#000000', width=2)))
     fig.layout.title.text = value + ' W/D/L Record'
     fig.update_layout(plot_bgcolor='rgba(0, 0, 0, 0)',paper_bgcolor='rgba(0, 0, 0, 0)')
-    return dcc.Graph(figure=fig)
+    fig = figureCache.put(key, fig)
+    return figureUpdate(figureCache, shown, fig), list(key)
+
+
+# One team's part of the comparison: its home and away score traces (each thinned
+# out to its share of the point budget) and its W/D/L pie, as plain dicts that
+# plotly checks once when the figure is made. Run on comparePool, one team per
+# task; the games were already grouped by team in one pass
+def compareTeamTraces(comparison, i, colors, budget, scatterType, domain):
+    team = comparison.teams[i]
+    dates, scores, isHome = comparison.series(i)
+    traces = []
+    for side, games, symbol in (('home', isHome, 'circle'), ('away', ~isHome, 'circle-open')):
+        x, y = dates[games], scores[games]
+        x, y = x[~np.isnan(y)], y[~np.isnan(y)] # No score, no point
+        keep = lttbIndices(x, y, budget)
+        traces.append(dict(
+            type=scatterType,
+            x=x[keep].astype('datetime64[D]'), # Whole days (which plotly serializes much quicker)
+            y=y[keep],
+            name=team + ' ' + side,
+            legendgroup=team, # Click a team in the legend to hide both its traces
+            mode='markers',
+            marker=dict(color=colors[0], symbol=symbol)))
+
+    record = comparison.record(i)
+    pie = dict(
+        type='pie',
+        labels=['W', 'D', 'L'],
+        values=[record['wins'], record['draws'], record['losses']],
+        name=team,
+        sort=False,
+        domain=domain,
+        hoverinfo='label+value',
+        textinfo='label+percent',
+        textfont_size=14,
+        showlegend=False,
+        marker=dict(colors=colors, line=dict(color='#000000', width=2)))
+    return traces, pie
+
+
+# Compare several teams: home and away scores overlaid on one scatter and a
+# grid of W/D/L pies. One backend call groups every team's games at once, then
+# each team's traces are built on the thread pool; the scatter's point budget
+# is split between the teams, so eight teams send about as much as one
+@callback(
+    Output('figure-compare-scatter', 'figure'), # Comparison scatter
+    Output('figure-compare-pie', 'figure'), # Comparison pies
+    Output('store-compare-scatter-shown', 'data'), # Figure shown
+    Output('store-compare-pie-shown', 'data'), # Figure shown
+    Input('dropdown-compare-teams', 'value'), # Teams to compare
+    Input('date-picker-range', 'start_date'), # Start date
+    Input('date-picker-range', 'end_date'), # End date
+    Input('store-data-version', 'data'), # Data version
+    State('store-compare-scatter-shown', 'data'), # Figure the graph is showing
+    State('store-compare-pie-shown', 'data') # Figure the graph is showing
+)
+def createComparison(teams, start_date, end_date, version, scatterShown, pieShown):
+    if version is None: # Data still loading
+        raise PreventUpdate
+    if not teams: # Nothing chosen: blank charts (if they aren't already)
+        if scatterShown is None and pieShown is None:
+            raise PreventUpdate
+        return go.Figure(), go.Figure(), None, None
+    window = ('|'.join(teams), dayKey(start_date), dayKey(end_date), backend.version)
+    scatterKey, pieKey = ('compare-scatter',) + window, ('compare-pie',) + window
+    scatter, pies = figureCache.get(scatterKey), figureCache.get(pieKey)
+    if scatter is None or pies is None: # Not seen these inputs before, do the numpy and plotly work
+        comparison = backend.compareTeams(teams, start_date, end_date)
+
+        # Split the point budget between the teams' home and away traces
+        budget = config.MAX_POINTS and max(config.MAX_POINTS // (2 * len(teams)), 3)
+        sides = np.concatenate([comparison.homeGames, comparison.awayGames])
+        points = int(np.minimum(sides, budget).sum()) if budget else int(sides.sum())
+        scatterType = 'scattergl' if useWebGL(points) else 'scatter'
+        # Pies in a grid of up to four across, top row first
+        cols = min(len(teams), 4)
+        rows = -(-len(teams) // cols)
+        domain = lambda i: dict(x=[(i % cols) / cols + 0.02, (i % cols + 1) / cols - 0.02],
+                                y=[1 - (i // cols + 1) / rows + 0.08, 1 - (i // cols) / rows - 0.08])
+
+        callbackMetrics.enterPhase('figure')
+        parts = list(comparePool.map(
+            lambda i: compareTeamTraces(comparison, i, backend.teamColours(teams[i]), budget, scatterType, domain(i)),
+            range(len(teams))))
+
+        scatter = go.Figure([trace for traces, pie in parts for trace in traces])
+        scatter.layout.xaxis.title.text = 'date'
+        scatter.layout.yaxis.title.text = 'total score'
+        scatter.layout.title.text = 'Home (filled) and Away (open) Scores'
+        scatter.layout.uirevision = window[0] # Keep zoom and legend choices for the same teams
+        scatter = figureCache.put(scatterKey, scatter)
+
+        pies = go.Figure([pie for traces, pie in parts])
+        pies.layout.annotations = [ # Team name over each pie
+            dict(text=team, x=sum(domain(i)['x']) / 2, y=domain(i)['y'][1], xref='paper', yref='paper',
+                 xanchor='center', yanchor='bottom', showarrow=False, font=dict(size=16))
+            for i, team in enumerate(teams)]
+        pies.layout.title.text = 'W/D/L Records'
+        pies.layout.height = 350 * rows
+        pies.update_layout(plot_bgcolor='rgba(0, 0, 0, 0)',paper_bgcolor='rgba(0, 0, 0, 0)')
+        pies = figureCache.put(pieKey, pies)
+    return (figureUpdate(figureCache, scatterShown, scatter), figureUpdate(figureCache, pieShown, pies),
+            list(scatterKey), list(pieKey))
+
+
+# Create head to head heatmap (every team against every other) from the matrix for the date range
+@callback(
+    Output('figure-h2h', 'figure'), # Heatmap
+    Output('store-h2h-shown', 'data'), # Figure shown
+    Input('radio-h2h-metric', 'value'), # Win % or average margin
+    Input('date-picker-range', 'start_date'), # Start date
+    Input('date-picker-range', 'end_date'), # End date
+    Input('store-data-version', 'data'), # Data version
+    State('store-h2h-shown', 'data') # Figure the graph is showing
+)
+def createHeadToHead(metric, start_date, end_date, version, shown):
+    if version is None: # Data still loading
+        raise PreventUpdate
+    key = ('h2h', metric, dayKey(start_date), dayKey(end_date), backend.version)
+    fig = figureCache.get(key)
+    if fig is not None: # Seen these inputs before, skip the numpy and plotly work
+        return figureUpdate(figureCache, shown, fig), list(key)
+
+    h2h = backend.headToHead(start_date, end_date)
+    
+    # Make heatmap graph object, rows are the team and columns the opponent
+    callbackMetrics.enterPhase('figure')
+    if metric == 'avgMargin':
+        z, title, middle = h2h.avgMargin, 'Average margin', 0
+    else:
+        z, title, middle = h2h.winRate * 100, 'Win %', 50
+    heatmap = go.Heatmap(
+        z=z,
+        x=h2h.teams,
+        y=h2h.teams,
+        zmid=middle, # Even records in white
+        colorscale='RdBu',
+        colorbar=dict(title=title),
+        customdata=np.dstack([h2h.wins, h2h.draws, h2h.losses, h2h.avgMargin]),
+        hovertemplate='%{y} v %{x}<br>W %{customdata[0]} D %{customdata[1]} L %{customdata[2]}'
+                      '<br>Average margin %{customdata[3]:.1f}<extra></extra>')
+
+    fig = go.Figure(heatmap)
+    fig.layout.xaxis.title.text = 'opponent'
+    fig.layout.yaxis.title.text = 'team'
+    fig.layout.yaxis.autorange = 'reversed' # Alphabetical from the top
+    fig.layout.title.text = 'Head to Head ' + title
+    fig.layout.height = 700
+    fig = figureCache.put(key, fig)
+    return figureUpdate(figureCache, shown, fig), list(key)
+
+
+# Stats the league leaders can be ranked by, once the data is loaded
+@callback(
+    Output('dropdown-leader-stat', 'options'), # Stat choice
+    Input('store-data-version', 'data') # Data version
+)
+def updateLeaderStats(version):
+    if version is None: # Data still loading
+        raise PreventUpdate
+    return [{'label':i, 'value':i} for i in backend.statColumns()]
+
+
+# League leaders table for the stat over the seasons in the date range
+# (running totals and a partial sort, not a groupby over every stat row)
+@callback(
+    Output('table-leaders', 'children'), # Table
+    Input('dropdown-leader-stat', 'value'), # Stat choice
+    Input('radio-leader-mode', 'value'), # Per game or total
+    Input('input-leader-min-games', 'value'), # Minimum games
+    Input('date-picker-range', 'start_date'), # Start date
+    Input('date-picker-range', 'end_date'), # End date
+    Input('store-data-version', 'data') # Data version
+)
+def createLeaderTable(stat, mode, minGames, start_date, end_date, version):
+    if version is None or not stat: # Data still loading
+        raise PreventUpdate
+    leaders = backend.leaders(stat, seasonOf(start_date), seasonOf(end_date), 20, # Top 20
+                              minGames or 1, mode == 'perGame')
+
+    return dash_table.DataTable(
+        data=leaders.to_dict('records'),
+        columns=[{'name':i, 'id':i} for i in leaders.columns],
+        style_cell={'textAlign':'left', 'fontSize':16},
+        style_header={'fontWeight':'bold'})
+
+# Draw the scatter and pie in the browser from the arrays (assets/afl_charts.js)
+if CLIENT_RENDER:
+    app.clientside_callback(
+        ClientsideFunction(namespace='afl', function_name='scoreScatter'),
+        Output('figure-scatter-score', 'figure'), # Scatter
+        Input('store-scatter-arrays', 'data'), # Chart arrays
+        State('store-figure-template', 'data') # Plotly template
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace='afl', function_name='wdlPie'),
+        Output('figure-pie-WLD', 'figure'), # Pie
+        Input('store-pie-counts', 'data'), # W/D/L counts
+        State('store-figure-template', 'data') # Plotly template
+    )
 
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
@@ -1,26 +1,51 @@
-from dash import Dash, html, dcc, Output, Input, callback, dash_table
+from dash import Dash, html, dcc, Output, Input, State, callback, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import pandas as pd
-import plotly.express as px
+import numpy as np
+from afl import config
+from afl.dataset import TeamDataset
+from afl.dates import dayKey, sliceDateRange
+from afl.downsample import bin2d, downsampleSeries, isBinnable, needsDownsampling, useWebGL, zoomRange
+from afl.figcache import FigureCache
+from afl.patch import figureUpdate
+from afl.reload import LiveData
+from afl.startup import READY_POLL_MS, BackgroundLoad, addReadyRoute
+from afl.wire import encode, decode
 
 app = Dash(__name__, 
            external_stylesheets=[dbc.themes.BOOTSTRAP])
 
 # Read datafiles and produce data frames
-df_games = pd.read_csv('/Users/nllama/Documents/games.csv')
-# Add in columns that will be filled later
-df_games["team"] = "Hawthorn"
-df_games["teamScore"] = 123
-# Reorder based on date
-df_games["date"] = pd.to_datetime(df_games["date"])
-df_games = df_games.sort_values(by="date")
-# Create df of unique teams and column headings
-df_teamList = pd.DataFrame({
-    'teams' : df_games['homeTeam'].unique(),
-})
-df_colNames = pd.DataFrame({
-    'cols' : df_games.columns
-})
+def buildDataset(frames, version):
+    df_games = frames['games']
+    # Add in columns that will be filled later
+    df_games = df_games.assign(team="Hawthorn", teamScore=123)
+    # Reorder based on date
+    df_games["date"] = pd.to_datetime(df_games["date"])
+    df_games = df_games.sort_values(by="date", kind="mergesort")
+    # Index games by team once, so store_data doesn't scan the whole league
+    # (only the index, none of V2's engines)
+    return TeamDataset(df_games, version=version)
+
+# Finished figures, shared by every user of this process
+figureCache = FigureCache()
+
+# Rebuilt and swapped in when new rounds are appended to the file (AFL_RELOAD_S)
+def openData():
+    live = LiveData(['games'], buildDataset)
+    live.onSwap(lambda dataset: figureCache.invalidate())
+    live.start()
+    return live
+
+# Opened on a background thread with AFL_LAZY_START=1, so the layout is
+# served as a shell straight away (checkDataVersion fills it in)
+loading = BackgroundLoad(openData, background=config.LAZY_START)
+addReadyRoute(app.server, lambda: loading.ready)
+initial = loading.value.current if loading.ready else None # Data at start-up, for the layout
+# Unique teams and column headings
+teamList = initial.teams if initial else []
+colNames = list(initial.games.columns) if initial else []
 
 app.layout = html.Div([
     dbc.Row(
@@ -35,7 +60,7 @@ app.layout = html.Div([
                 "Choose a home side: ", dcc.Dropdown( # Drop down menu for home team
                 id='dropdown-home-team', 
                 value='Richmond', 
-                options=[{'label':i, 'value':i} for i in df_teamList['teams'].unique()])
+                options=[{'label':i, 'value':i} for i in teamList])
             ]), 
         width={'size':3, 'offset':2}), # this means 4 columns wide (each page is made of 12 columns)
         
@@ -44,7 +69,7 @@ app.layout = html.Div([
                 "Choose x axis: ", dcc.Dropdown( # Drop down menu for x column
                 id='dropdown-x-axis', 
                 value='date', 
-                options=[{'label':i, 'value':i} for i in df_colNames['cols'].unique()])
+                options=[{'label':i, 'value':i} for i in colNames])
             ]),
         width={'size':3}),
         
@@ -53,7 +78,7 @@ app.layout = html.Div([
                 "Choose y axis: ", dcc.Dropdown( # Drop down menu for y column
                 id='dropdown-y-axis', 
                 value='homeTeamScore', 
-                options=[{'label':i, 'value':i} for i in df_colNames['cols'].unique()])
+                options=[{'label':i, 'value':i} for i in colNames])
             ]),
         width={'size':3})
     ]),
@@ -63,62 +88,177 @@ app.layout = html.Div([
             html.Div([   
                 "Choose a date range: ", dcc.DatePickerRange( # Date range picker
                 id='date-picker-range',
-                min_date_allowed=df_games.iloc[0]['date'],
-                max_date_allowed=df_games.iloc[-1]['date'],
-                initial_visible_month=df_games.iloc[0]['date'],
-                start_date=df_games.iloc[0]['date'],
-                end_date=df_games.iloc[-1]['date'])
+                min_date_allowed=initial.firstDate if initial else None,
+                max_date_allowed=initial.lastDate if initial else None,
+                initial_visible_month=initial.firstDate if initial else None,
+                start_date=initial.firstDate if initial else None,
+                end_date=initial.lastDate if initial else None)
             ], style={'margin':'15px'}), # gives a border around the date range picker
         width={'size':5, 'offset':4})
     ]),
 
     dbc.Row(
         dbc.Col(
-            html.Div( # Graph
-                html.Div(id='test-graph', children=[]), 
+            html.Div( # Loading message (only while the data loads in the background)
+                id='data-status',
+                children='' if initial else 'Loading data...',
+                style={'textAlign':'center'})
+        )
+    ),
+
+    dbc.Row(
+        dbc.Col(
+            html.Div( # Graph (stays in the layout, callbacks only send what changed)
+                html.Div(id='test-graph', children=[dcc.Graph(id='test-graph-figure')]), 
             )
         )
     ),
 
     # dcc.Store inside the user's current browser session
-    dcc.Store(id='store-data', data=[], storage_type='memory') # 'local' or 'session'
+    dcc.Store(id='store-data', data=[], storage_type='memory'), # 'local' or 'session'
+    # Figure cache key of what the graph is showing (None when it's zoomed or empty)
+    dcc.Store(id='store-graph-shown', data=None, storage_type='memory'),
+
+    # Data version the page is showing, checked against the server's for reloads
+    # (None until the data is loaded, the interval polls quicker until then)
+    dcc.Store(id='store-data-version', data=initial.version if initial else None, storage_type='memory'),
+    dcc.Interval(id='interval-data-version', 
+                 interval=max(config.RELOAD_S, 1)*1000 if initial else READY_POLL_MS, 
+                 disabled=initial is not None and not config.RELOAD_S)
 ])
 
 
 # Store dataframe of all game data (df_games)
 @callback(
     Output('store-data', 'data'), # Data storage
-    Input('dropdown-home-team', 'value') # Dropdown
+    Input('dropdown-home-team', 'value'), # Dropdown
+    Input('store-data-version', 'data') # Data version
 )
-def store_data(value):
-    dataset = df_games.loc[(df_games['homeTeam'] == value) | (df_games['awayTeam'] == value)] # Store the dataset for the team selected
+def store_data(value, version):
+    if version is None: # Data still loading
+        raise PreventUpdate
+    dataset = loading.wait().current.teamIndex.teamGames(value) # Store the dataset for the team selected
     dataset["team"] = value
-    # Set score if home
-    mask = dataset['homeTeam']==value
-    dataset.loc[mask, 'teamScore'] = dataset.loc[mask, 'homeTeamScore']
-    # Set score if away
-    mask = dataset['homeTeam']!=value
-    dataset.loc[mask, 'teamScore'] = dataset.loc[mask, 'awayTeamScore']
-    return dataset.to_dict()
+    # Set score from the home or away column depending on where the team played
+    dataset["teamScore"] = np.where(dataset['homeTeam']==value, dataset['homeTeamScore'], dataset['awayTeamScore'])
+    return encode(dataset)
 
 
-# Create graph from store df_games
+# Pick up loaded or reloaded data: new teams in the drop down and new dates in the date picker
+# (the first time, on a page served before the data was ready, the columns and whole date range too)
 @callback(
-    Output('test-graph', 'children'), # Graph
+    Output('dropdown-home-team', 'options'), # Dropdown
+    Output('date-picker-range', 'min_date_allowed'), # Date range
+    Output('date-picker-range', 'max_date_allowed'), # Date range
+    Output('store-data-version', 'data'), # Data version
+    Output('dropdown-x-axis', 'options'), # x-axis choice
+    Output('dropdown-y-axis', 'options'), # y-axis choice
+    Output('date-picker-range', 'start_date'), # Start date
+    Output('date-picker-range', 'end_date'), # End date
+    Output('interval-data-version', 'interval'), # Polling timer
+    Output('interval-data-version', 'disabled'), # Polling timer
+    Output('data-status', 'children'), # Loading message
+    Input('interval-data-version', 'n_intervals'), # Polling timer
+    State('store-data-version', 'data') # Data version the page has
+)
+def checkDataVersion(n, version):
+    if not loading.ready: # Still loading
+        raise PreventUpdate
+    current = loading.value.current
+    if version == current.version:
+        raise PreventUpdate
+    options = [{'label':i, 'value':i} for i in current.teams]
+    if version is not None:
+        return (options, current.firstDate, current.lastDate, current.version) + (no_update,) * 7
+    # First data for this page: poll at the reload interval from now on (if at all)
+    columns = [{'label':i, 'value':i} for i in current.games.columns]
+    return (options, current.firstDate, current.lastDate, current.version, columns, columns,
+            current.firstDate, current.lastDate, max(config.RELOAD_S, 1)*1000, not config.RELOAD_S, '')
+
+
+# Scatter of any column against any other for the stored dataset
+# Long histories are thinned out to about AFL_MAX_POINTS points (a date x axis
+# keeps the shape of the series, two numeric axes are binned into a grid) and
+# drawn with WebGL; columns of text are always drawn in full
+def axisFigure(df, x_axis, y_axis, xRange=None, yRange=None):
+    df = df.sort_values(by=x_axis)
+    color = None
+    if needsDownsampling(len(df.index)) and isBinnable(df[y_axis]):
+        if pd.api.types.is_datetime64_any_dtype(df[x_axis]):
+            df = downsampleSeries(df, x_axis, y_axis)
+        elif isBinnable(df[x_axis]):
+            df = bin2d(df, x_axis, y_axis)
+            color = 'count' # Rows in each cell
+    import plotly.express as px # Only loaded when the first chart is drawn
+    fig1 = px.scatter(df, x=x_axis, y=y_axis, color=color,
+                      render_mode='webgl' if useWebGL(len(df.index)) else 'svg')
+    fig1.layout.uirevision = x_axis + '/' + y_axis # Keep zoom while the figure is swapped
+    if xRange is not None:
+        fig1.layout.xaxis.range = list(xRange)
+    if yRange is not None:
+        fig1.layout.yaxis.range = list(yRange)
+    return fig1
+
+
+# Rows inside a zoomed axis range (numbers and dates only, text axes are left as they are)
+def inRange(df, column, axisRange):
+    if axisRange is None or not isBinnable(df[column]):
+        return df
+    values = df[column]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        low, high = pd.Timestamp(axisRange[0]), pd.Timestamp(axisRange[1])
+    else:
+        low, high = float(axisRange[0]), float(axisRange[1])
+    return df[(values >= low) & (values <= high)]
+
+
+# Create graph from store df_games (only the parts that changed are sent, eg.
+# the x/y data for a new date range, the trace and titles for a new axis)
+@callback(
+    Output('test-graph-figure', 'figure'), # Graph
+    Output('store-graph-shown', 'data'), # Figure shown
     Input('store-data', 'data'), # Data storage
     Input('date-picker-range', 'start_date'), # Start date
     Input('date-picker-range', 'end_date'), # End date
     Input('dropdown-x-axis', 'value'), # x-axis choice
-    Input('dropdown-y-axis', 'value') # y-axis choice
+    Input('dropdown-y-axis', 'value'), # y-axis choice
+    State('dropdown-home-team', 'value'), # Team the stored data is for
+    State('store-data-version', 'data'), # Data version the stored data came from
+    State('store-graph-shown', 'data') # Figure the graph is showing
 )
-def createGraph(data, start_date, end_date, x_axis, y_axis):
-    df = pd.DataFrame(data)                                                # Get the stored dataframe (for the home team)
-    df = df[                                                          # Filter the date range
-        (df['date'] > start_date) & 
-        (df['date'] < end_date)]  
-    df = df.sort_values(by=x_axis)
-    fig1 = px.scatter(df, x=x_axis, y=y_axis)
-    return dcc.Graph(figure=fig1)
+def createGraph(data, start_date, end_date, x_axis, y_axis, team, version, shown):
+    key = ('axis', team, dayKey(start_date), dayKey(end_date), x_axis, y_axis, version)
+    fig1 = figureCache.get(key)
+    if fig1 is None: # Not seen these inputs before, do the pandas and plotly work
+        if not data: # Data still loading
+            raise PreventUpdate
+        df = decode(data)                                                  # Get the stored dataframe (for the home team)
+        df = sliceDateRange(df, start_date, end_date)                      # Filter the date range (inclusive)
+        fig1 = axisFigure(df, x_axis, y_axis)
+        fig1 = figureCache.put(key, fig1)
+    return figureUpdate(figureCache, shown, fig1), list(key)
+
+
+# Redraw the graph for the ranges zoomed into, at full resolution once they fit in the budget
+@callback(
+    Output('test-graph-figure', 'figure', allow_duplicate=True), # Graph
+    Output('store-graph-shown', 'data', allow_duplicate=True), # Figure shown (none of the cached ones)
+    Input('test-graph-figure', 'relayoutData'), # Zoom and pan
+    State('store-data', 'data'), # Data storage
+    State('date-picker-range', 'start_date'), # Start date
+    State('date-picker-range', 'end_date'), # End date
+    State('dropdown-x-axis', 'value'), # x-axis choice
+    State('dropdown-y-axis', 'value'), # y-axis choice
+    prevent_initial_call=True
+)
+def zoomGraph(relayoutData, data, start_date, end_date, x_axis, y_axis):
+    xRange, yRange = zoomRange(relayoutData, 'xaxis'), zoomRange(relayoutData, 'yaxis')
+    if xRange is None and yRange is None and not (relayoutData or {}).get('xaxis.autorange'):
+        raise PreventUpdate # Not a change to the ranges shown (eg. the initial autosize)
+    df = decode(data)                                                      # Get the stored dataframe (for the home team)
+    df = sliceDateRange(df, start_date, end_date)                          # Filter the date range (inclusive)
+    df = inRange(inRange(df, x_axis, xRange), y_axis, yRange)              # Only what's in view
+    return axisFigure(df, x_axis, y_axis, xRange, yRange), None
 
 
 if __name__ == '__main__':
@@ -1,10 +1,14 @@
 from dash import Dash, html, dcc, Output, Input, callback, dash_table
 import pandas as pd
 import plotly.express as px
+from afl.loader import loadTable
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 app = Dash(__name__, external_stylesheets=external_stylesheets)
 
+# Read datafiles and produce data frames (once, not on every callback)
+df_games = loadTable('games')
+
 app.layout = html.Div([
     html.H1('Sharing Data between callbacks', style={'textAlign':'center'}),
     html.Div([
@@ -28,9 +32,6 @@ app.layout = html.Div([
     Input('data-set-chosen', 'value')
 )
 def store_data(value):
-    # Read datafiles and produce data frames
-    df_games = pd.read_csv('/Users/nllama/Documents/games.csv')
-
     dataset = df_games.loc[df_games['homeTeam'] == value]
 
     return dataset.to_dict()
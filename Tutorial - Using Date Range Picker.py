@@ -1,11 +1,14 @@
 from dash import Dash, html, dcc, Output, Input, callback, dash_table
 import pandas as pd
 import plotly.express as px
+from afl.dates import sliceDateRange
+from afl.loader import loadTable
+from afl.wire import encode, decode
 
 app = Dash(__name__)
 
 # Read datafiles and produce data frames
-df_games = pd.read_csv('/Users/nllama/Documents/games.csv')
+df_games = loadTable('games')
 # Reorder based on date
 df_games["date"] = pd.to_datetime(df_games["date"])
 df_games = df_games.sort_values(by="date")
@@ -51,7 +54,7 @@ app.layout = html.Div([
 )
 def store_data(value):
     dataset = df_games.loc[df_games['homeTeam'] == value]                       # Store the dataset for the home team selected
-    return dataset.to_dict()
+    return encode(dataset)
 
 
 # Create graph from store df_games
@@ -62,10 +65,8 @@ def store_data(value):
     Input('date-picker-range', 'end_date') # End date
 )
 def createGraph(data, start_date, end_date):
-    home_df = pd.DataFrame(data)                                                # Get the stored dataframe (for the home team)
-    home_df = home_df[                                                          # Filter the date range
-        (home_df['date'] > start_date) & 
-        (home_df['date'] < end_date)]
+    home_df = decode(data)                                                      # Get the stored dataframe (for the home team)
+    home_df = sliceDateRange(home_df, start_date, end_date)                     # Filter the date range (inclusive)
     score = home_df['homeTeamScore']
     dates = home_df['date']        
     fig1 = px.scatter(x=dates, y=score)
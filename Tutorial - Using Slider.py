@@ -1,12 +1,13 @@
 from dash import Dash, html, dcc, Output, Input, callback, dash_table
 import pandas as pd
 import plotly.express as px
+from afl.loader import loadTable
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 app = Dash(__name__, external_stylesheets=external_stylesheets)
 
 # Read datafiles and produce data frames
-df_games = pd.read_csv('/Users/nllama/Documents/games.csv')
+df_games = loadTable('games')
 # Reorder based on date
 df_games["date"] = pd.to_datetime(df_games["date"])
 df_games = df_games.sort_values(by="date")
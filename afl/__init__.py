@@ -0,0 +1 @@
+# Helper modules shared by the dashboard scripts
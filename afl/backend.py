@@ -0,0 +1,503 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from afl import config
+from afl.compare import Comparison
+from afl.dataset import Dataset
+from afl.dates import sliceDateRange, windowBounds
+from afl.h2h import HeadToHead
+from afl.leaders import LeaderBoard
+from afl.loader import SCHEMAS, TABLE_ORDER, readCsvChunks, sourcePath
+from afl.players import NOT_STATS, Player
+from afl.ratings import RatingEngine
+from afl.search import PlayerSearch
+from afl.reload import LiveData
+from afl.startup import BackgroundLoad
+
+#### Data Access ####
+# The V2 callbacks get their data through a backend rather than filtering
+# data frames themselves, so where the data lives is a setting (AFL_BACKEND)
+# and the two can be benchmarked against each other on the same data:
+#   pandas : all three files in memory, with the team index, results engine
+#            and career table built at start-up (and again on a reload)
+#   sqlite : the files loaded once into an indexed SQLite database next to the
+#            binary cache; every call is an indexed query for just the columns
+#            it needs, so only query results are held in memory
+# Both return the same rows in the same order.
+
+TABLES = ['games', 'stats', 'clubcolours']
+
+# Columns each callback uses, so only those are read and sent to the browser
+GAME_COLUMNS = ['date', 'homeTeam', 'homeTeamScore', 'awayTeam', 'awayTeamScore'] # Score scatter
+PLAYER_COLUMNS = ['team', 'displayName'] # Player list
+
+EXPORT_ROWS = 20000 # Rows per block when streaming a download
+
+
+class PandasBackend:
+    name = 'pandas'
+    ready = True
+
+    def __init__(self, dataDir=None):
+        self.live = LiveData(TABLES, self.build, dataDir)
+
+    def build(self, frames, version):
+        live = getattr(self, 'live', None) # Not there yet for the first build
+        return Dataset(frames['games'], frames['stats'], frames['clubcolours'], version,
+                       previous=live.current if live is not None else None)
+
+    @property
+    def version(self):
+        return self.live.current.version
+
+    # Call listener(version) after a reload swaps in new data
+    def onSwap(self, listener):
+        self.live.onSwap(lambda dataset: listener(dataset.version))
+
+    def start(self):
+        self.live.start()
+
+    def teams(self):
+        return self.live.current.teams
+
+    # First and last game dates
+    def dateRange(self):
+        current = self.live.current
+        return current.firstDate, current.lastDate
+
+    # Number of rows in each table
+    def counts(self):
+        current = self.live.current
+        return {'games': len(current.games.index), 'stats': len(current.stats.index)}
+
+    # The team's games (home and away) in date order
+    def teamGames(self, team, columns=None):
+        return self.live.current.teamIndex.teamGames(team, columns)
+
+    # The team's stat rows in file order
+    def teamStats(self, team, columns=None):
+        return self.live.current.teamIndex.teamStats(team, columns)
+
+    def teamColours(self, team):
+        return self.live.current.teamColours.get(team, [None, None, None])
+
+    # Player card, or None if they never played for the team
+    def player(self, team, name):
+        return self.live.current.careers.player(team, name)
+
+    # W/D/L record between two dates (inclusive, None = open ended)
+    def record(self, team, start_date=None, end_date=None):
+        return self.live.current.results.record(team, start_date, end_date)
+
+    # Up to limit (team, player) pairs league-wide matching the search text, best first
+    def searchPlayers(self, query, limit=20):
+        return self.live.current.playerSearch.search(query, limit)
+
+    # Every team's record against every other team between two dates (a HeadToHead)
+    def headToHead(self, start_date=None, end_date=None):
+        return self.live.current.headToHead.matrix(start_date, end_date)
+
+    # The teams' games and W/D/L records side by side between two dates (a Comparison)
+    def compareTeams(self, teams, start_date=None, end_date=None):
+        return self.live.current.comparison.compare(teams, start_date, end_date)
+
+    # The team's (dates, ratings) and the league's (dates, mean, standard deviation) between two dates
+    def ratingHistory(self, team, start_date=None, end_date=None):
+        ratings = self.live.current.ratings
+        return ratings.history(team, start_date, end_date), ratings.leagueHistory(start_date, end_date)
+
+    # Stat columns a leaderboard can rank by
+    def statColumns(self):
+        return self.live.current.leaders.columns
+
+    # League leaders for a stat over seasons first..last (a data frame, best first)
+    def leaders(self, column, first=None, last=None, k=20, minGames=1, perGame=False):
+        return self.live.current.leaders.top(column, first, last, k, minGames, perGame)
+
+    # Every column of the team's games (or the whole league's) between two dates,
+    # as data frames of up to rows rows (the same slices the scatter uses, no copies)
+    def exportGames(self, team=None, start_date=None, end_date=None, rows=EXPORT_ROWS):
+        current = self.live.current # One data version for the whole download
+        games = current.teamIndex.teamGames(team) if team else current.games
+        return _blocks(sliceDateRange(games, start_date, end_date), rows)
+
+    # Every column of one player's stat rows (or the team's, or the whole league's), rows at a time
+    def exportStats(self, team=None, name=None, rows=EXPORT_ROWS):
+        current = self.live.current
+        if not team:
+            return _blocks(current.stats, rows)
+        stats = current.teamIndex.teamStats(team)
+        if name:
+            stats = stats[stats['displayName'] == name]
+        return _blocks(stats, rows)
+
+
+# A data frame as positional slices of up to rows rows (always at least one, for the header)
+def _blocks(df, rows):
+    for start in range(0, max(len(df.index), 1), rows):
+        yield df.iloc[start:start + rows]
+
+
+#### SQLite ####
+# <cacheDir>/afl.sqlite is rebuilt (into a temporary file, then swapped into
+# place) whenever a CSV's mtime or size no longer matches the one it was built
+# from. Dates are stored as 'YYYY-MM-DD HH:MM:SS' text, which sorts and
+# compares in date order. Rows are stored in the loader's TABLE_ORDER (stable,
+# so ties keep file order) and rowid follows that order, so 'ORDER BY rowid'
+# gives the same rows in the same order as the pandas path.
+
+SQLITE_VERSION = 2 # Bump when the tables or indexes below change
+
+INDEXES = [
+    'CREATE INDEX games_home ON games (homeTeam, date)',
+    'CREATE INDEX games_away ON games (awayTeam, date)',
+    'CREATE INDEX games_date ON games (date)',
+    'CREATE INDEX stats_team ON stats (team)',
+    'CREATE INDEX stats_player ON stats (team, displayName)',
+    'CREATE INDEX stats_name ON stats (displayName)',
+    'CREATE INDEX clubcolours_team ON clubcolours (team)',
+]
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class SqliteBackend:
+    name = 'sqlite'
+    ready = True
+    version = 1 # Files that change are picked up when the database is rebuilt on the next start
+
+    def __init__(self, dataDir=None, path=None):
+        self.dataDir = dataDir
+        self.path = path or os.path.join(config.CACHE_DIR, 'afl.sqlite')
+        if self._sourceKeys() != self._builtFrom():
+            self._build()
+        self._local = threading.local() # sqlite3 connections can't be shared between threads
+
+        self._teams = None
+        self._allTeams = [row[0] for row in self._query( # Home or away, for the head to head
+            'SELECT homeTeam FROM games WHERE homeTeam IS NOT NULL '
+            'UNION SELECT awayTeam FROM games WHERE awayTeam IS NOT NULL')]
+        # Ratings walk every game once, so they are worked out here rather than per request
+        self._ratings = RatingEngine.fromGames(self._frame(
+            'SELECT date, homeTeam, awayTeam, homeTeamScore, awayTeamScore FROM games ORDER BY rowid', (), 'games'))
+        # Every (team, player) in the league for the player search, from the (team, displayName) index
+        self._playerSearch = PlayerSearch(self._query('SELECT DISTINCT team, displayName FROM stats'))
+        # Leaderboard running totals, from the stats summed per player per season in one query
+        stats = [col for col, kind in SCHEMAS['stats'].items() if kind in ('int', 'float') and col not in NOT_STATS]
+        self._leaders = LeaderBoard(self._frame(
+            'SELECT team, displayName, year, COUNT(*) AS games, %s FROM stats '
+            'WHERE team IS NOT NULL AND displayName IS NOT NULL AND year IS NOT NULL '
+            'GROUP BY team, displayName, year ORDER BY team, displayName, year'
+            % ', '.join('TOTAL("%s") AS "%s"' % (col, col) for col in stats), (), 'stats'))
+        self._columns = {table: [row[1] for row in self._query('PRAGMA table_info("%s")' % table)]
+                         for table in TABLES}
+
+    def onSwap(self, listener):
+        pass
+
+    def start(self):
+        pass
+
+    def teams(self):
+        if self._teams is None: # In order of first home game, as the pandas path lists them
+            teams = self._query('SELECT homeTeam FROM games WHERE homeTeam IS NOT NULL ORDER BY rowid')
+            self._teams = list(dict.fromkeys(row[0] for row in teams))
+        return self._teams
+
+    def dateRange(self):
+        first, last = self._query('SELECT MIN(date), MAX(date) FROM games')[0]
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def counts(self):
+        return {table: self._query('SELECT COUNT(*) FROM %s' % table)[0][0] for table in ('games', 'stats')}
+
+    def teamGames(self, team, columns=None):
+        sql, params = self._teamGamesQuery(team, columns)
+        return self._frame(sql, params, 'games')
+
+    # Home and away games in file order, one index range scan each ('' or a ' AND ...' date window)
+    def _teamGamesQuery(self, team, columns=None, where='', params=()):
+        select = self._select('games', columns)
+        sql = ('SELECT %s FROM (SELECT rowid AS row_, * FROM games WHERE homeTeam = ?%s '
+               'UNION ALL SELECT rowid AS row_, * FROM games WHERE awayTeam = ?%s) '
+               'ORDER BY row_' % (select, where, where))
+        return sql, [team] + list(params) + [team] + list(params)
+
+    def teamStats(self, team, columns=None):
+        select = self._select('stats', columns)
+        return self._frame('SELECT %s FROM stats WHERE team = ? ORDER BY rowid' % select,
+                           (team,), 'stats')
+
+    def teamColours(self, team):
+        rows = self._query('SELECT colour1, colour2, colour3 FROM clubcolours WHERE team = ?', (team,))
+        return list(rows[0]) if rows else [None, None, None]
+
+    def player(self, team, name):
+        games, goals, behinds, disposals, rows = self._query(
+            'SELECT MAX(gameNumber), SUM(Goals), SUM(Behinds), SUM(Disposals), COUNT(*) '
+            'FROM stats WHERE team = ? AND displayName = ?', (team, name))[0]
+        if rows == 0:
+            return None
+        if not games: # No game numbers on file, nothing to average over (as the career table)
+            return Player(name, team, 0)
+        # Same arithmetic and rounding as the career table
+        perGame = lambda total: float(np.round((total or 0) / games, 2))
+        GPG, BPG, DPG = perGame(goals), perGame(behinds), perGame(disposals)
+        return Player(name, team, games, GPG, BPG, float(np.round(GPG*6 + BPG, 2)), DPG)
+
+    def record(self, team, start_date=None, end_date=None):
+        where, params = self._dateWindow(start_date, end_date)
+        # One indexed range scan for the home games and one for the away games
+        sql = ('SELECT COUNT(*), SUM(homeTeamScore > awayTeamScore), SUM(homeTeamScore < awayTeamScore), '
+               'SUM(homeTeamScore = awayTeamScore) FROM games WHERE %s = ?' + where)
+        homeGames, homeWins, _, homeDraws = self._query(sql % 'homeTeam', [team] + params)[0]
+        awayGames, _, awayWins, awayDraws = self._query(sql % 'awayTeam', [team] + params)[0]
+
+        record = {
+            'homeGames': homeGames,
+            'homeWins': homeWins or 0, # SUM of no rows is NULL
+            'awayGames': awayGames,
+            'awayWins': awayWins or 0,
+            'draws': (homeDraws or 0) + (awayDraws or 0),
+        }
+        record['games'] = record['homeGames'] + record['awayGames']
+        record['wins'] = record['homeWins'] + record['awayWins']
+        record['losses'] = record['games'] - record['wins'] - record['draws']
+        return record
+
+    def searchPlayers(self, query, limit=20):
+        return self._playerSearch.search(query, limit)
+
+    def ratingHistory(self, team, start_date=None, end_date=None):
+        return (self._ratings.history(team, start_date, end_date),
+                self._ratings.leagueHistory(start_date, end_date))
+
+    def statColumns(self):
+        return self._leaders.columns
+
+    def leaders(self, column, first=None, last=None, k=20, minGames=1, perGame=False):
+        return self._leaders.top(column, first, last, k, minGames, perGame)
+
+    # Download blocks straight off a cursor, so only one block is in memory at a time
+    def exportGames(self, team=None, start_date=None, end_date=None, rows=EXPORT_ROWS):
+        where, params = self._dateWindow(start_date, end_date)
+        if team:
+            sql, params = self._teamGamesQuery(team, None, where, params)
+        else:
+            sql = 'SELECT %s FROM games WHERE 1%s ORDER BY rowid' % (self._select('games', None), where)
+        return self._frames(sql, params, 'games', rows)
+
+    def exportStats(self, team=None, name=None, rows=EXPORT_ROWS):
+        where, params = '', []
+        if team:
+            where, params = ' AND team = ?', [team]
+            if name:
+                where, params = where + ' AND displayName = ?', params + [name]
+        sql = 'SELECT %s FROM stats WHERE 1%s ORDER BY rowid' % (self._select('stats', None), where)
+        return self._frames(sql, params, 'stats', rows)
+
+    # One range scan of the date index for the four columns, then the same matrix build as pandas
+    def headToHead(self, start_date=None, end_date=None):
+        where, params = self._dateWindow(start_date, end_date)
+        df = self._frame('SELECT homeTeam, awayTeam, homeTeamScore, awayTeamScore FROM games '
+                         'WHERE 1' + where, params, 'games')
+        teams = pd.Index(self._allTeams)
+        return HeadToHead(self._allTeams, teams.get_indexer(df['homeTeam']), teams.get_indexer(df['awayTeam']),
+                          df['homeTeamScore'].to_numpy(dtype=np.float64), df['awayTeamScore'].to_numpy(dtype=np.float64))
+
+    # One query for every game any of the teams played (an indexed scan per side), then the same grouping as pandas
+    def compareTeams(self, teams, start_date=None, end_date=None):
+        where, params = self._dateWindow(start_date, end_date)
+        marks = ', '.join('?' * len(teams))
+        columns = 'date, homeTeam, awayTeam, homeTeamScore, awayTeamScore'
+        side = 'SELECT rowid AS row_, ' + columns + ' FROM games WHERE %s IN (' + marks + ')' + where
+        # UNION keeps a game between two of the teams once
+        sql = ('SELECT %s FROM (%s UNION %s) ORDER BY row_'
+               % (columns, side % 'homeTeam', side % 'awayTeam'))
+        df = self._frame(sql, (list(teams) + params) * 2, 'games')
+        chosen = pd.Index(teams)
+        return Comparison(teams, df['date'].to_numpy(), chosen.get_indexer(df['homeTeam']),
+                          chosen.get_indexer(df['awayTeam']), df['homeTeamScore'].to_numpy(dtype=np.float64),
+                          df['awayTeamScore'].to_numpy(dtype=np.float64))
+
+    # ' AND ...' conditions and parameters for a date window (inclusive, None = open ended)
+    def _dateWindow(self, start_date, end_date):
+        where, params = '', []
+        start, end = windowBounds(start_date, end_date)
+        if start is not None:
+            where += ' AND date >= ?'
+            params.append(start.strftime(DATE_FORMAT))
+        if end is not None:
+            where += ' AND date < ?'
+            params.append(end.strftime(DATE_FORMAT))
+        return where, params
+
+    def _connection(self):
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect('file:%s?mode=ro' % self.path, uri=True, check_same_thread=False)
+            self._local.con = con
+        return con
+
+    def _query(self, sql, params=()):
+        return self._connection().execute(sql, params).fetchall()
+
+    def _select(self, table, columns):
+        return ', '.join('"%s"' % col for col in (columns or self._columns[table]))
+
+    # Query result as a data frame with the schema's types (dates parsed)
+    def _frame(self, sql, params, table):
+        return _parseDates(pd.read_sql_query(sql, self._connection(), params=params), table)
+
+    # Query result as data frames of up to rows rows (always at least one, for the header)
+    def _frames(self, sql, params, table, rows):
+        cursor = self._connection().execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        first = True
+        while True:
+            block = cursor.fetchmany(rows)
+            if not block and not first:
+                break
+            yield _parseDates(pd.DataFrame.from_records(block, columns=columns), table)
+            first = False
+
+    def _sourceKeys(self):
+        keys = {}
+        for table in TABLES:
+            stat = os.stat(sourcePath(table, self.dataDir))
+            keys[table] = [stat.st_mtime, stat.st_size]
+        return {'version': SQLITE_VERSION, 'sources': keys}
+
+    # The source keys the database on disk was built from (None if there isn't one)
+    def _builtFrom(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            con = sqlite3.connect('file:%s?mode=ro' % self.path, uri=True)
+            try:
+                return json.loads(con.execute("SELECT value FROM meta WHERE key = 'built_from'").fetchone()[0])
+            finally:
+                con.close()
+        except (sqlite3.Error, TypeError, ValueError):
+            return None
+
+    # Load the CSVs a block at a time into a staging database, copy each table
+    # into a new database in its TABLE_ORDER (so one team's stat rows sit
+    # together on disk), index it, then swap it into place
+    def _build(self):
+        keys = self._sourceKeys()
+        folder = os.path.dirname(self.path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=folder, prefix='.tmp-', suffix='.sqlite')
+        os.close(fd)
+        loadPath = tmpPath + '.load'
+        try:
+            load = sqlite3.connect(loadPath)
+            for table in TABLES:
+                for df in readCsvChunks(table, sourcePath(table, self.dataDir)):
+                    for col in df.columns:
+                        if pd.api.types.is_datetime64_any_dtype(df[col]):
+                            df[col] = df[col].dt.strftime(DATE_FORMAT)
+                    df.to_sql(table, load, if_exists='append', index=False)
+            load.commit()
+            load.close()
+
+            con = sqlite3.connect(tmpPath)
+            con.execute('ATTACH DATABASE ? AS load', (loadPath,))
+            for table in TABLES:
+                order = ''.join('"%s", ' % col for col in TABLE_ORDER.get(table, []))
+                con.execute('CREATE TABLE %s AS SELECT * FROM load.%s ORDER BY %srowid' % (table, table, order))
+            con.commit()
+            con.execute('DETACH DATABASE load')
+            for sql in INDEXES:
+                con.execute(sql)
+            con.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+            con.execute("INSERT INTO meta VALUES ('built_from', ?)", (json.dumps(keys),))
+            con.commit()
+            con.execute('ANALYZE')
+            con.close()
+            os.replace(tmpPath, self.path)
+        except BaseException:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+        finally:
+            if os.path.exists(loadPath):
+                os.remove(loadPath)
+
+
+# Date columns stored as text back to datetime64
+def _parseDates(df, table):
+    for col, kind in SCHEMAS.get(table, {}).items():
+        if col in df.columns and kind == 'date':
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT)
+    return df
+
+
+#### Lazy Start-Up ####
+# With AFL_LAZY_START=1 the backend is opened on a background thread (see
+# afl/startup.py). Until it's ready, ready is False and version is None;
+# anything else waits for the data and is then passed to the real backend.
+
+class LazyBackend:
+    def __init__(self, name=None, dataDir=None):
+        self.name = name or config.BACKEND
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._load = BackgroundLoad(lambda: self._open(dataDir))
+
+    def _open(self, dataDir):
+        backend = BACKENDS[self.name](dataDir)
+        with self._lock: # Listeners added from here on go straight to the backend
+            for listener in self._listeners:
+                backend.onSwap(listener)
+            self._listeners = None
+            self._backend = backend
+        backend.start()
+        return backend
+
+    @property
+    def ready(self):
+        return self._load.ready
+
+    # Seconds the data took to load (None while loading)
+    @property
+    def loadSeconds(self):
+        return self._load.seconds
+
+    @property
+    def version(self):
+        return self._load.value.version if self._load.ready else None
+
+    def onSwap(self, listener):
+        with self._lock:
+            if self._listeners is not None:
+                self._listeners.append(listener)
+                return
+        self._backend.onSwap(listener)
+
+    def start(self):
+        pass # Started once it's loaded
+
+    def __getattr__(self, attr):
+        return getattr(self._load.wait(), attr)
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'sqlite': SqliteBackend,
+}
+
+
+# The backend AFL_BACKEND names ('pandas' or 'sqlite'), opened in the
+# background with AFL_LAZY_START=1
+def openBackend(name=None, dataDir=None, lazy=None):
+    if config.LAZY_START if lazy is None else lazy:
+        return LazyBackend(name, dataDir)
+    return BACKENDS[name or config.BACKEND](dataDir)
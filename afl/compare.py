@@ -0,0 +1,82 @@
+import numpy as np
+
+from afl.dates import windowPositions
+
+#### Team Comparison ####
+# Several teams' games and W/D/L records at once, for comparing a finals field
+# side by side. One vectorized pass over the integer coded games in the date
+# window: every home and away side is looked up in a small table of the chosen
+# teams (code -> slot), the appearances of chosen teams are grouped by slot
+# with one sort, and the records are bincounts over the slots. Nothing is
+# filtered once per team, so eight teams cost about what one does.
+
+
+class Comparison:
+    # homeSlots/awaySlots: each game's home and away side as a position in teams (-1 for the rest)
+    def __init__(self, teams, dates, homeSlots, awaySlots, homeScore, awayScore):
+        self.teams = list(teams)
+        n, k = len(dates), len(self.teams)
+
+        # Each game once for each chosen side, grouped by team and in date order inside each
+        # (home and away side of each game next to each other, so a stable sort on slots keeps date order)
+        slots = np.stack([homeSlots, awaySlots], axis=1).ravel()
+        rows = np.repeat(np.arange(n), 2)
+        home = np.tile([True, False], n)
+        keep = slots >= 0
+        slots, rows, home = slots[keep], rows[keep], home[keep]
+        order = np.argsort(slots.astype(np.int16) if k < 2**15 else slots, kind='stable') # Radix sort for small ints
+        slots, rows, self.isHome = slots[order], rows[order], home[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(slots, minlength=k))])
+
+        # The team's score and the opponent's, in each of those games
+        homeScore, awayScore = np.asarray(homeScore)[rows], np.asarray(awayScore)[rows]
+        self.dates = np.asarray(dates)[rows]
+        self.scores = np.where(self.isHome, homeScore, awayScore)
+        other = np.where(self.isHome, awayScore, homeScore)
+
+        # Records the same way ResultsEngine counts them (a game without a score is a loss)
+        count = lambda flags: np.bincount(slots, weights=flags, minlength=k).astype(np.int64)
+        self.homeGames = count(self.isHome)
+        self.awayGames = count(~self.isHome)
+        self.homeWins = count(self.isHome & (self.scores > other))
+        self.awayWins = count(~self.isHome & (self.scores > other))
+        self.draws = count(homeScore == awayScore)
+        self.games = self.homeGames + self.awayGames
+        self.wins = self.homeWins + self.awayWins
+        self.losses = self.games - self.wins - self.draws
+
+    def __len__(self):
+        return len(self.teams)
+
+    # The i'th team's (dates, scores, whether home) in date order
+    def series(self, i):
+        start, end = self.offsets[i], self.offsets[i+1]
+        return self.dates[start:end], self.scores[start:end], self.isHome[start:end]
+
+    # The i'th team's W/D/L record (the same keys as the backends' record)
+    def record(self, i):
+        names = ['homeGames', 'homeWins', 'awayGames', 'awayWins', 'draws', 'games', 'wins', 'losses']
+        return {name: int(getattr(self, name)[i]) for name in names}
+
+
+# Comparisons for any teams and date window from the team index's integer coded games
+class ComparisonEngine:
+    def __init__(self, teamIndex):
+        games = teamIndex.games
+        self.codes = teamIndex.codes
+        self.dates = games['date'].to_numpy()
+        self.homeCodes = teamIndex.homeCodes
+        self.awayCodes = teamIndex.awayCodes
+        self.homeScore = games['homeTeamScore'].to_numpy(dtype=np.float64)
+        self.awayScore = games['awayTeamScore'].to_numpy(dtype=np.float64)
+
+    # Comparison of the teams over the games between two dates (inclusive, None = open ended)
+    def compare(self, teams, start_date=None, end_date=None):
+        i, j = windowPositions(self.dates, start_date, end_date) # Games are in date order
+        # Team code -> slot, with a last entry of -1 that missing names (code -1) land on
+        slot = np.full(len(self.codes) + 1, -1, dtype=np.intp)
+        for position, team in enumerate(teams):
+            if team in self.codes:
+                slot[self.codes[team]] = position
+        return Comparison(teams, self.dates[i:j], slot[self.homeCodes[i:j]], slot[self.awayCodes[i:j]],
+                          self.homeScore[i:j], self.awayScore[i:j])
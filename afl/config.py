@@ -0,0 +1,72 @@
+import os
+
+#### Settings ####
+# Everything can be switched with an environment variable so the dashboard
+# scripts themselves never need editing to change mode.
+
+# 'browser' sends the team's data to the dcc.Store (the original behaviour)
+# 'server' keeps the data in this process and only sends a small cache key
+STORE_MODE = os.environ.get('AFL_STORE_MODE', 'browser')
+
+# Memory budget for the server-side data cache
+STORE_CACHE_MB = float(os.environ.get('AFL_STORE_CACHE_MB', 256))
+
+# How data frames are written into a dcc.Store: 'columnar' (compact arrays,
+# dictionary encoded strings) or 'dict' (DataFrame.to_dict())
+WIRE_FORMAT = os.environ.get('AFL_WIRE_FORMAT', 'columnar')
+
+# Folder holding games.csv, stats.csv and clubcolours.csv
+DATA_DIR = os.environ.get('AFL_DATA_DIR', '/Users/nllama/Documents')
+
+# Binary copies of the CSVs are kept here (AFL_INGEST_CACHE=0 to always read the CSVs)
+CACHE_DIR = os.environ.get('AFL_CACHE_DIR', os.path.join(DATA_DIR, '.afl_cache'))
+INGEST_CACHE = os.environ.get('AFL_INGEST_CACHE', '1') != '0'
+
+# Memory map the binary cache read-only instead of reading it, so several
+# server worker processes share one copy of the data (needs the cache)
+SHARED_DATA = os.environ.get('AFL_SHARED_DATA', '0') == '1'
+
+# Memory budget for the shared figure cache
+FIGURE_CACHE_MB = float(os.environ.get('AFL_FIGURE_CACHE_MB', 64))
+
+# Callback instrumentation: where the Prometheus-style metrics are served,
+# how long the rolling window is, and the time above which a callback is
+# logged as slow (0 = don't log)
+METRICS_PATH = os.environ.get('AFL_METRICS_PATH', '/metrics')
+METRICS_WINDOW_S = float(os.environ.get('AFL_METRICS_WINDOW_S', 300))
+SLOW_CALLBACK_MS = float(os.environ.get('AFL_SLOW_CALLBACK_MS', 0))
+
+# Check the data files for new rows every this many seconds and swap them in
+# without a restart (0 = load once at start-up)
+RELOAD_S = float(os.environ.get('AFL_RELOAD_S', 0))
+
+# Where the callbacks get their data: 'pandas' (everything in memory) or
+# 'sqlite' (indexed queries against a SQLite copy of the files in CACHE_DIR)
+BACKEND = os.environ.get('AFL_BACKEND', 'pandas')
+
+# Most players the player search sends back for each keystroke
+PLAYER_SEARCH_LIMIT = int(os.environ.get('AFL_PLAYER_SEARCH_LIMIT', 20))
+
+# Charts switch to WebGL traces above this many points (0 = never), and long
+# histories are downsampled on the server to about MAX_POINTS points per chart
+# (0 = always send every point); zooming in brings back full resolution
+WEBGL_POINTS = int(os.environ.get('AFL_WEBGL_POINTS', 1000))
+MAX_POINTS = int(os.environ.get('AFL_MAX_POINTS', 2000))
+
+# Serve the layout straight away and load the data on a background thread
+# (the drop downs fill in when it's ready); READY_PATH answers 200 once the
+# data is loaded and 503 until then
+LAZY_START = os.environ.get('AFL_LAZY_START', '0') == '1'
+READY_PATH = os.environ.get('AFL_READY_PATH', '/ready')
+
+# Where the dashboards serve downloads of the data behind the current view
+EXPORT_PATH = os.environ.get('AFL_EXPORT_PATH', '/export')
+
+# Where V2 builds the home/away scatter and W/D/L pie: 'server' (plotly
+# figures made in python) or 'client' (the server only sends the arrays and
+# assets/afl_charts.js draws them in the browser)
+RENDER_MODE = os.environ.get('AFL_RENDER_MODE', 'server')
+
+# Threads V2 uses to build each team's traces in the multi-team comparison
+# (the games for every team are grouped in one pass first)
+COMPARE_WORKERS = int(os.environ.get('AFL_COMPARE_WORKERS', 4))
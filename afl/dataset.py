@@ -0,0 +1,69 @@
+from afl.compare import ComparisonEngine
+from afl.h2h import HeadToHeadEngine
+from afl.index import TeamIndex
+from afl.leaders import LeaderBoard
+from afl.players import CareerTable
+from afl.ratings import RatingEngine
+from afl.results import ResultsEngine
+from afl.search import PlayerSearch
+
+#### Dataset ####
+# Everything the dashboards work out from the data files, built together and
+# stamped with a version. A reload builds a new Dataset off to the side and
+# swaps it in whole, so a callback that grabbed the old one carries on with a
+# consistent view, and caches keyed by version never mix old and new data.
+
+# Just the team index and the teams and dates it covers (all V1 needs)
+class TeamDataset:
+    def __init__(self, df_games, df_stats=None, version=1):
+        self.version = version
+
+        # Index games and stats by team once, so the callbacks don't scan the whole league
+        self.teamIndex = TeamIndex(df_games, df_stats)
+        self.games = self.teamIndex.games # Sorted by date
+        self.stats = df_stats
+        self.teams = list(self.games['homeTeam'].dropna().unique())
+        self.firstDate = self.games['date'].iloc[0]
+        self.lastDate = self.games['date'].iloc[-1]
+
+
+# The team index plus every engine V2's callbacks read
+class Dataset(TeamDataset):
+    # previous: the Dataset this one replaces, so work on unchanged history can carry over
+    def __init__(self, df_games, df_stats=None, df_colours=None, version=1, previous=None):
+        super().__init__(df_games, df_stats, version)
+        self.colours = df_colours
+
+        # Cumulative W/D/L counts per team, so any date range's record is a lookup
+        self.results = ResultsEngine(self.teamIndex)
+
+        # Every team against every other team, for any date range
+        self.headToHead = HeadToHeadEngine(self.teamIndex)
+
+        # Several chosen teams side by side, in one pass over the games for any date range
+        self.comparison = ComparisonEngine(self.teamIndex)
+
+        # Rating history for every team, only walking games appended since the previous Dataset
+        if previous is not None:
+            self.ratings = previous.ratings.update(self.games)
+        else:
+            self.ratings = RatingEngine.fromGames(self.games)
+
+        # Career games and per-game averages for every player, for the player card
+        self.careers = None
+        if df_stats is not None:
+            self.careers = CareerTable(df_stats)
+
+        # Running totals per player per season, for league leaderboards over any seasons
+        self.leaders = None
+        if df_stats is not None:
+            self.leaders = LeaderBoard.fromStats(df_stats)
+
+        # Every (team, player) in the league, for the player search
+        self.playerSearch = PlayerSearch(self.careers.cards if self.careers is not None else [])
+
+        # Team colours as a plain dict, team -> [colour1, colour2, colour3]
+        self.teamColours = {}
+        if df_colours is not None:
+            self.teamColours = {row.team: [row.colour1, row.colour2, row.colour3]
+                                for row in df_colours.itertuples()}
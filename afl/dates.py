@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+#### Date Windows ####
+# Date picker values arrive as strings ('2015-03-01' or '2015-03-01T00:00:00').
+# A window is inclusive of both days: start at 00:00 on the start date, up to
+# (not including) 00:00 on the day after the end date. None leaves that side open.
+
+def windowBounds(start_date=None, end_date=None):
+    start = None if start_date is None else pd.Timestamp(start_date).normalize()
+    end = None if end_date is None else pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    return start, end
+
+
+# Positions [i, j) of the window in an ascending datetime64 array (binary search, no scan)
+def windowPositions(dates, start_date=None, end_date=None):
+    start, end = windowBounds(start_date, end_date)
+    i = 0 if start is None else int(np.searchsorted(dates, start.to_datetime64(), side='left'))
+    j = len(dates) if end is None else int(np.searchsorted(dates, end.to_datetime64(), side='left'))
+    return i, max(i, j)
+
+
+# Rows of a date sorted data frame inside the window, as a positional slice (no copy, no scan)
+def sliceDateRange(df, start_date=None, end_date=None, column='date'):
+    dates = df[column]
+    if not pd.api.types.is_datetime64_any_dtype(dates): # eg. read back from a to_dict() store
+        dates = pd.to_datetime(dates)
+    i, j = windowPositions(dates.to_numpy(), start_date, end_date)
+    return df.iloc[i:j]
+
+
+# Date picker value reduced to the day it names ('2015-03-01'), for use in cache keys
+def dayKey(date):
+    if date is None:
+        return None
+    return pd.Timestamp(date).strftime('%Y-%m-%d')
+
+
+# Season (year) a date picker value falls in, for season based lookups
+def seasonOf(date):
+    if date is None:
+        return None
+    return pd.Timestamp(date).year
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from afl import config
+
+#### Downsampling ####
+# Long histories are thinned out on the server so the number of points sent
+# to the browser stays about config.MAX_POINTS however much data there is:
+#   time series : Largest-Triangle-Three-Buckets, which keeps the points that
+#                 make the shape of the line (peaks and troughs)
+#   scatter     : 2D binning, one point per non-empty cell of a grid with a
+#                 count of the rows in it
+# Above config.WEBGL_POINTS the charts switch to WebGL traces. Zooming in
+# asks for the visible range again, which is drawn at full resolution once
+# it fits in the budget.
+
+
+# Whether a figure with this many points should be drawn with WebGL
+def useWebGL(points):
+    return config.WEBGL_POINTS > 0 and points > config.WEBGL_POINTS
+
+
+# Whether this many points needs thinning out to fit in the budget
+def needsDownsampling(points, maxPoints=None):
+    maxPoints = config.MAX_POINTS if maxPoints is None else maxPoints
+    return maxPoints > 0 and points > maxPoints
+
+
+# Numbers to do arithmetic on: dates as nanoseconds, everything else as float
+def _numeric(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return values.astype(np.float64)
+
+
+# Positions of the points Largest-Triangle-Three-Buckets keeps (x ascending)
+def lttbIndices(x, y, maxPoints=None):
+    maxPoints = config.MAX_POINTS if maxPoints is None else maxPoints
+    n = len(x)
+    if not needsDownsampling(n, maxPoints) or maxPoints < 3:
+        return np.arange(n)
+    x, y = _numeric(x), _numeric(y)
+
+    # First and last points always stay; the rest are split into equal buckets
+    edges = np.linspace(1, n - 1, maxPoints - 1).astype(np.intp)
+    # Average of every bucket up front (the last bucket looks ahead to the last point)
+    sizes = np.maximum(np.diff(np.append(edges, n)), 1)
+    nextX = np.append(np.add.reduceat(x, edges)[1:] / sizes[1:], x[-1])
+    nextY = np.append(np.add.reduceat(y, edges)[1:] / sizes[1:], y[-1])
+
+    keep = np.empty(maxPoints, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for b in range(maxPoints - 2):
+        start, end = edges[b], max(edges[b+1], edges[b] + 1)
+        # The point in this bucket making the biggest triangle with the point
+        # kept from the last bucket and the average of the next bucket
+        px, py = x[previous], y[previous]
+        area = np.abs((px - nextX[b]) * (y[start:end] - py) - (px - x[start:end]) * (nextY[b] - py))
+        previous = start + int(area.argmax())
+        keep[b+1] = previous
+    return np.unique(keep)
+
+
+# Rows of x-sorted data thinned out to the budget with LTTB (NaNs dropped first)
+def downsampleSeries(df, x, y, maxPoints=None):
+    df = df[df[x].notna() & df[y].notna()]
+    return df.iloc[lttbIndices(df[x].to_numpy(), df[y].to_numpy(), maxPoints)]
+
+
+# Whether a column can go on a binned (numeric) axis
+def isBinnable(values):
+    return (pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)) \
+        or pd.api.types.is_datetime64_any_dtype(values)
+
+
+# One row per non-empty cell of a grid over x and y: the cell's centre and how many rows it holds
+def bin2d(df, x, y, maxPoints=None):
+    maxPoints = config.MAX_POINTS if maxPoints is None else maxPoints
+    df = df[df[x].notna() & df[y].notna()]
+    xs, ys = _numeric(df[x].to_numpy()), _numeric(df[y].to_numpy())
+    bins = max(int(np.sqrt(maxPoints)), 1) # bins x bins cells at most
+    counts, xEdges, yEdges = np.histogram2d(xs, ys, bins=bins)
+    i, j = np.nonzero(counts)
+    xCentres = (xEdges[i] + xEdges[i+1]) / 2
+    yCentres = (yEdges[j] + yEdges[j+1]) / 2
+    binned = pd.DataFrame({x: xCentres, y: yCentres, 'count': counts[i, j].astype(np.int64)})
+    for col, values in ((x, df[x]), (y, df[y])): # Dates back to dates
+        if pd.api.types.is_datetime64_any_dtype(values):
+            binned[col] = pd.to_datetime(binned[col].astype(np.int64))
+    return binned
+
+
+# The (low, high) an axis was zoomed to, from a dcc.Graph's relayoutData, or
+# None if it is showing its full range (never zoomed, or reset)
+def zoomRange(relayoutData, axis='xaxis'):
+    if not relayoutData or relayoutData.get(axis + '.autorange'):
+        return None
+    if axis + '.range[0]' in relayoutData:
+        return relayoutData[axis + '.range[0]'], relayoutData[axis + '.range[1]']
+    if axis + '.range' in relayoutData:
+        return tuple(relayoutData[axis + '.range'])
+    return None
@@ -0,0 +1,121 @@
+import io
+import re
+
+from flask import Response, abort, request
+
+from afl import config
+from afl.backend import DATE_FORMAT
+from afl.dates import windowBounds
+from afl.loader import SCHEMAS
+from afl.search import splitPlayerKey
+
+#### Data Export ####
+# Downloads of the data behind the current view, streamed a block of rows at
+# a time from the backend's export generators (the same team index slices,
+# date windows and indexed queries the callbacks use), so memory stays flat
+# even for the whole league:
+#   <EXPORT_PATH>/games.csv|arrow ? team= & start_date= & end_date=
+#       the team's games (or every game with no team) in the date range
+#   <EXPORT_PATH>/stats.csv|arrow ? player=<team|name> or team=
+#       the player's per-game stats (or the team's, or every team's)
+# Arrow files are an IPC stream (read with pyarrow.ipc.open_stream) and need
+# pyarrow installed.
+
+FORMATS = {
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+# Arrow types for the declared schema, so every block has the same types
+# (ints with gaps are null rather than turning a block into floats)
+ARROW_TYPES = {'str': 'string', 'int': 'int64', 'float': 'float64', 'date': 'timestamp[us]'}
+
+
+# CSV text, a block at a time (header on the first). Declared int columns are
+# written as ints with blanks for gaps, dates in one format, in every block
+def csvChunks(name, blocks):
+    ints = [col for col, kind in SCHEMAS.get(name, {}).items() if kind == 'int']
+    header = True
+    for df in blocks:
+        df = df.assign(**{col: df[col].astype('Int64') for col in ints if col in df.columns})
+        yield df.to_csv(index=False, header=header, date_format=DATE_FORMAT).encode('utf-8')
+        header = False
+
+
+# Arrow IPC stream, one record batch per block
+def arrowChunks(name, blocks):
+    import pyarrow as pa # Optional, only needed for Arrow downloads
+
+    sink = io.BytesIO()
+    writer = schema = None
+    for df in blocks:
+        if writer is None: # Declared types where there are any, inferred from the first block otherwise
+            types = SCHEMAS.get(name, {})
+            inferred = pa.Schema.from_pandas(df, preserve_index=False)
+            schema = pa.schema([pa.field(col, pa.type_for_alias(ARROW_TYPES[types[col]]) if col in types
+                                         else inferred.field(col).type) for col in df.columns])
+            writer = pa.ipc.new_stream(sink, schema)
+        writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+        yield _drain(sink)
+    if writer is not None:
+        writer.close()
+        yield _drain(sink)
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+CHUNKERS = {
+    'csv': csvChunks,
+    'arrow': arrowChunks,
+}
+
+
+# Serve downloads from the backend on path (see above)
+def addExportRoutes(server, backend, path=None):
+    def serve(table, format):
+        if format not in FORMATS:
+            return _badRequest('Unknown format %r, use one of: %s' % (format, ', '.join(FORMATS)))
+        if format == 'arrow':
+            try:
+                import pyarrow # noqa: F401
+            except ImportError:
+                return Response('Arrow downloads need pyarrow installed\n', status=501, mimetype='text/plain')
+
+        args = request.args
+        if table == 'games':
+            team = args.get('team') or None
+            start_date, end_date = args.get('start_date') or None, args.get('end_date') or None
+            try:
+                windowBounds(start_date, end_date) # Check the dates before anything is streamed
+            except ValueError:
+                return _badRequest('Dates should look like 2015-03-01')
+            blocks = backend.exportGames(team, start_date, end_date)
+            parts = [team or 'league', 'games', (start_date or '')[:10], (end_date or '')[:10]]
+        elif table == 'stats':
+            team, name = splitPlayerKey(args.get('player'))
+            team = team or args.get('team') or None
+            blocks = backend.exportStats(team, name)
+            parts = [team or 'league', name, 'stats']
+        else:
+            abort(404)
+
+        filename = _fileName(parts) + '.' + format
+        return Response(CHUNKERS[format](table, blocks), mimetype=FORMATS[format],
+                        headers={'Content-Disposition': 'attachment; filename="%s"' % filename})
+
+    server.add_url_rule((path or config.EXPORT_PATH) + '/<table>.<format>', 'afl_export', serve)
+
+
+# A short plain text answer to a download asked for with bad arguments
+def _badRequest(message):
+    return Response(message + '\n', status=400, mimetype='text/plain')
+
+
+# Letters, digits and single dashes only
+def _fileName(parts):
+    return re.sub(r'[^A-Za-z0-9]+', '-', '-'.join(part for part in parts if part)).strip('-')
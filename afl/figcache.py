@@ -0,0 +1,61 @@
+import json
+
+from plotly.io.json import to_json_plotly
+
+from afl import config
+from afl.store import LRUCache
+
+#### Figure Cache ####
+# Finished figures keyed by the callback's inputs (team, dates reduced to days,
+# axis choices...) plus the data version. A repeat request is answered from
+# the cache without touching pandas or building a plotly figure. Figures are
+# held as their JSON text, so the memory budget counts real bytes. Charts drawn
+# in the browser (AFL_RENDER_MODE=client) cache their arrays the same way.
+
+class FigureCache:
+    def __init__(self, maxBytes=None):
+        if maxBytes is None:
+            maxBytes = config.FIGURE_CACHE_MB * 1024 * 1024
+        self.cache = LRUCache(maxBytes, len)
+        self.version = 1 # Bump (through invalidate) when the data changes
+
+    # Cached figure (as a plain dict) for the key, or None
+    def get(self, key):
+        figJson = self.cache.get(key + (self.version,))
+        if figJson is None:
+            return None
+        return json.loads(figJson)
+
+    # The same without counting a hit or miss (for the figure a graph is
+    # already showing, see afl/patch.py)
+    def peek(self, key):
+        figJson = self.cache.peek(key + (self.version,))
+        if figJson is None:
+            return None
+        return json.loads(figJson)
+
+    # Cache a freshly built figure (or a chart's arrays) and hand it back as a
+    # plain dict, the same as get() would
+    def put(self, key, fig):
+        figJson = figureJson(fig)
+        self.cache.put(key + (self.version,), figJson)
+        return json.loads(figJson)
+
+    def invalidate(self):
+        self.version += 1
+        self.cache.clear()
+
+    def stats(self):
+        return {
+            'hits': self.cache.hits,
+            'misses': self.cache.misses,
+            'entries': len(self.cache),
+            'bytes': self.cache.bytes,
+        }
+
+
+# A figure (or a chart's arrays) as JSON text, encoded the way Dash encodes
+# it inside a callback response: dates keep their unit, so whole days go out
+# as just the day (fig.to_json() writes every date out to the second)
+def figureJson(fig):
+    return to_json_plotly([fig])[1:-1]
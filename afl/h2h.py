@@ -0,0 +1,63 @@
+import numpy as np
+
+from afl.dates import windowPositions
+
+#### Head to Head ####
+# Every team's record against every other team as team x team matrices, built
+# in one vectorized pass over the games in the date window: each game is
+# scattered (np.add.at) into the home side's row at the away side's column
+# and the away side's row at the home side's column. Nothing is filtered per
+# pair, so the cost is the number of games, not teams squared times games.
+
+OUTCOMES = ['losses', 'draws', 'wins'] # Indexed by sign(margin) + 1
+
+
+class HeadToHead:
+    # homeCodes/awayCodes index into teams (-1 for a missing name)
+    def __init__(self, teams, homeCodes, awayCodes, homeScore, awayScore):
+        # Rows and columns in alphabetical order of team name
+        order = np.argsort(np.asarray(teams, dtype=object).astype(str), kind='stable')
+        rank = np.empty(len(order), dtype=np.intp)
+        rank[order] = np.arange(len(order))
+        self.teams = [teams[i] for i in order]
+
+        homeScore = np.asarray(homeScore, dtype=np.float64)
+        awayScore = np.asarray(awayScore, dtype=np.float64)
+        valid = (homeCodes >= 0) & (awayCodes >= 0) & ~np.isnan(homeScore) & ~np.isnan(awayScore)
+        home, away = rank[homeCodes[valid]], rank[awayCodes[valid]]
+        margin = homeScore[valid] - awayScore[valid]
+
+        # Each game once from each side: (team, opponent, margin for the team)
+        rows = np.concatenate([home, away])
+        cols = np.concatenate([away, home])
+        margins = np.concatenate([margin, -margin])
+
+        n = len(self.teams)
+        counts = np.zeros((n, n, len(OUTCOMES)), dtype=np.int64)
+        np.add.at(counts, (rows, cols, np.sign(margins).astype(np.intp) + 1), 1)
+        marginTotal = np.zeros((n, n))
+        np.add.at(marginTotal, (rows, cols), margins)
+
+        self.losses, self.draws, self.wins = (counts[:, :, i] for i in range(len(OUTCOMES)))
+        self.games = counts.sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'): # Pairs that never met are nan
+            self.avgMargin = marginTotal / self.games
+            self.winRate = (self.wins + 0.5*self.draws) / self.games
+
+
+# Head to head for any date window from the team index's integer coded games
+class HeadToHeadEngine:
+    def __init__(self, teamIndex):
+        games = teamIndex.games
+        self.teams = list(teamIndex.teams)
+        self.dates = games['date'].to_numpy()
+        self.homeCodes = teamIndex.homeCodes
+        self.awayCodes = teamIndex.awayCodes
+        self.homeScore = games['homeTeamScore'].to_numpy(dtype=np.float64)
+        self.awayScore = games['awayTeamScore'].to_numpy(dtype=np.float64)
+
+    # HeadToHead for the games between two dates (inclusive, None = open ended)
+    def matrix(self, start_date=None, end_date=None):
+        i, j = windowPositions(self.dates, start_date, end_date) # Games are in date order
+        return HeadToHead(self.teams, self.homeCodes[i:j], self.awayCodes[i:j],
+                          self.homeScore[i:j], self.awayScore[i:j])
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+#### Team Index ####
+# Built once at start-up so the callbacks never have to scan the whole
+# league to find one team's rows.
+#   games : date parsed and sorted once, then for every team an array of row
+#           positions (home and away appearances, in date order) and
+#           whether the team was home in each
+#   stats : grouped by team so each team is one contiguous row range
+
+class TeamIndex:
+    def __init__(self, df_games, df_stats=None):
+        # Parse and sort the games once (stable, so same-day games keep file order)
+        # Games loaded already parsed and sorted are used as they are, not copied
+        games = df_games
+        if not pd.api.types.is_datetime64_any_dtype(games['date']):
+            games = games.copy()
+            games['date'] = pd.to_datetime(games['date'])
+        if not games['date'].is_monotonic_increasing:
+            games = games.sort_values(by='date', kind='mergesort')
+        self.games = games
+
+        # Integer code every team that appears home or away
+        codes, self.teams = pd.factorize(
+            pd.concat([self.games['homeTeam'], self.games['awayTeam']], ignore_index=True))
+        self.codes = {team: i for i, team in enumerate(self.teams)}
+        n = len(self.games.index)
+        self.homeCodes, self.awayCodes = codes[:n], codes[n:] # Per game, -1 for a missing name
+
+        # Group row positions by team, keeping date order inside each team
+        rows = np.concatenate([np.arange(n), np.arange(n)])
+        home = np.arange(2*n) < n # First copy of the rows is the home side
+        rows, home, codes = rows[codes >= 0], home[codes >= 0], codes[codes >= 0] # Drop missing team names
+        order = np.lexsort((rows, codes))
+        self.gamePositions = rows[order]
+        self.gameIsHome = home[order] # Whether the team was the home side in each of those games
+        self.gameOffsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(codes, minlength=len(self.teams)))])
+
+        # Group stat rows by team so each team is a contiguous block
+        self.stats = None
+        if df_stats is not None:
+            statCodes, statTeams = pd.factorize(df_stats['team'])
+            order = np.argsort(statCodes, kind='stable')
+            order = order[statCodes[order] >= 0] # Drop missing team names
+            if len(order) == len(statCodes) and (order[1:] > order[:-1]).all():
+                self.stats = df_stats # Already grouped by team, use as is
+            else:
+                self.stats = df_stats.take(order)
+            counts = np.bincount(statCodes[order], minlength=len(statTeams))
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            self.statRanges = {team: (offsets[i], offsets[i+1]) for i, team in enumerate(statTeams)}
+
+    # Row positions (into self.games) of every game the team played, in date order
+    def gameRows(self, team):
+        i = self.codes.get(team)
+        if i is None:
+            return np.empty(0, dtype=np.intp)
+        return self.gamePositions[self.gameOffsets[i]:self.gameOffsets[i+1]]
+
+    # All games (home and away) for the team, sorted by date
+    # columns picks out just the columns the caller uses (in one take, not two copies)
+    def teamGames(self, team, columns=None):
+        rows = self.gameRows(team)
+        if columns is None:
+            return self.games.take(rows)
+        return self.games.iloc[rows, self.games.columns.get_indexer(columns)]
+
+    # All stat rows for the team (a slice of the grouped frame, no copy)
+    def teamStats(self, team, columns=None):
+        start, end = self.statRanges.get(team, (0, 0))
+        if columns is None:
+            return self.stats.iloc[start:end]
+        return self.stats.iloc[start:end, self.stats.columns.get_indexer(columns)]
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from afl.players import NOT_STATS
+
+#### League Leaders ####
+# Top players league-wide for any stat over any range of seasons, without a
+# groupby or sort per request. At start-up the stats are summed once per
+# (team, player, season) and stored as running totals down each player's
+# seasons: a cube of player x season x stat, keeping only the seasons each
+# player actually played (a full cube would be mostly zeros). A player's total
+# for seasons first..last is then the running total at the last season they
+# played up to `last` minus the one before `first`, found for every player at
+# once with two binary searches. The top k come from a partial selection
+# (np.argpartition), so only those k are ever sorted.
+
+SEASON_KEYS = ['team', 'displayName', 'year']
+YEAR_SPAN = 10000 # Seasons are packed into one sort key as player*YEAR_SPAN + year
+
+
+class LeaderBoard:
+    # seasons: one row per (team, displayName, year) in that order, with the
+    # games played that season and the season total of every stat column
+    def __init__(self, seasons):
+        self.columns = [col for col in seasons.columns if col not in SEASON_KEYS + ['games']]
+
+        # Players in (team, name) order, their seasons in year order after them
+        team = seasons['team'].to_numpy(dtype=object)
+        name = seasons['displayName'].to_numpy(dtype=object)
+        year = seasons['year'].to_numpy(dtype=np.int64)
+        newPlayer = np.ones(len(year), dtype=bool)
+        newPlayer[1:] = (team[1:] != team[:-1]) | (name[1:] != name[:-1])
+        first = np.flatnonzero(newPlayer)
+        self.teams = team[first]
+        self.names = name[first]
+        player = np.cumsum(newPlayer) - 1
+        self.keys = player * YEAR_SPAN + year
+
+        # Running totals with a row of zeros in front, so totals[j] - totals[i]
+        # is the sum of season rows i to j-1 (column 0 is games played)
+        values = seasons[['games'] + self.columns].to_numpy(dtype=np.float64, na_value=0.0)
+        self.totals = np.zeros((len(year) + 1, values.shape[1]))
+        np.cumsum(values, axis=0, out=self.totals[1:])
+        self.firstYear = int(year.min()) if len(year) else None
+        self.lastYear = int(year.max()) if len(year) else None
+
+    # From the stats themselves (one row per player per game)
+    @classmethod
+    def fromStats(cls, df_stats):
+        columns = [col for col in df_stats.columns
+                   if col not in NOT_STATS and pd.api.types.is_numeric_dtype(df_stats[col])]
+        grouped = df_stats.groupby(SEASON_KEYS, sort=True, observed=True)
+        seasons = grouped[columns].sum()
+        seasons.insert(0, 'games', grouped.size()) # One stat row per game played
+        return cls(seasons.reset_index())
+
+    def __len__(self):
+        return len(self.teams)
+
+    # Every player's (games, total of column) over the seasons first..last (inclusive, None = open ended)
+    def window(self, column, first=None, last=None):
+        first = 0 if first is None else max(int(first), 0)
+        last = YEAR_SPAN - 1 if last is None else min(int(last), YEAR_SPAN - 1)
+        base = np.arange(len(self.teams), dtype=np.int64) * YEAR_SPAN
+        lo = np.searchsorted(self.keys, base + first, side='left')
+        hi = np.searchsorted(self.keys, base + last, side='right')
+        col = self.columns.index(column) + 1
+        games = self.totals[hi, 0] - self.totals[lo, 0]
+        return games, self.totals[hi, col] - self.totals[lo, col]
+
+    # The k best players for column over the seasons, as a table best first
+    # perGame ranks by the per-game average; players need minGames games in the seasons
+    def top(self, column, first=None, last=None, k=20, minGames=1, perGame=False):
+        games, total = self.window(column, first, last)
+        if perGame:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                value = total / games
+        else:
+            value = total
+        eligible = np.flatnonzero(games >= max(minGames, 1))
+        k = min(k, len(eligible))
+        if k < len(eligible): # Partial selection: the k largest, in no particular order
+            eligible = eligible[np.argpartition(-value[eligible], k - 1)[:k]]
+        best = eligible[np.lexsort((eligible, -value[eligible]))][:k] # Only these are sorted (ties by team, name)
+
+        label = column + ' per game' if perGame else column
+        return pd.DataFrame({
+            'rank': np.arange(1, len(best) + 1),
+            'player': self.names[best],
+            'team': self.teams[best],
+            'games': games[best].astype(np.int64),
+            label: value[best].round(2) if perGame else value[best],
+        })
@@ -0,0 +1,273 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from afl import config
+
+#### Data Loading ####
+# Every dashboard loads its data through loadTable(). The first start reads the
+# CSV with a declared schema and writes a binary columnar copy (one .npy file
+# per column, strings dictionary encoded). Later starts load that copy, as long
+# as the CSV's mtime and size (or failing that, its hash) haven't changed.
+#
+# Tables are held compactly (compactTable): teams, players, venues and rounds
+# as categoricals, whole-number columns in the smallest integer type that
+# holds them, dates as datetime64. Columns with gaps stay float64 so sums
+# and averages come out exactly as before.
+
+# Column types for each file: 'str', 'int', 'float' or 'date'
+# Columns a file has that aren't listed here are read with pandas' inferred type
+SCHEMAS = {
+    'games': {
+        'gameId': 'str', 'year': 'int', 'round': 'str', 'date': 'date',
+        'venue': 'str', 'startTime': 'str', 'attendance': 'int',
+        'homeTeam': 'str', 'homeTeamScore': 'int', 'homeTeamScoreChart': 'str',
+        'awayTeam': 'str', 'awayTeamScore': 'int', 'awayTeamScoreChart': 'str',
+        'maxTemp': 'float', 'minTemp': 'float', 'rainfall': 'float',
+    },
+    'stats': {
+        'gameId': 'str', 'team': 'str', 'year': 'int', 'round': 'str',
+        'displayName': 'str', 'gameNumber': 'int',
+        'Disposals': 'int', 'Kicks': 'int', 'Marks': 'int', 'Handballs': 'int',
+        'Goals': 'int', 'Behinds': 'int', 'Hit Outs': 'int', 'Tackles': 'int',
+        'Rebounds': 'int', 'Inside 50s': 'int', 'Clearances': 'int', 'Clangers': 'int',
+        'Frees': 'int', 'Frees Against': 'int', 'Brownlow Votes': 'int',
+        'Contested Possessions': 'int', 'Uncontested Possessions': 'int',
+        'Contested Marks': 'int', 'Marks Inside 50': 'int', 'One Percenters': 'int',
+        'Bounces': 'int', 'Goal Assists': 'int', '% Played': 'int', 'Subs': 'str',
+    },
+    'clubcolours': {
+        'team': 'str', 'colour1': 'str', 'colour2': 'str', 'colour3': 'str',
+    },
+}
+
+# Row order each table is stored in (stable sorts, so ties keep file order).
+# Games by date and stats grouped by team means the team index can use them
+# as they are, which matters when they are memory mapped.
+TABLE_ORDER = {
+    'games': ['date'],
+    'stats': ['team'],
+}
+
+# Columns held as categoricals: a few distinct values repeated down many rows.
+# Columns grouped together share one set of categories (home and away teams),
+# and categories are sorted so the columns sort like the strings would
+CATEGORIES = {
+    'games': [['homeTeam', 'awayTeam'], ['venue'], ['round']],
+    'stats': [['team'], ['displayName'], ['gameId'], ['round'], ['Subs']],
+}
+
+# Bump when the cache layout, SCHEMAS, TABLE_ORDER or CATEGORIES change so old caches are rebuilt
+CACHE_VERSION = 4
+
+
+def sourcePath(name, dataDir=None):
+    return os.path.join(dataDir or config.DATA_DIR, name + '.csv')
+
+
+# Load one of the data files ('games', 'stats' or 'clubcolours') as a data frame
+# shared=True maps the cached columns read-only instead of reading them, so
+# every process using the same cache shares one copy of the data in memory
+def loadTable(name, dataDir=None, cacheDir=None, useCache=None, shared=None):
+    path = sourcePath(name, dataDir)
+    if useCache is None:
+        useCache = config.INGEST_CACHE
+    if shared is None:
+        shared = config.SHARED_DATA
+    if not useCache:
+        return readCsv(name, path)
+
+    cachePath = os.path.join(cacheDir or config.CACHE_DIR, name)
+    meta = _validCache(cachePath, path)
+    if meta is not None:
+        return readCache(cachePath, meta, shared)
+
+    df = readCsv(name, path)
+    try:
+        writeCache(cachePath, df, _sourceKey(path))
+    except OSError: # Read-only data folder etc, just run from the CSV
+        return df
+    if shared: # Map the cache just written rather than keep this private copy
+        return readCache(cachePath, _validCache(cachePath, path), shared)
+    return df
+
+
+# Read a CSV and apply its declared schema
+def readCsv(name, path):
+    df = pd.read_csv(path, dtype=_csvTypes(name))
+    return orderTable(name, compactTable(name, applySchema(name, df)))
+
+
+# Parse rows cut from the middle of a CSV (no header line) with the file's column names
+def readCsvRows(name, data, columns):
+    df = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=_csvTypes(name))
+    return applySchema(name, df)
+
+
+# Read a CSV a block of rows at a time, schema applied (file order, not TABLE_ORDER)
+def readCsvChunks(name, path, rows=100000):
+    for df in pd.read_csv(path, dtype=_csvTypes(name), chunksize=rows):
+        yield applySchema(name, df)
+
+
+def applySchema(name, df):
+    for col, kind in SCHEMAS.get(name, {}).items():
+        if col not in df.columns:
+            continue
+        if kind == 'date':
+            df[col] = pd.to_datetime(df[col])
+        elif kind in ('int', 'float'):
+            values = pd.to_numeric(df[col], errors='coerce')
+            if kind == 'int' and not values.isna().any():
+                values = values.astype(np.int64)
+            else: # Ints with gaps (eg. stats not recorded in early seasons) stay float
+                values = values.astype(np.float64)
+            df[col] = values
+    return df
+
+
+# The table with its CATEGORIES as categoricals and declared int columns
+# downcast to the smallest integer type that holds them (columns with gaps are
+# float and stay float64, so every sum and average is unchanged)
+def compactTable(name, df):
+    compact = {}
+    for group in CATEGORIES.get(name, []):
+        group = [col for col in group if col in df.columns]
+        if not group:
+            continue
+        levels = pd.Index(pd.concat([df[col].astype(object) for col in group]).dropna().unique())
+        dtype = pd.CategoricalDtype(levels.sort_values())
+        for col in group:
+            compact[col] = df[col].astype(dtype)
+    for col, kind in SCHEMAS.get(name, {}).items():
+        if kind == 'int' and col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            compact[col] = pd.to_numeric(df[col], downcast='integer')
+    return df.assign(**compact) if compact else df
+
+
+# Put a table's rows in their TABLE_ORDER
+def orderTable(name, df):
+    order = [col for col in TABLE_ORDER.get(name, []) if col in df.columns]
+    if order:
+        df = df.sort_values(order, kind='mergesort').reset_index(drop=True)
+    return df
+
+
+# Read string columns as str so pandas doesn't guess at them
+def _csvTypes(name):
+    return {col: str for col, kind in SCHEMAS.get(name, {}).items() if kind == 'str'}
+
+
+#### Binary Cache ####
+# <cacheDir>/<name>/meta.json lists the columns and the source key, and each
+# column is stored as <n>.npy (strings as integer codes into meta's 'levels')
+
+def writeCache(cachePath, df, sourceKey):
+    parent = os.path.dirname(cachePath)
+    os.makedirs(parent, exist_ok=True)
+    tmpPath = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    columns = []
+    for i, (name, col) in enumerate(df.items()):
+        column = {'name': name, 'file': '%d.npy' % i}
+        if pd.api.types.is_datetime64_any_dtype(col):
+            column['type'] = 'date'
+            values = col.to_numpy()
+        elif isinstance(col.dtype, pd.CategoricalDtype): # Codes and categories as they are
+            column['type'] = 'category'
+            column['levels'] = [str(level) for level in col.cat.categories]
+            values = col.cat.codes.to_numpy().astype(_codeType(len(column['levels'])))
+        elif pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+            column['type'] = 'number'
+            values = col.to_numpy()
+        else:
+            codes, levels = pd.factorize(col, sort=True) # Sorted, so categoricals sort like strings
+            column['type'] = 'str'
+            column['levels'] = [str(level) for level in levels]
+            values = codes.astype(_codeType(len(levels)))
+        np.save(os.path.join(tmpPath, column['file']), values, allow_pickle=False)
+        columns.append(column)
+
+    meta = {'version': CACHE_VERSION, 'source': sourceKey, 'rows': len(df.index), 'columns': columns}
+    with open(os.path.join(tmpPath, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    # Swap the finished cache into place so a half written cache is never read
+    try:
+        if os.path.exists(cachePath):
+            shutil.rmtree(cachePath, ignore_errors=True)
+        os.replace(tmpPath, cachePath)
+    except OSError: # Another worker got there first
+        shutil.rmtree(tmpPath, ignore_errors=True)
+        raise
+
+
+def readCache(cachePath, meta, shared=False):
+    data = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(cachePath, column['file']), allow_pickle=False,
+                         mmap_mode='r' if shared else None)
+        if column['type'] == 'category':
+            dtype = pd.CategoricalDtype(column['levels'])
+            values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        elif column['type'] == 'str':
+            if shared: # Keep the mapped codes, only the levels are private
+                dtype = pd.CategoricalDtype(column['levels'])
+                values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+            else:
+                levels = np.array(column['levels'] + [np.nan], dtype=object)
+                values = levels[values] # Code -1 picks the trailing nan
+        data[column['name']] = values
+    return pd.DataFrame(data, index=pd.RangeIndex(meta['rows']), copy=False)
+
+
+# Smallest integer type that can hold the codes (and -1 for missing)
+def _codeType(levels):
+    for dtype in (np.int8, np.int16, np.int32):
+        if levels < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+# Identify a source file by mtime and size, with the content hash as a fallback
+def _sourceKey(path, digest=None):
+    stat = os.stat(path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': digest or _fileHash(path)}
+
+
+def _fileHash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# Return the cache's meta if it still matches the source file, otherwise None
+def _validCache(cachePath, path):
+    try:
+        with open(os.path.join(cachePath, 'meta.json')) as f:
+            meta = json.load(f)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    source = meta['source']
+    if source['mtime'] == stat.st_mtime and source['size'] == stat.st_size:
+        return meta
+    # Touched but possibly unchanged (eg. copied or checked out again), compare contents
+    if source['size'] == stat.st_size and source['sha1'] == _fileHash(path):
+        meta['source'] = _sourceKey(path, source['sha1'])
+        try:
+            with open(os.path.join(cachePath, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+        except OSError:
+            pass
+        return meta
+    return None
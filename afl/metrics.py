@@ -0,0 +1,226 @@
+import bisect
+import functools
+import itertools
+import logging
+import threading
+import time
+
+from dash import callback_context
+from flask import Response, has_request_context, request
+
+from afl import config
+
+#### Request Counter ####
+# Counts the callback requests (POST /_dash-update-component) the Dash server
+# answers and the total time spent answering them. Take a snapshot before and
+# after an interaction to see how many round trips it cost.
+
+class RequestCounter:
+    def __init__(self, server):
+        self.requests = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        server.before_request(self._start)
+        server.after_request(self._finish)
+
+    def _start(self):
+        self._local.start = time.perf_counter()
+
+    def _finish(self, response):
+        start = getattr(self._local, 'start', None)
+        if start is not None and request.path.endswith('/_dash-update-component'):
+            with self._lock:
+                self.requests += 1
+                self.seconds += time.perf_counter() - start
+        self._local.start = None
+        return response
+
+    def snapshot(self):
+        with self._lock:
+            return {'requests': self.requests, 'seconds': self.seconds}
+
+
+#### Callback Metrics ####
+# Wraps every @callback of a dashboard and records, per callback:
+#   seconds  : whole request, split into phases
+#                total     - request in to response out
+#                data      - callback body outside the figure phase (pandas work)
+#                figure    - callback body after enterPhase('figure') (plotly work)
+#                serialize - Dash turning the result into JSON
+#   bytes    : request (inputs) and response (outputs) JSON sizes
+#   triggers : which component fired it
+# as rolling histograms over the last config.METRICS_WINDOW_S seconds, served in
+# Prometheus text format on config.METRICS_PATH. Anything else with a stats()
+# dict (eg. the figure cache's hits and misses) can be published alongside.
+
+SECONDS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+BYTES_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+PHASES = ['total', 'data', 'figure', 'serialize']
+
+slowLog = logging.getLogger('afl.callbacks')
+
+
+# Histogram over a sliding window, kept as a ring of time slots
+class RollingHistogram:
+    def __init__(self, buckets, window, slots=10):
+        self.buckets = buckets
+        self.slotSeconds = window / slots
+        self.slots = [None] * slots # Each slot: [slot number, counts, sum, count]
+
+    def _slot(self, now):
+        number = int(now // self.slotSeconds)
+        i = number % len(self.slots)
+        if self.slots[i] is None or self.slots[i][0] != number:
+            self.slots[i] = [number, [0] * (len(self.buckets) + 1), 0.0, 0]
+        return self.slots[i]
+
+    def observe(self, value, now=None):
+        slot = self._slot(time.monotonic() if now is None else now)
+        slot[1][bisect.bisect_left(self.buckets, value)] += 1
+        slot[2] += value
+        slot[3] += 1
+
+    # Cumulative bucket counts, sum and count over the window
+    def snapshot(self, now=None):
+        current = int((time.monotonic() if now is None else now) // self.slotSeconds)
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        count = 0
+        for slot in self.slots:
+            if slot is not None and current - slot[0] < len(self.slots):
+                counts = [a + b for a, b in zip(counts, slot[1])]
+                total += slot[2]
+                count += slot[3]
+        return list(itertools.accumulate(counts)), total, count
+
+
+class CallbackMetrics:
+    def __init__(self, server, path=None, window=None, slowMs=None):
+        self.window = config.METRICS_WINDOW_S if window is None else window
+        self.slowMs = config.SLOW_CALLBACK_MS if slowMs is None else slowMs
+        self.seconds = {} # (callback, phase) -> RollingHistogram
+        self.bytes = {} # (callback, direction) -> RollingHistogram
+        self.triggers = {} # (callback, trigger) -> count
+        self.published = [] # (prefix, stats function, counter names)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        server.before_request(self._start)
+        server.after_request(self._finish)
+        server.add_url_rule(path or config.METRICS_PATH, 'afl_metrics', self._serve)
+
+    # Serve the numbers stats() returns as prefix_<name>: the counters as
+    # prefix_<name>_total, everything else as a gauge
+    def publish(self, prefix, stats, counters=()):
+        self.published.append((prefix, stats, set(counters)))
+
+    # Use in place of dash's callback decorator: callback = metrics.instrument(callback)
+    def instrument(self, callbackDecorator):
+        def decorator(*args, **kwargs):
+            register = callbackDecorator(*args, **kwargs)
+            def wrap(function):
+                return register(self._wrap(function))
+            return wrap
+        return decorator
+
+    def _wrap(self, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            local = self._local
+            local.name = function.__name__
+            local.trigger = None
+            if has_request_context():
+                local.trigger = ','.join(str(t['prop_id']) for t in callback_context.triggered) or None
+            local.phases = {}
+            local.phase, local.phaseStart = 'data', time.perf_counter()
+            start = local.phaseStart
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.enterPhase(None)
+                local.callSeconds = time.perf_counter() - start
+                if not has_request_context(): # Called directly (eg. benchmarks), record what we can
+                    self._record(local.name, local.trigger, local.callSeconds, 0, None, None)
+        return timed
+
+    # Mark the start of a phase inside a callback, eg. enterPhase('figure') before building the figure
+    def enterPhase(self, name):
+        local = self._local
+        phase = getattr(local, 'phase', None)
+        if phase is None:
+            return
+        now = time.perf_counter()
+        local.phases[phase] = local.phases.get(phase, 0.0) + now - local.phaseStart
+        local.phase, local.phaseStart = name, now
+
+    def _start(self):
+        self._local.requestStart = time.perf_counter()
+        self._local.name = None
+
+    def _finish(self, response):
+        local = self._local
+        if getattr(local, 'name', None) is not None and request.path.endswith('/_dash-update-component'):
+            total = time.perf_counter() - local.requestStart
+            outBytes = response.content_length
+            if outBytes is None and not response.is_streamed:
+                outBytes = len(response.get_data())
+            self._record(local.name, local.trigger, total, total - local.callSeconds,
+                         request.content_length, outBytes)
+            local.name = None
+        return response
+
+    def _record(self, name, trigger, total, serialize, inBytes, outBytes):
+        phases = dict(self._local.phases, total=total, serialize=serialize)
+        with self._lock:
+            for phase in PHASES:
+                key = (name, phase)
+                if key not in self.seconds:
+                    self.seconds[key] = RollingHistogram(SECONDS_BUCKETS, self.window)
+                self.seconds[key].observe(phases.get(phase, 0.0))
+            for direction, size in (('in', inBytes), ('out', outBytes)):
+                if size is None:
+                    continue
+                key = (name, direction)
+                if key not in self.bytes:
+                    self.bytes[key] = RollingHistogram(BYTES_BUCKETS, self.window)
+                self.bytes[key].observe(size)
+            key = (name, trigger or 'none')
+            self.triggers[key] = self.triggers.get(key, 0) + 1
+        if self.slowMs and total * 1000 >= self.slowMs:
+            slowLog.warning('Slow callback %s: %.1f ms (data %.1f, figure %.1f, serialize %.1f), '
+                            'trigger %s, %s bytes in, %s bytes out',
+                            name, total*1000, phases.get('data', 0)*1000, phases.get('figure', 0)*1000,
+                            serialize*1000, trigger, inBytes, outBytes)
+
+    # Prometheus text exposition format
+    def render(self):
+        lines = []
+        with self._lock:
+            for metric, histograms, label, buckets in (
+                    ('afl_callback_seconds', self.seconds, 'phase', SECONDS_BUCKETS),
+                    ('afl_callback_bytes', self.bytes, 'direction', BYTES_BUCKETS)):
+                lines.append('# TYPE %s histogram' % metric)
+                for (name, value), histogram in sorted(histograms.items()):
+                    counts, total, count = histogram.snapshot()
+                    labels = 'callback="%s",%s="%s"' % (name, label, value)
+                    for le, n in zip([str(b) for b in buckets] + ['+Inf'], counts):
+                        lines.append('%s_bucket{%s,le="%s"} %d' % (metric, labels, le, n))
+                    lines.append('%s_sum{%s} %r' % (metric, labels, total))
+                    lines.append('%s_count{%s} %d' % (metric, labels, count))
+            lines.append('# TYPE afl_callback_triggers_total counter')
+            for (name, trigger), n in sorted(self.triggers.items()):
+                lines.append('afl_callback_triggers_total{callback="%s",trigger="%s"} %d' % (name, trigger, n))
+        for prefix, stats, counters in self.published:
+            for name, value in stats().items():
+                if name in counters:
+                    lines.append('# TYPE %s_%s_total counter' % (prefix, name))
+                    lines.append('%s_%s_total %d' % (prefix, name, value))
+                else:
+                    lines.append('# TYPE %s_%s gauge' % (prefix, name))
+                    lines.append('%s_%s %d' % (prefix, name, value))
+        return '\n'.join(lines) + '\n'
+
+    def _serve(self):
+        if request.remote_addr not in ('127.0.0.1', '::1', None): # Local scrapes only
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,55 @@
+import json
+
+from dash import Patch
+
+from afl.figcache import figureJson
+
+#### Partial Figure Updates ####
+# Graphs stay in the layout and their callbacks send a dash.Patch of only what
+# changed since the figure the page is showing, rather than a whole new figure:
+# a new date window replaces the traces' x/y, a new axis column the trace data
+# and titles, a new team the data and colours. Each graph keeps the figure
+# cache key of what it's showing in a small dcc.Store; the old figure comes
+# back out of the figure cache by that key. When it isn't there (nothing shown
+# yet, evicted, reloaded data, another worker, or a zoomed figure) the whole
+# figure is sent as before.
+
+
+# What to send a graph showing the cached figure under shown (a key, or None)
+# so it shows fig (a plotly figure or its JSON as a dict)
+def figureUpdate(cache, shown, fig):
+    old = cache.peek(tuple(shown)) if shown else None
+    return figurePatch(old, fig)
+
+
+# A Patch turning figure old into new (both as JSON dicts), or new itself when
+# there's nothing to patch against or the traces don't line up
+def figurePatch(old, new):
+    if not isinstance(new, dict): # The same JSON the figure cache holds
+        new = json.loads(figureJson(new))
+    if old is None or len(old.get('data', [])) != len(new.get('data', [])):
+        return new
+    patch = Patch()
+    for i, (oldTrace, newTrace) in enumerate(zip(old['data'], new['data'])):
+        _diff(patch['data'][i], oldTrace, newTrace)
+    _diff(patch['layout'], old.get('layout', {}), new.get('layout', {}))
+    return patch
+
+
+# Assign every value of new that differs from old, and delete what new doesn't have
+# (typed arrays, {'dtype', 'bdata'}, are replaced whole)
+def _diff(patch, old, new):
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif _isBranch(old[key]) and _isBranch(value):
+            _diff(patch[key], old[key], value)
+        elif old[key] != value:
+            patch[key] = value
+    for key in old:
+        if key not in new:
+            del patch[key]
+
+
+def _isBranch(value):
+    return isinstance(value, dict) and 'bdata' not in value
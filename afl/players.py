@@ -0,0 +1,57 @@
+import pandas as pd
+
+#### Player Careers ####
+# One groupby over the stats at start-up gives every (team, player) their
+# games played and per-game averages, so the player card is a dict lookup
+# instead of a filter and sum over the team's stats on every selection.
+
+# Player record for the player card
+class Player:
+    __slots__ = ('name', 'team', 'games', 'GPG', 'BPG', 'PPG', 'DPG')
+
+    def __init__(self, name=None, team=None, games=None, GPG=None, BPG=None, PPG=None, DPG=None):
+        self.name = name
+        self.team = team
+        self.games = games
+        self.GPG = GPG
+        self.BPG = BPG
+        self.PPG = PPG
+        self.DPG = DPG
+
+
+# Columns that describe the game rather than the player's output
+NOT_STATS = ['year', 'gameNumber']
+
+
+class CareerTable:
+    def __init__(self, df_stats):
+        stats = [col for col in df_stats.columns
+                 if col not in NOT_STATS and pd.api.types.is_numeric_dtype(df_stats[col])]
+        grouped = df_stats.groupby(['team', 'displayName'], sort=False, observed=True)
+        totals = grouped[stats].sum()
+
+        # Games is the player's highest career game number (as the card has always shown)
+        table = pd.DataFrame({'games': grouped['gameNumber'].max()})
+        games = table['games']
+        table['GPG'] = (totals['Goals'] / games).round(2)
+        table['BPG'] = (totals['Behinds'] / games).round(2)
+        table['PPG'] = (table['GPG']*6 + table['BPG']).round(2)
+        table['DPG'] = (totals['Disposals'] / games).round(2)
+        # Every other stat as a per-game average too
+        for col in stats:
+            if col not in ('Goals', 'Behinds', 'Disposals'):
+                table[col + ' per game'] = (totals[col] / games).round(2)
+        self.table = table
+
+        # (team, player) -> (games, GPG, BPG, PPG, DPG) for the card
+        cardColumns = ['games', 'GPG', 'BPG', 'PPG', 'DPG']
+        self.cards = dict(zip(table.index, table[cardColumns].itertuples(index=False, name=None)))
+
+    # Player card for one player at one team, or None if they never played for them
+    def player(self, team, name):
+        card = self.cards.get((team, name))
+        if card is None:
+            return None
+        if not card[0] > 0: # No game numbers on file (NaN), nothing to average over
+            return Player(name, team, 0)
+        return Player(name, team, *card)
@@ -0,0 +1,174 @@
+import math
+
+import numpy as np
+
+from afl.dates import windowPositions
+
+#### Team Ratings ####
+# Elo style ratings from one walk over the games in date order. Every team
+# starts at START_RATING; after each game the winner takes rating points from
+# the loser, more for an upset (the home side is given HOME_ADVANTAGE points
+# when working out who was expected to win). Each team's rating after every
+# game it played, and the league's mean and spread after every week, are
+# kept as NumPy time series, so a chart is a binary search and a slice.
+#
+# When games are appended (see afl/reload.py) only the new games are walked:
+# the series are append-only buffers, and a new engine writes past the end of
+# the old one's buffers, so a Dataset still holding the old engine keeps
+# seeing exactly the history it had.
+
+START_RATING = 1500.0
+K_FACTOR = 40.0 # Most points a single game can move a rating
+HOME_ADVANTAGE = 35.0 # Rating points the home side is worth
+
+
+# Growable (dates, values) series; appended() shares the buffers when they have room
+class TimeSeries:
+    __slots__ = ('dates', 'values', 'size')
+
+    def __init__(self, width=1, capacity=64):
+        self.dates = np.empty(capacity, dtype='datetime64[ns]')
+        self.values = np.empty((capacity, width))
+        self.size = 0
+
+    # A series with the new points added after this one's first keep points
+    # (default all of them; this one is left as it is)
+    def appended(self, dates, values, keep=None):
+        keep = self.size if keep is None else keep
+        values = np.asarray(values, dtype=np.float64).reshape(len(dates), -1)
+        size = keep + len(dates)
+        series = TimeSeries.__new__(TimeSeries)
+        series.dates, series.values = self.dates, self.values
+        # Out of room, or replacing points this one still shows: new buffers
+        if size > len(self.dates) or keep < self.size:
+            capacity = max(size, 2*len(self.dates))
+            series.dates = np.empty(capacity, dtype=self.dates.dtype)
+            series.values = np.empty((capacity, self.values.shape[1]))
+            series.dates[:keep] = self.dates[:keep]
+            series.values[:keep] = self.values[:keep]
+        series.dates[keep:size] = dates
+        series.values[keep:size] = values
+        series.size = size
+        return series
+
+    # (dates, values) between two dates (inclusive, None = open ended), as views
+    def window(self, start_date=None, end_date=None):
+        i, j = windowPositions(self.dates[:self.size], start_date, end_date)
+        return self.dates[i:j], self.values[i:j]
+
+
+class RatingEngine:
+    def __init__(self):
+        self.teams = []
+        self.codes = {} # Team name -> position in ratings
+        self.ratings = np.empty(0) # Current rating of every team
+        self.series = {} # Team code -> TimeSeries of the team's rating after each game
+        self.league = TimeSeries(width=2) # Mean and standard deviation of all ratings after each week
+        self.count = 0 # Games walked so far
+        self.last = None # The last game walked, to recognise the same games with more appended
+
+    # Ratings for the date sorted games
+    @classmethod
+    def fromGames(cls, games):
+        return cls().extended(games)
+
+    # Ratings for the date sorted games, walking only the games after the ones
+    # this engine has seen if they are the same games with more appended
+    def update(self, games):
+        if self.count and len(games.index) >= self.count and _gameKey(games, self.count - 1) == self.last:
+            if len(games.index) == self.count:
+                return self
+            return self.extended(games.iloc[self.count:])
+        return RatingEngine.fromGames(games) # Games changed or were inserted earlier, start again
+
+    # A new engine that has also walked these games (which come after any already walked)
+    def extended(self, games):
+        engine = RatingEngine()
+        engine.teams = list(self.teams)
+        engine.codes = dict(self.codes)
+        engine.series = dict(self.series)
+        engine.league = self.league
+
+        dates = games['date'].to_numpy(dtype='datetime64[ns]')
+        home = games['homeTeam'].to_numpy(dtype=object).tolist()
+        away = games['awayTeam'].to_numpy(dtype=object).tolist()
+        homeScore = games['homeTeamScore'].to_numpy(dtype=np.float64).tolist()
+        awayScore = games['awayTeamScore'].to_numpy(dtype=np.float64).tolist()
+        weeks = dates.astype('datetime64[W]')
+        # Last game of its week (the last game walked always counts; its point is
+        # replaced if more games from its week are appended later)
+        weekEnds = np.append(weeks[1:] != weeks[:-1], True).tolist()
+
+        ratings = self.ratings.tolist() # Plain floats are quicker one at a time
+        total = sum(ratings)
+        squares = sum(r*r for r in ratings)
+
+        def code(team):
+            nonlocal total, squares
+            if not isinstance(team, str):
+                return None
+            i = engine.codes.get(team)
+            if i is None: # First game for this team
+                i = engine.codes[team] = len(engine.teams)
+                engine.teams.append(team)
+                ratings.append(START_RATING)
+                total += START_RATING
+                squares += START_RATING*START_RATING
+            return i
+
+        points = {} # Team code -> ([game positions], [rating after each])
+        leagueRows, leagueValues = [], []
+        for i in range(len(dates)):
+            h, a = code(home[i]), code(away[i])
+            if h is not None and a is not None and not (math.isnan(homeScore[i]) or math.isnan(awayScore[i])):
+                rh, ra = ratings[h], ratings[a]
+                expected = 1.0 / (1.0 + 10.0 ** ((ra - rh - HOME_ADVANTAGE) / 400.0))
+                result = 1.0 if homeScore[i] > awayScore[i] else 0.5 if homeScore[i] == awayScore[i] else 0.0
+                delta = K_FACTOR * (result - expected)
+                ratings[h], ratings[a] = rh + delta, ra - delta
+                squares += (rh + delta)**2 - rh*rh + (ra - delta)**2 - ra*ra # total is unchanged
+                for team, rating in ((h, rh + delta), (a, ra - delta)):
+                    rows, values = points.setdefault(team, ([], []))
+                    rows.append(i)
+                    values.append(rating)
+
+            # League mean and spread once the week's last game is in (numpy weeks run
+            # Thursday to Wednesday, so a round's games stay together)
+            if ratings and weekEnds[i]:
+                mean = total / len(ratings)
+                leagueRows.append(i)
+                leagueValues.append((mean, math.sqrt(max(squares/len(ratings) - mean*mean, 0.0))))
+
+        for team, (rows, values) in points.items():
+            series = engine.series.get(team) or TimeSeries()
+            engine.series[team] = series.appended(dates[rows], values)
+        if leagueRows:
+            # The last week walked before was still open: its point is replaced
+            # by the one for the whole week rather than kept alongside it
+            keep = self.league.size
+            if keep and len(dates) and self.league.dates[keep-1].astype('datetime64[W]') == weeks[0]:
+                keep -= 1
+            engine.league = engine.league.appended(dates[leagueRows], leagueValues, keep)
+        engine.ratings = np.array(ratings)
+        engine.count = self.count + len(dates)
+        engine.last = _gameKey(games, len(dates) - 1) if len(dates) else self.last
+        return engine
+
+    # The team's (dates, ratings) between two dates
+    def history(self, team, start_date=None, end_date=None):
+        series = self.series.get(self.codes.get(team))
+        if series is None:
+            return np.empty(0, dtype='datetime64[ns]'), np.empty(0)
+        dates, values = series.window(start_date, end_date)
+        return dates, values[:, 0]
+
+    # The league's (dates, mean, standard deviation) between two dates
+    def leagueHistory(self, start_date=None, end_date=None):
+        dates, values = self.league.window(start_date, end_date)
+        return dates, values[:, 0], values[:, 1]
+
+
+# What identifies a game, to check a longer frame starts with the games already walked
+def _gameKey(games, i):
+    row = games.iloc[i]
+    return tuple(str(row[col]) for col in ('date', 'homeTeam', 'awayTeam', 'homeTeamScore', 'awayTeamScore'))
@@ -0,0 +1,150 @@
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from afl import config
+from afl.loader import compactTable, loadTable, orderTable, readCsvRows, sourcePath
+
+#### Hot Reload ####
+# New rounds are appended to games.csv and stats.csv each week. LiveData keeps
+# the loaded tables and the Dataset built from them, and a background thread
+# checks the files: rows appended since the last look are parsed on their own
+# (never the whole file) and added to the tables, a new Dataset is built with
+# the next version number, and then swapped in with a single assignment.
+# A file that was rewritten rather than appended to is loaded again in full.
+
+reloadLog = logging.getLogger('afl.reload')
+
+GUARD_BYTES = 4096 # Bytes before the read position that must be unchanged for an append
+
+
+# Follows one CSV file, reading only the rows appended since the last read
+class TailReader:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.mark()
+
+    # Remember how far through the file has been read: all of it, as a full
+    # load reads it. A last line with no newline was loaded as a row, so it's
+    # marked as read too; an append must start a new line after it
+    def mark(self):
+        with open(self.path, 'rb') as f:
+            self.header = f.readline()
+            self.columns = list(pd.read_csv(f.name, nrows=0).columns)
+            end = f.seek(0, os.SEEK_END)
+            start = max(0, end - GUARD_BYTES)
+            f.seek(start)
+            tail = f.read()
+        self.offset = end
+        self.guard = tail[-GUARD_BYTES:]
+        self.openLine = end > len(self.header) and not tail.endswith(b'\n')
+        self._stamp()
+
+    def _stamp(self):
+        stat = os.stat(self.path)
+        self.size, self.mtime = stat.st_size, stat.st_mtime
+
+    def changed(self):
+        stat = os.stat(self.path)
+        return stat.st_size != self.size or stat.st_mtime != self.mtime
+
+    # ('append', rows), ('reload', None) if the file was rewritten, or (None, None)
+    def read(self):
+        with open(self.path, 'rb') as f:
+            if f.readline() != self.header:
+                return 'reload', None
+            end = f.seek(0, os.SEEK_END)
+            if end < self.offset:
+                return 'reload', None
+            f.seek(self.offset - len(self.guard))
+            if f.read(len(self.guard)) != self.guard:
+                return 'reload', None
+            chunk = f.read()
+        if self.openLine and chunk and not chunk.startswith((b'\n', b'\r\n')):
+            return 'reload', None # The last line loaded was carried on, it wasn't a whole row
+        self._stamp()
+        complete = chunk.rfind(b'\n') + 1 # Leave a half written last line for next time
+        if complete == 0:
+            return None, None
+        chunk = chunk[:complete]
+        self.offset += complete
+        self.openLine = False
+        self.guard = (self.guard + chunk)[-GUARD_BYTES:]
+        return 'append', readCsvRows(self.name, chunk, self.columns)
+
+
+class LiveData:
+    def __init__(self, tables, build, dataDir=None):
+        self.tables = tables
+        self.build = build # function(frames, version) -> Dataset
+        self.dataDir = dataDir
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.readers = {name: TailReader(name, sourcePath(name, dataDir)) for name in tables}
+        self.frames = {name: self._load(reader) for name, reader in self.readers.items()}
+        self.version = 1
+        self.current = build(self.frames, self.version)
+
+    # Note where the file ends before loading, then load; if it grew while it
+    # was being read, load it again so nothing is read twice
+    def _load(self, reader):
+        for attempt in range(3):
+            reader.mark()
+            frame = loadTable(reader.name, self.dataDir)
+            if not reader.changed():
+                break
+        return frame
+
+    # Call listener(dataset) after every swap (eg. to empty caches)
+    def onSwap(self, listener):
+        self.listeners.append(listener)
+
+    # Check the files once, returns True if a new Dataset was swapped in
+    def refresh(self):
+        with self._lock:
+            frames = dict(self.frames)
+            changed = []
+            for name, reader in self.readers.items():
+                if not reader.changed():
+                    continue
+                kind, rows = reader.read()
+                if kind == 'append' and len(rows.index):
+                    frames[name] = orderTable(name, compactTable(name, pd.concat([frames[name], rows], ignore_index=True)))
+                    changed.append('%s +%d rows' % (name, len(rows.index)))
+                elif kind == 'reload':
+                    frames[name] = self._load(reader)
+                    changed.append('%s reloaded' % name)
+            if not changed:
+                return False
+
+            # Build the new Dataset while requests carry on with the current one
+            start = time.perf_counter()
+            version = self.version + 1
+            dataset = self.build(frames, version)
+            self.frames, self.version, self.current = frames, version, dataset
+        reloadLog.info('Data version %d (%s) built in %.2f s', version, ', '.join(changed),
+                       time.perf_counter() - start)
+        for listener in self.listeners:
+            listener(dataset)
+        return True
+
+    # Check for new data every interval seconds on a background thread
+    def start(self, interval=None):
+        interval = config.RELOAD_S if interval is None else interval
+        if interval <= 0 or self._thread is not None:
+            return
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception:
+                    reloadLog.exception('Reloading the data failed, keeping version %d', self.version)
+        self._thread = threading.Thread(target=watch, name='afl-reload', daemon=True)
+        self._thread.start()
@@ -0,0 +1,47 @@
+import numpy as np
+
+from afl.dates import windowPositions
+
+#### Results Engine ####
+# Cumulative home/away/win/draw counts for every team, in date order, built
+# once from the team index. The record for any date window is two binary
+# searches on the team's dates and a subtraction of the cumulative counts.
+
+class ResultsEngine:
+    def __init__(self, teamIndex):
+        self.teamIndex = teamIndex
+        games = teamIndex.games
+        positions = teamIndex.gamePositions # Every team's games, one team after another
+        self.offsets = teamIndex.gameOffsets
+        self.dates = games['date'].to_numpy()[positions]
+
+        home = teamIndex.gameIsHome
+        homeScore = games['homeTeamScore'].to_numpy()[positions]
+        awayScore = games['awayTeamScore'].to_numpy()[positions]
+        flags = {
+            'homeGames': home,
+            'homeWins': home & (homeScore > awayScore),
+            'awayGames': ~home,
+            'awayWins': ~home & (awayScore > homeScore),
+            'draws': homeScore == awayScore,
+        }
+        # Running totals with a leading 0, over all teams end to end
+        self.cumulative = {name: np.concatenate([[0], np.cumsum(flag, dtype=np.int64)])
+                           for name, flag in flags.items()}
+
+    # W/D/L record for the team between two dates (inclusive, None = open ended)
+    def record(self, team, start_date=None, end_date=None):
+        i = self.teamIndex.codes.get(team)
+        if i is None:
+            first = last = 0
+        else:
+            start, end = self.offsets[i], self.offsets[i+1]
+            lo, hi = windowPositions(self.dates[start:end], start_date, end_date)
+            first, last = start + lo, start + hi
+
+        record = {name: int(counts[last] - counts[first]) for name, counts in self.cumulative.items()}
+        record['games'] = record['homeGames'] + record['awayGames']
+        record['wins'] = record['homeWins'] + record['awayWins']
+        record['losses'] = record['games'] - record['wins'] - record['draws']
+        return record
+
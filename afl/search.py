@@ -0,0 +1,103 @@
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+#### Player Search ####
+# Every (team, player) in the league, built once into sorted lists of
+# normalized names, so each keystroke in the player search is a couple of
+# binary searches plus one find() over the joined names, never a scan in
+# Python. Matches come back best first, alphabetical within each group:
+#   1. the name starts with the query        ('dus'  -> Dustin Martin)
+#   2. a later word starts with the query    ('mart' -> Dustin Martin)
+#   3. the query is anywhere in the name     ('stin' -> Dustin Martin)
+
+SEPARATOR = '|' # Between team and name in a dropdown value (team names never contain it)
+
+
+# Dropdown value for a player at a team, and back again
+def playerKey(team, name):
+    return team + SEPARATOR + name
+
+
+def splitPlayerKey(value):
+    if not value or SEPARATOR not in value:
+        return None, None
+    team, name = value.split(SEPARATOR, 1)
+    return team, name
+
+
+# Lower case, accents dropped, apostrophes and full stops removed, anything
+# else that isn't a letter or digit (spaces, hyphens) as a single space
+def normalizeName(name):
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch)).casefold()
+    name = re.sub(r"['’.]", '', name)
+    return ' '.join(re.sub(r'[^\w]+', ' ', name).split())
+
+
+class PlayerSearch:
+    def __init__(self, players):
+        entries = sorted({(normalizeName(name), name, team) for team, name in players
+                          if isinstance(name, str) and isinstance(team, str)})
+        self.keys = [entry[0] for entry in entries]
+        self.names = [entry[1] for entry in entries]
+        self.teams = [entry[2] for entry in entries]
+
+        # Every later word of every name, to the end of the name ('martin' for 'dustin martin')
+        words = sorted((key[i+1:], n) for n, key in enumerate(self.keys)
+                       for i, ch in enumerate(key) if ch == ' ')
+        self.wordKeys = [word for word, n in words]
+        self.wordRows = [n for word, n in words]
+
+        # All names joined, with where each one starts, for substring matches
+        self.text = '\n'.join(self.keys)
+        self.starts = []
+        offset = 0
+        for key in self.keys:
+            self.starts.append(offset)
+            offset += len(key) + 1
+
+    def __len__(self):
+        return len(self.keys)
+
+    # Up to limit (team, name) matches for the query, best first
+    def search(self, query, limit=20):
+        query = normalizeName(query or '')
+        if not query or limit <= 0:
+            return []
+        rows = []
+        seen = set()
+
+        def add(n):
+            if n not in seen:
+                seen.add(n)
+                rows.append(n)
+            return len(rows) >= limit
+
+        # 1. Names starting with the query are one contiguous run of the sorted keys
+        i = bisect_left(self.keys, query)
+        while i < len(self.keys) and self.keys[i].startswith(query):
+            if add(i):
+                return self._results(rows)
+            i += 1
+
+        # 2. Later words starting with the query, the same way
+        i = bisect_left(self.wordKeys, query)
+        while i < len(self.wordKeys) and self.wordKeys[i].startswith(query):
+            if add(self.wordRows[i]):
+                return self._results(rows)
+            i += 1
+
+        # 3. Anywhere in a name, jumping to the next name after each hit
+        pos = self.text.find(query)
+        while pos != -1:
+            n = bisect_right(self.starts, pos) - 1
+            if add(n):
+                break
+            if n + 1 == len(self.starts):
+                break
+            pos = self.text.find(query, self.starts[n+1])
+        return self._results(rows)
+
+    def _results(self, rows):
+        return [(self.teams[n], self.names[n]) for n in rows]
@@ -0,0 +1,70 @@
+import logging
+import threading
+import time
+
+from flask import Response
+
+from afl import config
+
+#### Lazy Start-Up ####
+# Loading and indexing the data files takes seconds, and nothing is served
+# until a dashboard script has finished running. With AFL_LAZY_START=1 the
+# data is opened on a background thread instead: the script finishes at once,
+# the layout is served as an empty shell, and a polling callback fills in the
+# drop downs and date picker when the data is ready. Callbacks that need the
+# data before then wait for it (or skip the update).
+
+startupLog = logging.getLogger('afl.startup')
+
+READY_POLL_MS = 500 # How often a page still waiting for the data checks on it
+
+
+# open() run on a background thread (or straight away with background=False)
+class BackgroundLoad:
+    def __init__(self, open, background=True, name='afl-load'):
+        self.value = None
+        self.error = None
+        self.seconds = None # How long open() took
+        self._done = threading.Event()
+        if background:
+            threading.Thread(target=self._run, args=(open,), name=name, daemon=True).start()
+        else:
+            self._run(open, catch=False)
+
+    def _run(self, open, catch=True):
+        start = time.perf_counter()
+        try:
+            self.value = open()
+        except Exception as error:
+            if not catch:
+                raise
+            self.error = error
+            startupLog.exception('Loading the data failed')
+        finally:
+            self.seconds = time.perf_counter() - start
+            self._done.set()
+        if self.error is None:
+            startupLog.info('Data ready in %.2f s', self.seconds)
+
+    # True once open() has returned (not if it failed)
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    # What open() returned, waiting for it if need be
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError('data still loading')
+        if self.error is not None:
+            raise RuntimeError('loading the data failed') from self.error
+        return self.value
+
+
+# 200 on path once isReady() is true and 503 until then, for health checks
+# and tools/startup_timing.py
+def addReadyRoute(server, isReady, path=None):
+    def serve():
+        if isReady():
+            return Response('ready\n', mimetype='text/plain')
+        return Response('loading\n', status=503, mimetype='text/plain')
+    server.add_url_rule(path or config.READY_PATH, 'afl_ready', serve)
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+
+from afl import config
+
+#### LRU Cache ####
+# Process-local cache that evicts the least recently used entries once the
+# total size of what it holds goes over maxBytes.
+
+class LRUCache:
+    def __init__(self, maxBytes, sizeof):
+        self.maxBytes = maxBytes
+        self.sizeof = sizeof # Function giving the size in bytes of a cached value
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    # Like get, but not counted as a hit or miss and not marked as recently used
+    def peek(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.maxBytes: # Would evict everything else and still not fit
+                return
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.maxBytes:
+                _, (_, evictedSize) = self._entries.popitem(last=False)
+                self.bytes -= evictedSize
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Bytes used by a data frame, including the python strings it holds
+def frameBytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+#### Server-Side Store ####
+# In 'server' mode the dcc.Store only holds a key like
+#   {'kind': 'stats', 'team': 'Richmond', 'version': 1}
+# and the data frame itself stays in the cache. Each kind has a builder so a
+# key can always be answered, even after eviction or by another worker.
+
+class ServerStore:
+    def __init__(self, builders, maxBytes=None):
+        self.builders = builders # kind -> function(team) returning a data frame
+        self.version = 1 # Bump when the underlying data changes so old keys miss
+        if maxBytes is None:
+            maxBytes = config.STORE_CACHE_MB * 1024 * 1024
+        self.cache = LRUCache(maxBytes, frameBytes)
+
+    def key(self, kind, team):
+        return {'kind': kind, 'team': team, 'version': self.version}
+
+    def put(self, kind, team):
+        key = self.key(kind, team)
+        self.get(key) # Warm the cache so the first reader doesn't pay for the build
+        return key
+
+    def get(self, key):
+        cacheKey = (key['kind'], key['team'], key['version'])
+        df = self.cache.get(cacheKey)
+        if df is None:
+            df = self.builders[key['kind']](key['team'])
+            self.cache.put(cacheKey, df)
+        return df
+
+
+# True if a dcc.Store value is a server-side key rather than the data itself
+def isStoreKey(data):
+    return isinstance(data, dict) and set(data) == {'kind', 'team', 'version'}
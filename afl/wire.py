@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+from afl import config
+
+#### dcc.Store Wire Format ####
+# DataFrame.to_dict() sends {column: {rowIndex: value}}, repeating every row
+# index for every column. The columnar format sends one plain array per column:
+#   numbers : the values ('int', 'float', 'bool')
+#   strings : dictionary encoded, sorted 'levels' plus integer 'codes' (-1 = missing)
+#   dates   : integer days since 1970-01-01 (or milliseconds if they carry a time)
+# and decodes back to typed columns (categoricals, datetime64) in one go.
+
+WIRE_MARKER = 'afl-columnar/1'
+EPOCH = np.datetime64('1970-01-01', 'ns')
+DAY = np.timedelta64(1, 'D')
+MS = np.timedelta64(1, 'ms')
+
+
+def encodeColumnar(df):
+    columns = {}
+    for name, col in df.items():
+        values = col.to_numpy()
+        if pd.api.types.is_datetime64_any_dtype(col):
+            missing = col.isna().to_numpy()
+            if col.dt.tz is not None:
+                values = col.dt.tz_convert(None).to_numpy()
+            delta = values.astype('datetime64[ns]') - EPOCH
+            delta[missing] = np.timedelta64(0, 'ns')
+            if (delta[~missing] % DAY == np.timedelta64(0)).all():
+                column = {'type': 'date', 'values': _withMissing(delta // DAY, missing)}
+            else:
+                column = {'type': 'datetime', 'values': _withMissing(delta // MS, missing)}
+        elif pd.api.types.is_bool_dtype(col) and not col.isna().any():
+            column = {'type': 'bool', 'values': values.astype(bool).tolist()}
+        elif pd.api.types.is_integer_dtype(col) and not col.isna().any():
+            column = {'type': 'int', 'values': values.astype(np.int64).tolist()}
+        elif pd.api.types.is_numeric_dtype(col) and not isinstance(col.dtype, pd.CategoricalDtype):
+            values = col.astype(float).to_numpy()
+            column = {'type': 'float', 'values': _withMissing(values, np.isnan(values))}
+        else: # Strings and anything else: dictionary encode
+            codes, levels = pd.factorize(col, sort=True)
+            column = {'type': 'dict', 'levels': levels.tolist(), 'codes': codes.tolist()}
+        columns[str(name)] = column
+    return {'format': WIRE_MARKER, 'length': len(df.index), 'columns': columns}
+
+
+def decodeColumnar(data):
+    columns = {}
+    for name, column in data['columns'].items():
+        kind = column['type']
+        if kind == 'dict':
+            codes = np.asarray(column['codes'], dtype=np.int64)
+            columns[name] = pd.Categorical.from_codes(codes, categories=pd.Index(column['levels']))
+        elif kind in ('date', 'datetime'):
+            values = np.asarray(column['values'], dtype=float) # None -> nan
+            missing = np.isnan(values)
+            unit = DAY if kind == 'date' else MS
+            dates = EPOCH + np.where(missing, 0, values).astype(np.int64) * unit
+            dates[missing] = np.datetime64('NaT')
+            columns[name] = dates
+        elif kind == 'int':
+            columns[name] = np.asarray(column['values'], dtype=np.int64)
+        elif kind == 'bool':
+            columns[name] = np.asarray(column['values'], dtype=bool)
+        else:
+            columns[name] = np.asarray(column['values'], dtype=float)
+    return pd.DataFrame(columns, index=pd.RangeIndex(data['length']))
+
+
+# Missing values become None (null in JSON)
+def _withMissing(values, missing):
+    if not missing.any():
+        return values.astype(np.int64).tolist() if values.dtype.kind in 'iu' else values.tolist()
+    out = values.astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+def isColumnar(data):
+    return isinstance(data, dict) and data.get('format') == WIRE_MARKER
+
+
+#### Pluggable Encoders ####
+# AFL_WIRE_FORMAT picks the encoder. Decoding looks at the payload itself, so
+# a store written in either format can always be read.
+
+def encodeDict(df):
+    return df.to_dict()
+
+
+def decodeDict(data):
+    return pd.DataFrame(data)
+
+
+WIRE_FORMATS = {
+    'dict': (encodeDict, decodeDict),
+    'columnar': (encodeColumnar, decodeColumnar),
+}
+
+
+def encode(df, format=None):
+    encoder, _ = WIRE_FORMATS[format or config.WIRE_FORMAT]
+    return encoder(df)
+
+
+def decode(data):
+    if isColumnar(data):
+        return decodeColumnar(data)
+    return decodeDict(data)
+
+
+#### Payload Size Report ####
+# Bytes the dcc.Store would send with each format (serialised the way Dash does it)
+
+def payloadBytes(payload):
+    return len(to_json_plotly(payload).encode('utf-8'))
+
+
+def wireReport(df):
+    report = {'rows': len(df.index)}
+    for name, (encoder, _) in WIRE_FORMATS.items():
+        report[name + 'Bytes'] = payloadBytes(encoder(df))
+    report['reduction'] = round(1 - report['columnarBytes'] / max(report['dictBytes'], 1), 3)
+    return report
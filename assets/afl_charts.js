@@ -0,0 +1,69 @@
+// Client-side rendering (AFL_RENDER_MODE=client)
+// The server sends only compact arrays (dates, scores, W/D/L counts, colours)
+// and these build the same figures the python callbacks would, in the browser.
+// Dash loads every script in assets/ automatically; the callbacks are wired up
+// in "AFL Dashboard V2.py" with ClientsideFunction('afl', ...).
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    afl: {
+        // Home and away score scatter (see scoreScatter in "AFL Dashboard V2.py")
+        scoreScatter: function(data, template) {
+            if (!data) { // Data still loading
+                return window.dash_clientside.no_update;
+            }
+            var type = data.webgl ? 'scattergl' : 'scatter';
+            var trace = function(series, name, color) {
+                return {
+                    type: type,
+                    x: series.x,
+                    y: series.y,
+                    name: name,
+                    mode: 'markers',
+                    textfont: {size: 16},
+                    marker: {color: color}
+                };
+            };
+            var colors = data.colours || [];
+            var xaxis = {anchor: 'y', domain: [0, 1], title: {text: 'date'}};
+            if (data.xRange) {
+                xaxis.range = data.xRange;
+            }
+            return {
+                data: [trace(data.home, 'home', colors[0]), trace(data.away, 'away', colors[1])],
+                layout: {
+                    template: template,
+                    xaxis: xaxis,
+                    yaxis: {anchor: 'x', domain: [0, 1], title: {text: 'total score'}},
+                    title: {text: data.team + ' Home and Away Scores'},
+                    uirevision: data.team // Keep zoom and legend choices while the figure is swapped
+                }
+            };
+        },
+
+        // W/D/L pie (see createWDLPie in "AFL Dashboard V2.py")
+        wdlPie: function(data, template) {
+            if (!data) { // Data still loading
+                return window.dash_clientside.no_update;
+            }
+            var counts = data.counts;
+            return {
+                data: [{
+                    type: 'pie',
+                    labels: ['W - ' + counts[0], 'D - ' + counts[1], 'L - ' + counts[2]],
+                    values: counts,
+                    sort: false,
+                    hoverinfo: 'label',
+                    textinfo: 'percent',
+                    textfont: {size: 16},
+                    marker: {colors: data.colours, line: {color: '#000000', width: 2}}
+                }],
+                layout: {
+                    template: template,
+                    title: {text: data.team + ' W/D/L Record'},
+                    plot_bgcolor: 'rgba(0, 0, 0, 0)',
+                    paper_bgcolor: 'rgba(0, 0, 0, 0)'
+                }
+            };
+        }
+    }
+});
@@ -0,0 +1,47 @@
+import pytest
+
+from afl import config
+from afl.backend import PandasBackend, SqliteBackend
+
+GAMES = """gameId,year,round,date,homeTeam,homeTeamScore,awayTeam,awayTeamScore
+1,2020,R1,2020-03-19,Richmond,105,Carlton,81
+2,2020,R2,2020-03-26,Carlton,70,Richmond,70
+"""
+
+STATS = """gameId,team,year,round,displayName,gameNumber,Disposals,Goals,Behinds
+1,Richmond,2020,R1,"Martin, Dustin",1,25,2,1
+2,Richmond,2020,R2,"Martin, Dustin",2,30,1,0
+1,Carlton,2020,R1,"Cripps, Patrick",,28,0,1
+"""
+
+COLOURS = """team,colour1,colour2,colour3
+Richmond,#000000,#FFD200,#FFFFFF
+Carlton,#0E1E2D,#FFFFFF,#031A29
+"""
+
+
+@pytest.fixture(params=['pandas', 'sqlite'])
+def backend(request, tmp_path, monkeypatch):
+    for name, text in (('games', GAMES), ('stats', STATS), ('clubcolours', COLOURS)):
+        (tmp_path / (name + '.csv')).write_text(text)
+    monkeypatch.setattr(config, 'CACHE_DIR', str(tmp_path / '.afl_cache'))
+    monkeypatch.setattr(config, 'INGEST_CACHE', False)
+    (tmp_path / '.afl_cache').mkdir()
+    if request.param == 'pandas':
+        return PandasBackend(str(tmp_path))
+    return SqliteBackend(str(tmp_path))
+
+
+def test_player_card(backend):
+    player = backend.player('Richmond', 'Martin, Dustin')
+    assert (player.games, player.GPG, player.BPG, player.PPG, player.DPG) == (2, 1.5, 0.5, 9.5, 27.5)
+
+
+def test_missing_player_has_no_card(backend):
+    assert backend.player('Richmond', 'Nobody') is None
+    assert backend.player('Nowhere', 'Martin, Dustin') is None
+
+
+def test_player_without_game_numbers_has_no_averages(backend):
+    player = backend.player('Carlton', 'Cripps, Patrick')
+    assert (player.games, player.GPG, player.BPG, player.PPG, player.DPG) == (0, None, None, None, None)
@@ -0,0 +1,43 @@
+import pandas as pd
+from flask import Flask
+
+from afl.export import addExportRoutes
+
+
+# Just enough of a backend for the download routes
+class GamesBackend:
+    def __init__(self):
+        self.calls = []
+
+    def exportGames(self, team=None, start_date=None, end_date=None):
+        self.calls.append((team, start_date, end_date))
+        yield pd.DataFrame({'date': pd.to_datetime(['2020-03-19']), 'homeTeam': ['A'], 'homeTeamScore': [90]})
+
+
+def makeClient():
+    server, backend = Flask(__name__), GamesBackend()
+    addExportRoutes(server, backend, '/export')
+    return server.test_client(), backend
+
+
+def test_bad_date_is_a_bad_request():
+    client, backend = makeClient()
+    for query in ('start_date=bogus', 'end_date=2020-13-45', 'start_date=2020-01-01&end_date=soon'):
+        response = client.get('/export/games.csv?team=A&' + query)
+        assert response.status_code == 400
+        assert b'Traceback' not in response.data
+    assert backend.calls == [] # Nothing was read
+
+
+def test_unknown_format_is_a_bad_request():
+    client, backend = makeClient()
+    response = client.get('/export/games.xlsx?team=A')
+    assert response.status_code == 400
+
+
+def test_good_dates_are_downloaded():
+    client, backend = makeClient()
+    response = client.get('/export/games.csv?team=A&start_date=2020-01-01&end_date=2020-12-31')
+    assert response.status_code == 200
+    assert response.data.decode().splitlines()[0] == 'date,homeTeam,homeTeamScore'
+    assert backend.calls == [('A', '2020-01-01', '2020-12-31')]
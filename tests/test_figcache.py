@@ -0,0 +1,34 @@
+from flask import Flask
+
+from afl.figcache import FigureCache
+from afl.metrics import CallbackMetrics
+from afl.patch import figureUpdate
+
+FIGURE = {'data': [{'type': 'scatter', 'x': [1, 2], 'y': [3, 4]}], 'layout': {'title': {'text': 'A'}}}
+
+
+def test_patching_against_the_shown_figure_is_not_counted():
+    cache = FigureCache(maxBytes=1 << 20)
+    cache.put(('scatter', 'A'), FIGURE)
+    assert cache.get(('scatter', 'A')) == FIGURE
+    assert cache.get(('scatter', 'B')) is None
+    figureUpdate(cache, ['scatter', 'A'], dict(FIGURE, layout={'title': {'text': 'B'}}))
+    figureUpdate(cache, ['scatter', 'B'], FIGURE)
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_figure_cache_stats_are_on_metrics():
+    server, cache = Flask(__name__), FigureCache(maxBytes=1 << 20)
+    metrics = CallbackMetrics(server, path='/metrics')
+    metrics.publish('afl_figure_cache', cache.stats, counters=['hits', 'misses'])
+    cache.put(('scatter', 'A'), FIGURE)
+    cache.get(('scatter', 'A'))
+    cache.get(('scatter', 'A'))
+    cache.get(('scatter', 'B'))
+
+    lines = server.test_client().get('/metrics').data.decode().splitlines()
+    assert 'afl_figure_cache_hits_total 2' in lines
+    assert 'afl_figure_cache_misses_total 1' in lines
+    assert 'afl_figure_cache_entries 1' in lines
+    assert '# TYPE afl_figure_cache_bytes gauge' in lines
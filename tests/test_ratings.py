@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from afl.ratings import RatingEngine
+
+
+# Two games every few days across several weeks, with a draw and a missing score
+def makeGames():
+    dates = pd.to_datetime(['2020-03-19', '2020-03-19', '2020-03-21', '2020-03-22', '2020-03-26',
+                            '2020-03-28', '2020-03-29', '2020-04-02', '2020-04-04', '2020-04-05'])
+    return pd.DataFrame({
+        'date': dates,
+        'homeTeam': ['A', 'C', 'B', 'D', 'A', 'B', 'C', 'D', 'A', 'C'],
+        'awayTeam': ['B', 'D', 'C', 'A', 'C', 'D', 'A', 'B', 'D', 'B'],
+        'homeTeamScore': [100, 80, 75, 90, 60, 88, 70, np.nan, 95, 81],
+        'awayTeamScore': [90, 85, 75, 70, 99, 60, 71, 50, 94, 82],
+    })
+
+
+def assertSameEngine(engine, replay):
+    for team in replay.teams:
+        dates, ratings = engine.history(team)
+        replayDates, replayRatings = replay.history(team)
+        np.testing.assert_array_equal(dates, replayDates)
+        np.testing.assert_allclose(ratings, replayRatings)
+    for got, expected in zip(engine.leagueHistory(), replay.leagueHistory()):
+        np.testing.assert_allclose(got.astype(np.float64), expected.astype(np.float64))
+
+
+def test_append_mid_week_matches_full_replay():
+    games = makeGames()
+    replay = RatingEngine.fromGames(games)
+    for split in range(1, len(games.index)):
+        engine = RatingEngine.fromGames(games.iloc[:split]).update(games)
+        assertSameEngine(engine, replay)
+
+
+def test_old_engine_keeps_its_history_after_an_append():
+    games = makeGames()
+    old = RatingEngine.fromGames(games.iloc[:3]) # Ends part way through a week
+    before = [values.copy() for values in old.leagueHistory()]
+    old.update(games)
+    for got, expected in zip(old.leagueHistory(), before):
+        np.testing.assert_array_equal(got, expected)
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from afl import config, reload
+from afl.reload import LiveData
+
+HEADER = 'date,homeTeam,homeTeamScore,awayTeam,awayTeamScore\n'
+
+
+def row(i):
+    return '2020-03-%02d,Team%d,%d,Team%d,%d' % (1 + i % 28, i % 5, 60 + i, (i + 1) % 5, 70 + i)
+
+
+@pytest.fixture
+def dataDir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'INGEST_CACHE', False) # Straight from the CSV
+    return tmp_path
+
+
+def writeGames(dataDir, text, mode='w'):
+    with open(dataDir / 'games.csv', mode) as f:
+        f.write(text)
+
+
+def liveGames(dataDir):
+    return LiveData(['games'], lambda frames, version: frames['games'], str(dataDir))
+
+
+def test_rows_written_while_reloading_are_not_read_twice(dataDir, monkeypatch):
+    writeGames(dataDir, HEADER + ''.join(row(i) + '\n' for i in range(3)))
+    live = liveGames(dataDir)
+
+    # Rewrite the file, and have two more rows land just as it's being loaded again
+    loadTable, landed = reload.loadTable, []
+    def loadWithLateRows(name, dataDir=None):
+        if not landed:
+            landed.append(True)
+            with open(os.path.join(dataDir, 'games.csv'), 'a') as f:
+                f.write(row(10) + '\n' + row(11) + '\n')
+        return loadTable(name, dataDir)
+    monkeypatch.setattr(reload, 'loadTable', loadWithLateRows)
+    writeGames(dataDir, HEADER + ''.join(row(i) + '\n' for i in range(4, 8)))
+    assert live.refresh()
+    monkeypatch.setattr(reload, 'loadTable', loadTable)
+
+    live.refresh() # Nothing new, or at least nothing already loaded
+    assert len(live.current.index) == 6
+    assert sorted(live.current['homeTeamScore']) == sorted([64, 65, 66, 67, 70, 71])
+
+
+def test_last_line_without_newline_is_not_read_twice(dataDir):
+    writeGames(dataDir, HEADER + row(0) + '\n' + row(1)) # No newline after the last row
+    live = liveGames(dataDir)
+    assert len(live.current.index) == 2
+
+    writeGames(dataDir, '\n' + row(2) + '\n', 'a')
+    assert live.refresh()
+    assert sorted(live.current['homeTeamScore']) == [60, 61, 62]
+
+
+def test_last_line_carried_on_is_loaded_again(dataDir):
+    writeGames(dataDir, HEADER + row(0) + '\n' + row(1)[:-1]) # Last row cut short
+    live = liveGames(dataDir)
+
+    writeGames(dataDir, row(1)[-1:] + '\n' + row(2) + '\n', 'a')
+    assert live.refresh()
+    assert sorted(live.current['homeTeamScore']) == [60, 61, 62]
+    assert sorted(live.current['awayTeamScore']) == [70, 71, 72]
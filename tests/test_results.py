@@ -0,0 +1,60 @@
+import pytest
+
+from afl import config
+from afl.backend import PandasBackend, SqliteBackend
+
+# Richmond: a win before the window, a home win and a home loss on its first and
+# last days, a draw and an away loss inside it and an away win after it
+GAMES = """gameId,year,round,date,homeTeam,homeTeamScore,awayTeam,awayTeamScore
+1,2020,R1,2020-03-12,Richmond,90,Carlton,60
+2,2020,R2,2020-03-19,Richmond,105,Carlton,81
+3,2020,R3,2020-03-26,Carlton,70,Richmond,70
+4,2020,R4,2020-04-02,Carlton,88,Richmond,75
+5,2020,R5,2020-04-09,Richmond,50,Carlton,64
+6,2020,R6,2020-04-16,Carlton,40,Richmond,99
+"""
+
+STATS = """gameId,team,year,round,displayName,gameNumber,Disposals,Goals,Behinds
+1,Richmond,2020,R1,"Martin, Dustin",1,25,2,1
+"""
+
+COLOURS = """team,colour1,colour2,colour3
+Richmond,#000000,#FFD200,#FFFFFF
+Carlton,#0E1E2D,#FFFFFF,#031A29
+"""
+
+
+@pytest.fixture(params=['pandas', 'sqlite'])
+def backend(request, tmp_path, monkeypatch):
+    for name, text in (('games', GAMES), ('stats', STATS), ('clubcolours', COLOURS)):
+        (tmp_path / (name + '.csv')).write_text(text)
+    monkeypatch.setattr(config, 'CACHE_DIR', str(tmp_path / '.afl_cache'))
+    monkeypatch.setattr(config, 'INGEST_CACHE', False)
+    (tmp_path / '.afl_cache').mkdir()
+    if request.param == 'pandas':
+        return PandasBackend(str(tmp_path))
+    return SqliteBackend(str(tmp_path))
+
+
+def winsDrawsLosses(record):
+    return record['games'], record['wins'], record['draws'], record['losses']
+
+
+def test_record_includes_both_boundary_days(backend):
+    record = backend.record('Richmond', '2020-03-19', '2020-04-09')
+    assert winsDrawsLosses(record) == (4, 1, 1, 2)
+    assert (record['homeGames'], record['homeWins'], record['awayGames'], record['awayWins']) == (2, 1, 2, 0)
+
+
+def test_record_counts_a_draw_for_both_sides(backend):
+    assert winsDrawsLosses(backend.record('Carlton', '2020-03-26', '2020-03-26')) == (1, 0, 1, 0)
+
+
+def test_open_ended_record(backend):
+    assert winsDrawsLosses(backend.record('Richmond')) == (6, 3, 1, 2)
+    assert winsDrawsLosses(backend.record('Richmond', start_date='2020-04-09')) == (2, 1, 0, 1)
+    assert winsDrawsLosses(backend.record('Richmond', end_date='2020-03-19')) == (2, 2, 0, 0)
+
+
+def test_unknown_team_has_an_empty_record(backend):
+    assert winsDrawsLosses(backend.record('Nowhere')) == (0, 0, 0, 0)
@@ -0,0 +1,205 @@
+# Benchmark the dashboard callbacks by calling them directly
+#   python tools/bench.py --data <data folder> --out results.json [--repeat 30] [--backend sqlite] [--render client]
+#   python tools/bench.py --compare before.json after.json
+# For every callback: p50/p99 latency, peak memory (tracemalloc) and the JSON
+# bytes going in and out, as the browser would send and receive them. Figure
+# caches and the server-side store are emptied before every call so the
+# numbers are for the real work.
+# Make data with tools/make_synthetic_data.py.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dashclient import ROOT, loadScript
+
+TEAMS = ['Richmond', 'Sydney', 'Geelong', 'Collingwood', 'Hawthorn', 'West Coast']
+SEARCHES = ['d', 'da', 'dan', 'mar', 'smith', 'son', 'xq'] # Player search keystrokes
+
+
+def jsonBytes(value):
+    from plotly.io.json import to_json_plotly
+    return len(to_json_plotly(value).encode('utf-8'))
+
+
+# What the browser would send back: the payload after a JSON round trip
+def roundTrip(value):
+    from plotly.io.json import to_json_plotly
+    return json.loads(to_json_plotly(value))
+
+
+def emptyCaches(modules):
+    for module in modules:
+        cache = getattr(module, 'figureCache', None)
+        if cache is not None:
+            cache.invalidate()
+        store = getattr(module, 'serverStore', None) # AFL_STORE_MODE=server keeps the team's data here
+        if store is not None:
+            store.cache.clear()
+
+
+# (name, function, list of argument tuples) for every callback being measured
+def cases(v2, v1, teams):
+    first, last = v2.backend.dateRange()
+    version = v2.backend.version
+    firstDate, lastDate = str(first.date()), str(last.date())
+    midDate = str((first + (last - first) / 2).date())
+    league = v2.backend.teams()
+    games = {team: roundTrip(v2.storeGameData(team)) for team in teams}
+    stats = {team: roundTrip(v2.storeStatData(team)) for team in teams}
+    colours = {team: roundTrip(v2.storeTeamColours(team)) for team in teams}
+    players = {}
+    for team in teams:
+        options = v2.updatePlayerList(stats[team], team, None, None)
+        players[team] = options[len(options) // 2]['value'] if options else None
+    v1Data = {team: roundTrip(v1.store_data(team, version)) for team in teams}
+
+    return [
+        ('storeGameData', v2.storeGameData, [(t,) for t in teams]),
+        ('storeStatData', v2.storeStatData, [(t,) for t in teams]),
+        ('updatePlayerList', v2.updatePlayerList, [(stats[t], t, None, None) for t in teams]),
+        ('searchPlayers', v2.updatePlayerList, [(stats[t], t, q, None) for t in teams[:1] for q in SEARCHES]),
+        ('updatePlayerCard', v2.updatePlayerCard, [(players[t], stats[t]) for t in teams]),
+        ('createHAScoreScatter', v2.createHAScoreScatter,
+            [(games[t], colours[t], t, firstDate, lastDate, version, None) for t in teams]),
+        ('createWDLPie', v2.createWDLPie, [(colours[t], t, midDate, lastDate, None) for t in teams]),
+        ('createRatingChart', v2.createRatingChart, [(colours[t], t, firstDate, lastDate, None) for t in teams]),
+        ('createHeadToHead', v2.createHeadToHead,
+            [(m, firstDate, lastDate, version, None) for m in ('winRate', 'avgMargin')]
+            + [('winRate', midDate, lastDate, version, None)]),
+        ('createComparison1', v2.createComparison,
+            [([t], firstDate, lastDate, version, None, None) for t in teams]),
+        ('createComparison8', v2.createComparison,
+            [(league[:8], firstDate, lastDate, version, None, None), (league[-8:], midDate, lastDate, version, None, None)]),
+        ('createLeaderTable', v2.createLeaderTable,
+            [(stat, mode, 10, start, lastDate, version) for stat in ('Goals', 'Disposals', 'Tackles')
+             for mode in ('perGame', 'total') for start in (firstDate, midDate)]),
+        ('createGraph', v1.createGraph,
+            [(v1Data[t], firstDate, lastDate, 'date', 'teamScore', t, version, None) for t in teams]),
+    ]
+
+
+def measure(name, function, argList, repeat, modules):
+    times = []
+    for r in range(repeat):
+        for args in argList:
+            emptyCaches(modules)
+            start = time.perf_counter()
+            function(*args)
+            times.append(time.perf_counter() - start)
+
+    # Peak memory in a separate pass, tracemalloc slows everything down
+    peak = 0
+    for args in argList:
+        emptyCaches(modules)
+        tracemalloc.start()
+        function(*args)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    times = np.array(times) * 1000
+    return {
+        'calls': len(times),
+        'p50_ms': round(float(np.percentile(times, 50)), 3),
+        'p99_ms': round(float(np.percentile(times, 99)), 3),
+        'mean_ms': round(float(times.mean()), 3),
+        'peak_kib': round(peak / 1024, 1),
+        'input_bytes': int(np.mean([jsonBytes(list(args)) for args in argList])),
+        'output_bytes': int(np.mean([jsonBytes(function(*args)) for args in argList])),
+    }
+
+
+def gitCommit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def run(args):
+    if args.data:
+        os.environ['AFL_DATA_DIR'] = args.data
+    if args.backend:
+        os.environ['AFL_BACKEND'] = args.backend
+    if args.render:
+        os.environ['AFL_RENDER_MODE'] = args.render
+    import pandas as pd
+
+    startup = {}
+    start = time.perf_counter()
+    v2 = loadScript(os.path.join(ROOT, 'AFL Dashboard V2.py'))
+    startup['AFL Dashboard V2.py'] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    v1 = loadScript(os.path.join(ROOT, 'AFL Dashboard.py'))
+    startup['AFL Dashboard.py'] = round(time.perf_counter() - start, 3)
+
+    teams = [t for t in (args.teams or TEAMS) if t in set(v2.backend.teams())]
+    results = {
+        'meta': {
+            'commit': gitCommit(),
+            'data': os.environ.get('AFL_DATA_DIR'),
+            'backend': v2.backend.name,
+            'render': v2.config.RENDER_MODE,
+            **v2.backend.counts(),
+            'teams': teams,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'startup_s': startup,
+        },
+        'callbacks': {},
+    }
+    modules = [v2, v1]
+    for name, function, argList in cases(v2, v1, teams):
+        results['callbacks'][name] = measure(name, function, argList, args.repeat, modules)
+        r = results['callbacks'][name]
+        print('%-22s p50 %9.2f ms   p99 %9.2f ms   peak %9.1f KiB   out %10d B' % (
+            name, r['p50_ms'], r['p99_ms'], r['peak_kib'], r['output_bytes']))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('Results written to', args.out)
+
+
+def compare(before, after):
+    with open(before) as f:
+        a = json.load(f)
+    with open(after) as f:
+        b = json.load(f)
+    print('%s (%s) -> %s (%s)' % (before, a['meta'].get('commit'), after, b['meta'].get('commit')))
+    print('%-22s %12s %12s %12s %14s' % ('callback', 'p50 ms', 'p99 ms', 'peak KiB', 'output bytes'))
+    for name in a['callbacks']:
+        if name not in b['callbacks']:
+            continue
+        x, y = a['callbacks'][name], b['callbacks'][name]
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'peak_kib', 'output_bytes'):
+            ratio = y[key] / x[key] if x[key] else float('nan')
+            cells.append('%.2fx' % ratio)
+        print('%-22s %12s %12s %12s %14s' % (name, *cells))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard callbacks')
+    parser.add_argument('--data', help='data folder (default AFL_DATA_DIR)')
+    parser.add_argument('--out', help='write results as JSON here')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--teams', nargs='*')
+    parser.add_argument('--backend', choices=['pandas', 'sqlite'], help='data backend (default AFL_BACKEND)')
+    parser.add_argument('--render', choices=['server', 'client'], help='where the scatter and pie are drawn (default AFL_RENDER_MODE)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
@@ -0,0 +1,151 @@
+# Drive a dashboard the way the browser does, without a browser
+# Loads a dashboard script, then plays an input change through Flask's test
+# client: every callback downstream of the change is posted to
+# /_dash-update-component in dependency order, once, like the Dash renderer.
+# Clientside callbacks run in the browser, so they're skipped (their outputs
+# keep the values they have). Partial updates (dash.Patch) are applied to the
+# value the prop has, like the renderer does.
+import importlib.util
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# Import a dashboard script by path (the names have spaces so plain import won't do)
+def loadScript(path):
+    name = os.path.splitext(os.path.basename(path))[0].replace(' ', '_').replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _key(id, prop):
+    return '%s.%s' % (id, prop)
+
+
+def _outputs(dep):
+    output = dep['output']
+    if output.startswith('..'): # Multi output: '..a.data...b.data..'
+        parts = output[2:-2].split('...')
+    else:
+        parts = [output]
+    return [tuple(part.split('@')[0].rsplit('.', 1)) for part in parts] # 'id.prop@hash' when allow_duplicate
+
+
+# Collect every component prop in the layout (id.prop -> value)
+def _layoutProps(node, props):
+    if isinstance(node, dict):
+        if 'props' in node and isinstance(node['props'], dict):
+            nodeProps = node['props']
+            if isinstance(nodeProps.get('id'), str):
+                for prop, value in nodeProps.items():
+                    props[_key(nodeProps['id'], prop)] = value
+            _layoutProps(nodeProps.get('children'), props)
+            for value in nodeProps.values():
+                if isinstance(value, (dict, list)):
+                    _layoutProps(value, props)
+    elif isinstance(node, list):
+        for child in node:
+            _layoutProps(child, props)
+
+
+# A prop's value with a dash.Patch applied (the operations the figure patches use)
+def applyPatch(value, patch):
+    value = json.loads(json.dumps(value if value is not None else {})) # Leave the old value as it was
+    for operation in patch['operations']:
+        *path, last = operation['location']
+        target = value
+        for step in path:
+            if isinstance(target, dict):
+                target = target.setdefault(step, {})
+            else:
+                target = target[step]
+        if operation['operation'] == 'Assign':
+            target[last] = operation['params']['value']
+        elif operation['operation'] == 'Delete':
+            if isinstance(target, dict):
+                target.pop(last, None)
+            else:
+                del target[last]
+        else:
+            raise ValueError('Patch operation not handled: ' + operation['operation'])
+    return value
+
+
+class DashClient:
+    def __init__(self, app):
+        self.app = app
+        self.client = app.server.test_client()
+        self.deps = [dep for dep in json.loads(self.client.get('/_dash-dependencies').data)
+                     if not dep.get('clientside_function')]
+        self.props = {}
+        _layoutProps(json.loads(self.client.get('/_dash-layout').data), self.props)
+        self.requests = 0
+        self.bytesIn = 0
+        self.bytesOut = 0
+
+    # Post one callback with the current prop values
+    def call(self, dep, changed):
+        outputs = [{'id': id, 'property': prop} for id, prop in _outputs(dep)]
+        payload = {
+            'output': dep['output'],
+            'outputs': outputs if dep['output'].startswith('..') else outputs[0],
+            'inputs': [dict(i, value=self.props.get(_key(i['id'], i['property']))) for i in dep['inputs']],
+            'state': [dict(s, value=self.props.get(_key(s['id'], s['property']))) for s in dep['state']],
+            'changedPropIds': [c for c in changed],
+        }
+        body = json.dumps(payload)
+        response = self.client.post('/_dash-update-component', data=body, content_type='application/json')
+        self.requests += 1
+        self.bytesOut += len(body)
+        self.bytesIn += len(response.data)
+        updated = []
+        if response.status_code == 200:
+            for id, props in json.loads(response.data)['response'].items():
+                for prop, value in props.items():
+                    if isinstance(value, dict) and '__dash_patch_update' in value:
+                        value = applyPatch(self.props.get(_key(id, prop)), value)
+                    self.props[_key(id, prop)] = value
+                    updated.append(_key(id, prop))
+        return updated
+
+    # Set a prop and run everything downstream of it, in dependency order
+    def change(self, id, prop, value):
+        self.props[_key(id, prop)] = value
+        return self.fire([_key(id, prop)])
+
+    def fire(self, changed):
+        changed = set(changed)
+        # Callbacks reachable from the change
+        pending = []
+        frontier = set(changed)
+        while frontier:
+            reached = set()
+            for dep in self.deps:
+                if dep in pending:
+                    continue
+                if any(_key(i['id'], i['property']) in frontier for i in dep['inputs']):
+                    pending.append(dep)
+                    reached.update(_key(id, prop) for id, prop in _outputs(dep))
+            frontier = reached
+        # Run a callback once none of its inputs are still waiting on another pending callback
+        done = []
+        while pending:
+            waiting = set()
+            for dep in pending:
+                waiting.update(_key(id, prop) for id, prop in _outputs(dep))
+            ready = [dep for dep in pending
+                     if not any(_key(i['id'], i['property']) in waiting for i in dep['inputs'])]
+            if not ready: # Cycle, just run the rest in order
+                ready = pending[:1]
+            for dep in ready:
+                inputs = [_key(i['id'], i['property']) for i in dep['inputs']]
+                changed.update(self.call(dep, [k for k in inputs if k in changed]))
+                pending.remove(dep)
+                done.append(dep['output'])
+        return done
@@ -0,0 +1,45 @@
+# Compare cold start times loading the data from CSV and from the binary cache
+#   python tools/ingest_timing.py [data folder]
+# Each load runs in a fresh python process so nothing is shared between runs.
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TABLES = ['games', 'stats', 'clubcolours']
+
+
+# Load every table once in this process and print the seconds it took
+def child(useCache):
+    start = time.perf_counter()
+    from afl.loader import loadTable
+    for name in TABLES:
+        loadTable(name, useCache=useCache)
+    print(time.perf_counter() - start)
+
+
+def run(mode, env):
+    out = subprocess.run([sys.executable, __file__, '--child', mode], env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2] != 'csv')
+        sys.exit()
+
+    env = dict(os.environ)
+    if len(sys.argv) > 1:
+        env['AFL_DATA_DIR'] = sys.argv[1]
+        env.setdefault('AFL_CACHE_DIR', os.path.join(sys.argv[1], '.afl_cache'))
+
+    csv = min(run('csv', env) for _ in range(3))
+    build = run('cache', env) # Builds the cache if it's missing or stale
+    cached = min(run('cache', env) for _ in range(3))
+    print('CSV cold start:           %.3f s' % csv)
+    print('First start (csv + cache): %.3f s' % build)
+    print('Cached cold start:        %.3f s  (%.1fx faster)' % (cached, csv / cached))
@@ -0,0 +1,60 @@
+# Count the requests, server time and bytes each kind of interaction costs
+#   python tools/interaction_profile.py "AFL Dashboard.py" [--repeat 3]
+# Plays the same changes through the dashboard the way the browser would
+# (team, date window, axis, head to head or comparison choices, whichever the
+# script has) and prints the totals for each. Point it at an older copy of the
+# script to compare before and after.
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dashclient import DashClient, loadScript
+from afl.metrics import RequestCounter
+
+TEAMS = ['Sydney', 'Geelong', 'Richmond', 'Hawthorn']
+
+
+# (label, id, prop, values) for the changes this dashboard has inputs for
+def interactions(client):
+    first = pd.Timestamp(client.props['date-picker-range.min_date_allowed'])
+    last = pd.Timestamp(client.props['date-picker-range.max_date_allowed'])
+    day = lambda fraction: str((first + (last - first) * fraction).date())
+    cases = [
+        ('team', 'dropdown-team', 'value', TEAMS),
+        ('team', 'dropdown-home-team', 'value', TEAMS),
+        ('start date', 'date-picker-range', 'start_date', [day(0.5), day(0.6), day(0.7), day(0.8)]),
+        ('end date', 'date-picker-range', 'end_date', [day(0.95), day(0.9), day(0.85), day(1)]),
+        ('y axis', 'dropdown-y-axis', 'value', ['awayTeamScore', 'teamScore', 'homeTeamScore', 'teamScore']),
+        ('x axis', 'dropdown-x-axis', 'value', ['homeTeamScore', 'date', 'awayTeamScore', 'date']),
+        ('head to head', 'radio-h2h-metric', 'value', ['avgMargin', 'winRate', 'avgMargin', 'winRate']),
+        ('compare', 'dropdown-compare-teams', 'value', [TEAMS[:2], TEAMS[2:], TEAMS, TEAMS[:1]]),
+    ]
+    return [case for case in cases if '%s.%s' % (case[1], case[2]) in client.props]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Requests, server time and bytes per interaction')
+    parser.add_argument('script', nargs='?', default='AFL Dashboard V2.py')
+    parser.add_argument('--repeat', type=int, default=1, help='times through every change')
+    args = parser.parse_args()
+
+    dashboard = loadScript(args.script)
+    counter = RequestCounter(dashboard.app.server)
+    client = DashClient(dashboard.app)
+    client.fire(list(client.props)) # Initial page load
+
+    print('%-14s %8s %9s %12s %12s %12s' % ('change', 'changes', 'requests', 'server ms', 'bytes in', 'bytes/change'))
+    for label, id, prop, values in interactions(client):
+        before = counter.snapshot()
+        bytesIn = client.bytesIn
+        for r in range(args.repeat):
+            for value in values:
+                client.change(id, prop, value)
+        after = counter.snapshot()
+        changes = args.repeat * len(values)
+        print('%-14s %8d %9d %12.1f %12d %12d' % (
+            label, changes, after['requests'] - before['requests'], (after['seconds'] - before['seconds'])*1000,
+            client.bytesIn - bytesIn, (client.bytesIn - bytesIn) / changes))
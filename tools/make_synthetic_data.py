@@ -0,0 +1,240 @@
+# Write synthetic games.csv, stats.csv and clubcolours.csv with the same columns as the real data
+#   python tools/make_synthetic_data.py <out folder> [--seasons 125] [--teams 18] [--seed 0]
+# The real league is roughly 125 seasons of 18 teams. Scale up with more
+# seasons (dates run from 1897, so up to ~300) and/or more teams, eg.
+#   --seasons 125 --teams 1800   about 100x the real league history
+# Scores are the sum of the players' goals and behinds (plus rushed behinds)
+# so games and stats agree with each other.
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+CLUBS = [
+    ('Adelaide', '#002B5C', '#E21937', '#FFD200'),
+    ('Brisbane Lions', '#A30046', '#0054A4', '#FDBE57'),
+    ('Carlton', '#031A29', '#FFFFFF', '#0E1E2D'),
+    ('Collingwood', '#000000', '#FFFFFF', '#7F7F7F'),
+    ('Essendon', '#CC2031', '#000000', '#FFFFFF'),
+    ('Fremantle', '#2A1A54', '#FFFFFF', '#A7A9AC'),
+    ('Geelong', '#1C3C63', '#FFFFFF', '#7F7F7F'),
+    ('Gold Coast', '#D93E39', '#F4EC45', '#0F64AB'),
+    ('Greater Western Sydney', '#F15C22', '#4A4F55', '#FFFFFF'),
+    ('Hawthorn', '#4D2004', '#FBBF15', '#FFFFFF'),
+    ('Melbourne', '#0F1131', '#CC2031', '#FFFFFF'),
+    ('North Melbourne', '#013B9F', '#FFFFFF', '#7F7F7F'),
+    ('Port Adelaide', '#01B5B6', '#000000', '#FFFFFF'),
+    ('Richmond', '#FED102', '#000000', '#7F7F7F'),
+    ('St Kilda', '#ED0F05', '#000000', '#FFFFFF'),
+    ('Sydney', '#ED171F', '#FFFFFF', '#7F7F7F'),
+    ('West Coast', '#062EE2', '#FFD700', '#FFFFFF'),
+    ('Western Bulldogs', '#014896', '#BD002B', '#FFFFFF'),
+]
+VENUES = ['M.C.G.', 'S.C.G.', 'Docklands', 'Gabba', 'Adelaide Oval', 'Perth Stadium',
+          'Kardinia Park', 'Carrara', 'Sydney Showground', 'York Park', 'Manuka Oval']
+FIRST = ['Jack', 'Tom', 'Josh', 'Sam', 'Will', 'Ben', 'Luke', 'Dan', 'Matt', 'Nick', 'Jake',
+         'Liam', 'Harry', 'Charlie', 'Max', 'Zac', 'Tim', 'Dylan', 'Jordan', 'Mitch', 'Lachie',
+         'Ollie', 'Darcy', 'Jarrod', 'Patrick', 'Marcus', 'Dustin', 'Shane', 'Trent', 'Kane']
+LAST = ['Riewoldt', 'Martin', 'Cotchin', 'Dangerfield', 'Pendlebury', 'Kennedy', 'Franklin',
+        'Selwood', 'Fyfe', 'Neale', 'Oliver', 'Petracca', 'Bontempelli', 'Macrae', 'Gawn',
+        'Grundy', 'Hawkins', 'Cameron', 'Lynch', 'Naughton', 'Walters', 'Mitchell', 'Boak',
+        'Gray', 'Wines', 'Kelly', 'Whitfield', 'Coniglio', 'Taranto', 'Heeney', 'Parker',
+        'Mills', 'Lloyd', 'Rampe', 'Jones', 'Smith', 'Brown', 'Wilson', 'Taylor', 'Murphy']
+ROUNDS = ['R%d' % i for i in range(1, 23)]
+FINALS = ['EF', 'EF', 'QF', 'QF', 'SF', 'SF', 'PF', 'PF', 'GF'] # One game each
+SQUAD = 40 # Players on a list each season
+PLAYING = 22 # Players picked each game
+STAT_COLUMNS = ['Disposals', 'Kicks', 'Marks', 'Handballs', 'Goals', 'Behinds', 'Hit Outs',
+                'Tackles', 'Rebounds', 'Inside 50s', 'Clearances', 'Clangers', 'Frees',
+                'Frees Against', 'Brownlow Votes', 'Contested Possessions',
+                'Uncontested Possessions', 'Contested Marks', 'Marks Inside 50',
+                'One Percenters', 'Bounces', 'Goal Assists', '% Played']
+
+
+def teamNames(count):
+    names = [club[0] for club in CLUBS[:count]]
+    names += ['Team %d' % i for i in range(len(names) + 1, count + 1)]
+    return names
+
+
+def playerName(pid):
+    name = '%s %s' % (FIRST[pid % len(FIRST)], LAST[(pid // len(FIRST)) % len(LAST)])
+    generation = pid // (len(FIRST) * len(LAST))
+    return name if generation == 0 else '%s %d' % (name, generation + 1)
+
+
+def colours(teams, rng):
+    rows = []
+    for i, team in enumerate(teams):
+        if i < len(CLUBS):
+            rows.append(CLUBS[i])
+        else:
+            rows.append((team,) + tuple('#%06X' % c for c in rng.integers(0, 0xFFFFFF, 3)))
+    return pd.DataFrame(rows, columns=['team', 'colour1', 'colour2', 'colour3'])
+
+
+# One season's games: a random draw each round, every team plays once per round
+def seasonGames(year, teams, rng, firstId):
+    pairs = len(teams) // 2
+    rounds = ROUNDS + FINALS
+    home, away, roundNames, dates = [], [], [], []
+    start = np.datetime64('%d-03-20' % year)
+    for r, roundName in enumerate(rounds):
+        if r < len(ROUNDS):
+            order = rng.permutation(len(teams))[:2*pairs]
+            h, a = order[:pairs], order[pairs:]
+        else: # Finals: one game between two of the top 8 by index
+            h, a = rng.choice(min(8, len(teams)), 2, replace=False)[:, None]
+        home.append(h)
+        away.append(a)
+        roundNames += [roundName] * len(h)
+        dates.append(start + 7*r + rng.integers(0, 3, len(h)))
+    home, away, dates = np.concatenate(home), np.concatenate(away), np.concatenate(dates)
+    n = len(home)
+    return pd.DataFrame({
+        'gameId': ['%d_%s_%d' % (year, roundName, firstId + i) for i, roundName in enumerate(roundNames)],
+        'year': year,
+        'round': roundNames,
+        'date': dates,
+        'venue': rng.choice(VENUES, n),
+        'startTime': rng.choice(['1:45 PM', '4:35 PM', '7:25 PM', '7:50 PM'], n),
+        'attendance': rng.integers(8000, 95000, n),
+        'homeCode': home,
+        'awayCode': away,
+        'maxTemp': np.round(rng.normal(19, 5, n), 1),
+        'minTemp': np.round(rng.normal(10, 3, n), 1),
+        'rainfall': np.round(rng.exponential(1.5, n) * (rng.random(n) < 0.3), 1),
+    })
+
+
+# Player rows for one season's games, plus the team scores they add up to
+def seasonStats(games, squads, rng):
+    n = len(games.index)
+    teamCodes = np.concatenate([games['homeCode'].to_numpy(), games['awayCode'].to_numpy()])
+    gameRows = np.concatenate([np.arange(n), np.arange(n)])
+    # Pick 22 of each team's 40 listed players for every game
+    picks = np.argsort(rng.random((2*n, SQUAD)), axis=1)[:, :PLAYING]
+    pids = squads[teamCodes[:, None], picks].ravel()
+    rows = np.repeat(gameRows, PLAYING)
+    teamOfRow = np.repeat(teamCodes, PLAYING)
+    m = len(pids)
+
+    kicks = rng.poisson(9, m)
+    handballs = rng.poisson(7, m)
+    contested = rng.binomial(kicks + handballs, 0.4)
+    stats = {
+        'Disposals': kicks + handballs,
+        'Kicks': kicks,
+        'Marks': rng.poisson(4, m),
+        'Handballs': handballs,
+        'Goals': rng.poisson(0.6, m),
+        'Behinds': rng.poisson(0.5, m),
+        'Hit Outs': rng.poisson(0.8, m),
+        'Tackles': rng.poisson(3, m),
+        'Rebounds': rng.poisson(1.5, m),
+        'Inside 50s': rng.poisson(2, m),
+        'Clearances': rng.poisson(2, m),
+        'Clangers': rng.poisson(2, m),
+        'Frees': rng.poisson(1, m),
+        'Frees Against': rng.poisson(1, m),
+        'Brownlow Votes': rng.choice([0, 1, 2, 3], m, p=[0.95, 0.02, 0.015, 0.015]),
+        'Contested Possessions': contested,
+        'Uncontested Possessions': kicks + handballs - contested,
+        'Contested Marks': rng.poisson(0.7, m),
+        'Marks Inside 50': rng.poisson(0.6, m),
+        'One Percenters': rng.poisson(2, m),
+        'Bounces': rng.poisson(0.3, m),
+        'Goal Assists': rng.poisson(0.4, m),
+        '% Played': np.clip(rng.normal(85, 8, m), 20, 100).astype(int),
+    }
+    # Team score is 6 per goal plus behinds, with a few rushed behinds on top
+    side = np.repeat(np.arange(2*n) >= n, PLAYING) # False = home
+    points = 6*stats['Goals'] + stats['Behinds']
+    homeScore = np.bincount(rows[~side], points[~side], minlength=n).astype(int) + rng.poisson(2, n)
+    awayScore = np.bincount(rows[side], points[side], minlength=n).astype(int) + rng.poisson(2, n)
+
+    df = pd.DataFrame({'row': rows, 'teamCode': teamOfRow, 'pid': pids})
+    for col in STAT_COLUMNS:
+        df[col] = stats[col]
+    df['Subs'] = np.where(rng.random(m) < 0.03, 'Off', '')
+    return df, homeScore, awayScore
+
+
+def generate(out, seasons, teamCount, seed):
+    rng = np.random.default_rng(seed)
+    teams = np.array(teamNames(teamCount))
+    os.makedirs(out, exist_ok=True)
+    colours(teams, rng).to_csv(os.path.join(out, 'clubcolours.csv'), index=False)
+
+    # Each team's list of players, a few retire and are replaced every season
+    squads = np.arange(teamCount * SQUAD).reshape(teamCount, SQUAD)
+    nextPid = squads.size
+    careerGames = np.zeros(squads.size, dtype=np.int64)
+    names = [] # Player names by id
+
+    gamesPath = os.path.join(out, 'games.csv')
+    statsPath = os.path.join(out, 'stats.csv')
+    gameCount = statCount = 0
+    for s in range(seasons):
+        year = 1897 + s
+        games = seasonGames(year, teams, rng, gameCount)
+        stats, homeScore, awayScore = seasonStats(games, squads, rng)
+
+        # Career game numbers carry on from earlier seasons
+        stats['date'] = games['date'].to_numpy()[stats['row'].to_numpy()]
+        stats = stats.sort_values(['date', 'row'], kind='mergesort')
+        pids = stats['pid'].to_numpy()
+        if pids.max() >= len(careerGames):
+            careerGames = np.concatenate([careerGames, np.zeros(pids.max() + 1 - len(careerGames), np.int64)])
+        stats['gameNumber'] = stats.groupby('pid', sort=False).cumcount().to_numpy() + 1 + careerGames[pids]
+        careerGames += np.bincount(pids, minlength=len(careerGames))
+
+        games['homeTeam'] = teams[games['homeCode']]
+        games['awayTeam'] = teams[games['awayCode']]
+        games['homeTeamScore'] = homeScore
+        games['awayTeamScore'] = awayScore
+        games['homeTeamScoreChart'] = ''
+        games['awayTeamScoreChart'] = ''
+        games['date'] = pd.to_datetime(games['date']).dt.strftime('%Y-%m-%d')
+        games = games[['gameId', 'year', 'round', 'date', 'venue', 'startTime', 'attendance',
+                       'homeTeam', 'homeTeamScore', 'homeTeamScoreChart', 'awayTeam',
+                       'awayTeamScore', 'awayTeamScoreChart', 'maxTemp', 'minTemp', 'rainfall']]
+
+        rows = stats['row'].to_numpy()
+        stats.insert(0, 'gameId', games['gameId'].to_numpy()[rows])
+        stats.insert(1, 'team', teams[stats['teamCode'].to_numpy()])
+        stats.insert(2, 'year', year)
+        stats.insert(3, 'round', games['round'].to_numpy()[rows])
+        while len(names) <= pids.max():
+            names.append(playerName(len(names)))
+        stats.insert(4, 'displayName', np.array(names, dtype=object)[pids])
+        stats = stats[['gameId', 'team', 'year', 'round', 'displayName', 'gameNumber'] + STAT_COLUMNS + ['Subs']]
+
+        games.to_csv(gamesPath, index=False, mode='w' if s == 0 else 'a', header=s == 0)
+        stats.to_csv(statsPath, index=False, mode='w' if s == 0 else 'a', header=s == 0)
+        gameCount += len(games.index)
+        statCount += len(stats.index)
+
+        # Retire 4 players per team and list new ones
+        retire = rng.random(squads.shape).argsort(axis=1)[:, :4]
+        fresh = np.arange(nextPid, nextPid + retire.size).reshape(retire.shape)
+        np.put_along_axis(squads, retire, fresh, axis=1)
+        nextPid += retire.size
+
+    return gameCount, statCount
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic AFL data files')
+    parser.add_argument('out', help='folder to write games.csv, stats.csv and clubcolours.csv to')
+    parser.add_argument('--seasons', type=int, default=125)
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if 1897 + args.seasons > 2200:
+        parser.error('too many seasons for the calendar, add teams instead')
+    if args.teams < 8:
+        parser.error('need at least 8 teams for the finals')
+    games, stats = generate(args.out, args.seasons, args.teams, args.seed)
+    print('Wrote %d games and %d player rows to %s' % (games, stats, args.out))
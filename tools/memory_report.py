@@ -0,0 +1,34 @@
+# Memory held by each table column, read as plain CSV and as the dashboard holds it
+#   python tools/memory_report.py [data folder]
+# "csv" is pandas.read_csv with its default types, "held" is afl.loader.loadTable
+# (declared types, categoricals, downcast ints). Bytes are deep (strings included).
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afl import config
+from afl.loader import SCHEMAS, loadTable, sourcePath
+
+
+def report(name, dataDir):
+    before = pd.read_csv(sourcePath(name, dataDir))
+    after = loadTable(name, dataDir, useCache=False)
+    print('%s (%d rows)' % (name, len(after.index)))
+    print('  %-20s %12s %12s  %s' % ('column', 'csv bytes', 'held bytes', 'held type'))
+    for col in after.columns:
+        old = int(before[col].memory_usage(deep=True, index=False)) if col in before.columns else 0
+        new = int(after[col].memory_usage(deep=True, index=False))
+        print('  %-20s %12d %12d  %s' % (col, old, new, after[col].dtype))
+    old = int(before.memory_usage(deep=True, index=False).sum())
+    new = int(after.memory_usage(deep=True, index=False).sum())
+    print('  %-20s %12d %12d  (%.1fx smaller)\n' % ('total', old, new, old / max(new, 1)))
+    return old, new
+
+
+if __name__ == '__main__':
+    dataDir = sys.argv[1] if len(sys.argv) > 1 else config.DATA_DIR
+    totals = [report(name, dataDir) for name in SCHEMAS if os.path.exists(sourcePath(name, dataDir))]
+    old, new = sum(t[0] for t in totals), sum(t[1] for t in totals)
+    print('all tables: %.1f MB as read, %.1f MB held' % (old / 1e6, new / 1e6))
@@ -0,0 +1,29 @@
+# Compare dcc.Store payload sizes for to_dict() and the columnar wire format
+#   python tools/payload_report.py [data folder] [team]
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from afl.index import TeamIndex
+from afl.wire import wireReport
+
+dataDir = sys.argv[1] if len(sys.argv) > 1 else '/Users/nllama/Documents'
+team = sys.argv[2] if len(sys.argv) > 2 else 'Richmond'
+
+df_games = pd.read_csv(os.path.join(dataDir, 'games.csv'))
+df_stats = pd.read_csv(os.path.join(dataDir, 'stats.csv'))
+teamIndex = TeamIndex(df_games, df_stats)
+
+slices = [
+    (team + ' games', teamIndex.teamGames(team)),
+    (team + ' stats', teamIndex.teamStats(team)),
+    ('League games', teamIndex.games),
+    ('League stats', df_stats),
+]
+print('%-20s %10s %14s %14s %10s' % ('slice', 'rows', 'to_dict bytes', 'columnar bytes', 'reduction'))
+for name, df in slices:
+    report = wireReport(df)
+    print('%-20s %10d %14d %14d %9.1f%%' % (
+        name, report['rows'], report['dictBytes'], report['columnarBytes'], report['reduction']*100))
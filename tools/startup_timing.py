@@ -0,0 +1,87 @@
+# Time a dashboard's start-up with the data loaded up front and in the background
+#   python tools/startup_timing.py --data <data folder> [--script "AFL Dashboard V2.py"] [--repeat 3]
+# Each run starts the script in a fresh python process behind a local WSGI
+# server and measures, from the moment the process was started:
+#   first byte - the first byte of the page (/) arriving
+#   layout     - the layout (/_dash-layout) arriving, when the page can draw
+#   data ready - the ready route (AFL_READY_PATH) first answering 200
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dashclient import ROOT, loadScript
+
+
+# Server: load the script, serve it, and say which port it's on
+def child(script):
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR) # No line per request
+    module = loadScript(script)
+    server = make_server('127.0.0.1', 0, module.app.server, threaded=True)
+    print(server.server_port, flush=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    sys.stdin.readline() # Until told to stop
+
+
+# Seconds from start until the first byte of the response (None if it wasn't a 200)
+def firstByte(url, start):
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read(1)
+            return time.perf_counter() - start
+    except urllib.error.HTTPError:
+        return None
+
+
+def run(script, lazy, env):
+    from afl import config
+    env = dict(env, AFL_LAZY_START='1' if lazy else '0')
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, __file__, '--child', script], env=env, text=True,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        line = proc.stdout.readline()
+        if not line.strip():
+            raise RuntimeError('dashboard failed to start')
+        base = 'http://127.0.0.1:%d' % int(line)
+        page = firstByte(base + '/', start)
+        layout = firstByte(base + '/_dash-layout', start)
+        ready = None
+        while ready is None:
+            ready = firstByte(base + config.READY_PATH, start)
+            if ready is None:
+                time.sleep(0.01)
+        return page, layout, ready
+    finally:
+        proc.stdin.write('\n')
+        proc.stdin.flush()
+        proc.wait()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--child':
+        child(sys.argv[2])
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description='Time to first byte and to data ready, eager and lazy start-up')
+    parser.add_argument('--data', help='data folder (default AFL_DATA_DIR)')
+    parser.add_argument('--script', default=os.path.join(ROOT, 'AFL Dashboard V2.py'))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    env = dict(os.environ)
+    if args.data:
+        env['AFL_DATA_DIR'] = args.data
+    run(args.script, False, env) # Make sure the binary cache exists before timing anything
+
+    print('%-8s %14s %14s %14s' % ('start', 'first byte s', 'layout s', 'data ready s'))
+    for lazy in (False, True):
+        runs = [run(args.script, lazy, env) for _ in range(args.repeat)]
+        best = [min(r[i] for r in runs) for i in range(3)]
+        print('%-8s %14.3f %14.3f %14.3f' % (('lazy' if lazy else 'eager',) + tuple(best)))
@@ -0,0 +1,31 @@
+# Count the callback requests and server time one team change costs
+#   python tools/team_change_profile.py "AFL Dashboard V2.py" [team ...]
+# Point it at an older copy of the script to compare before and after.
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dashclient import DashClient, loadScript
+from afl.metrics import RequestCounter
+
+path = sys.argv[1] if len(sys.argv) > 1 else 'AFL Dashboard V2.py'
+teams = sys.argv[2:] or ['Sydney', 'Geelong', 'Richmond', 'Hawthorn']
+
+dashboard = loadScript(path)
+counter = RequestCounter(dashboard.app.server)
+client = DashClient(dashboard.app)
+inputId = 'dropdown-team' if 'dropdown-team.value' in client.props else 'dropdown-home-team'
+client.fire([key for key in client.props if key.startswith(inputId + '.')]) # Initial page load
+
+print('%-12s %9s %12s %12s %12s' % ('team', 'requests', 'server ms', 'wall ms', 'bytes in'))
+for team in teams:
+    before = counter.snapshot()
+    bytesIn = client.bytesIn
+    start = time.perf_counter()
+    client.change(inputId, 'value', team)
+    wall = time.perf_counter() - start
+    after = counter.snapshot()
+    print('%-12s %9d %12.1f %12.1f %12d' % (
+        team, after['requests'] - before['requests'], (after['seconds'] - before['seconds'])*1000,
+        wall*1000, client.bytesIn - bytesIn))
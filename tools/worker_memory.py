@@ -0,0 +1,87 @@
+# Measure per-worker memory with the data private to each worker or shared through the mapped cache
+#   python tools/worker_memory.py --data <data folder> [--workers 1 4 8]
+# Starts N worker processes at once, each loading AFL Dashboard V2.py the way a
+# WSGI worker would, and reads their memory from /proc (Linux only):
+#   RSS - resident pages, counting shared pages in full for every worker
+#   PSS - resident pages with shared pages split between the workers using them
+#   USS - pages private to the worker
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) * 1024
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+# Worker: load the dashboard, report memory, then wait until told to exit
+def child():
+    import gc
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from dashclient import loadScript
+    loadScript(os.path.join(ROOT, 'AFL Dashboard V2.py'))
+    gc.collect()
+    print('ready', flush=True)
+    sys.stdin.readline() # Every worker is loaded, measure now so sharing shows in PSS
+    print(json.dumps(memory()), flush=True)
+    sys.stdin.readline()
+
+
+def run(workers, shared, env):
+    env = dict(env, AFL_SHARED_DATA='1' if shared else '0')
+    procs = [subprocess.Popen([sys.executable, __file__, '--child'], env=env, text=True,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE) for _ in range(workers)]
+    for proc in procs:
+        while proc.stdout.readline().strip() != 'ready':
+            if proc.poll() is not None:
+                raise RuntimeError('worker failed to start')
+    results = []
+    for proc in procs:
+        proc.stdin.write('\n')
+        proc.stdin.flush()
+        results.append(json.loads(proc.stdout.readline()))
+    for proc in procs:
+        proc.stdin.write('\n')
+        proc.stdin.flush()
+        proc.wait()
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child()
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description='Per-worker memory, private vs shared data')
+    parser.add_argument('--data', help='data folder (default AFL_DATA_DIR)')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 4, 8])
+    args = parser.parse_args()
+    env = dict(os.environ)
+    if args.data:
+        env['AFL_DATA_DIR'] = args.data
+    run(1, True, env) # Make sure the binary cache exists before timing anything
+
+    MB = 1024 * 1024
+    print('%-8s %8s %14s %14s %14s %16s' % ('data', 'workers', 'RSS/worker MB', 'PSS/worker MB',
+                                             'USS/worker MB', 'total PSS MB'))
+    for shared in (False, True):
+        for workers in args.workers:
+            results = run(workers, shared, env)
+            mean = lambda key: sum(r[key] for r in results) / len(results) / MB
+            print('%-8s %8d %14.1f %14.1f %14.1f %16.1f' % (
+                'shared' if shared else 'private', workers, mean('rss'), mean('pss'), mean('uss'),
+                sum(r['pss'] for r in results) / MB))